@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Time fence language inference over every code block in ``skills/``.
+
+Runs ``til_cli.langinfer.infer`` on each fence of the repository (tags
+are ignored, so tagged blocks count too) and reports the time per
+block, how often the guess agrees with the tag the author wrote, and
+how many guesses clear ``til fix``'s default confidence threshold.
+
+    python benchmarks/bench_langinfer.py [--repo PATH] [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / 'til_cli'))
+
+from til_cli.fix import DEFAULT_MIN_CONFIDENCE  # noqa: E402
+from til_cli.langinfer import infer  # noqa: E402
+from til_cli.til import TILCollection  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', type=Path, default=REPO)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    blocks = [(code, entry.slug, lang)
+              for entry in TILCollection(args.repo).entries
+              for _section, lang, code in entry.code_blocks]
+    if not blocks:
+        print("no code blocks found")
+        return 1
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        guesses = [infer(code, slug) for code, slug, _lang in blocks]
+        best = min(best, time.perf_counter() - start)
+
+    agree = sum(g.language == lang
+                for g, (_c, _s, lang) in zip(guesses, blocks) if lang)
+    tagged = sum(1 for *_, lang in blocks if lang)
+    confident = sum(g.confidence >= DEFAULT_MIN_CONFIDENCE for g in guesses)
+    print(f"{len(blocks)} blocks, best of {args.repeat}: "
+          f"{best * 1e3:.3f} ms total, {best / len(blocks) * 1e6:.2f} us/block")
+    print(f"agrees with the author's tag: {agree}/{tagged}")
+    print(f"confidence >= {DEFAULT_MIN_CONFIDENCE}: {confident}/{len(blocks)}")
+    print("rules:", ', '.join(f"{rule}={n}" for rule, n in
+                              Counter(g.rule for g in guesses).most_common()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Compare the ``linear`` and ``fts`` search backends.
+
+Generates a synthetic skills repository, then times for each backend:
+building it (cold FTS index), re-creating it over an unchanged tree (the
+mtime sync every ``til`` invocation pays) and a few representative
+queries (full result sets unless ``--limit`` is given).
+
+    python benchmarks/bench_search.py --entries 100000
+
+Everything is written to a temporary directory (``--keep`` to inspect
+it afterwards); the user's cache is not touched.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'til_cli'))
+
+from til_cli.backends import create_backend  # noqa: E402
+from til_cli.til import TILCollection  # noqa: E402
+
+WORDS = ('tmux ghostty zsh bash git bisect rebase docker compose kubectl '
+         'ssh tunnel rsync systemd journal nginx postgres vacuum index '
+         'python venv pytest cargo clippy terminal keybinding clipboard '
+         'font ligature proxy certificate cron backup').split()
+
+QUERIES = ('tmux', 'git reb', 'postgres vacuum', 'nonexistentword')
+
+
+def make_repo(root: Path, count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for n in range(count):
+        slug = f"skill-{n:06d}-{rng.choice(WORDS)}"
+        skill_dir = root / 'skills' / slug
+        skill_dir.mkdir(parents=True)
+        body = ' '.join(rng.choice(WORDS) for _ in range(80))
+        (skill_dir / 'SKILL.md').write_text(
+            f"---\nname: {slug}\n"
+            f"description: \"{rng.choice(WORDS)} notes. Use when needed.\"\n"
+            f"---\n\n# {rng.choice(WORDS).title()} {n}\n\n"
+            f"## Notes\n\n{body}\n\n## Run (executable)\n\n"
+            f"```bash\necho {rng.choice(WORDS)}\n```\n")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Runs per query; the best time is reported')
+    parser.add_argument('--limit', type=int,
+                        help='Cap results per query (til search --limit)')
+    parser.add_argument('--keep', action='store_true')
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix='til-bench-'))
+    os.environ['TIL_CACHE_DIR'] = str(work / 'cache')
+    try:
+        repo = work / 'repo'
+        _, secs = timed(lambda: make_repo(repo, args.entries))
+        print(f"generated {args.entries} skills in {secs:.2f}s")
+        collection, secs = timed(lambda: TILCollection(repo))
+        print(f"loaded collection in {secs:.2f}s\n")
+
+        print(f"{'backend':8} {'step':24} {'hits':>7} {'seconds':>9}")
+        for name in ('linear', 'fts'):
+            backend, secs = timed(lambda: create_backend(collection, name))
+            print(f"{name:8} {'create (cold)':24} {'':>7} {secs:9.4f}")
+            backend, secs = timed(lambda: create_backend(collection, name))
+            print(f"{name:8} {'create (synced)':24} {'':>7} {secs:9.4f}")
+            for query in QUERIES:
+                best = float('inf')
+                for _ in range(args.repeat):
+                    hits, secs = timed(lambda: backend.search(query, args.limit))
+                    best = min(best, secs)
+                print(f"{name:8} {'search ' + repr(query):24} "
+                      f"{len(hits):7} {best:9.4f}")
+    finally:
+        if args.keep:
+            print(f"\nkept {work}")
+        else:
+            shutil.rmtree(work)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
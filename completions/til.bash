@@ -7,6 +7,61 @@
 #     ln -s /path/to/til/completions/til.bash \
 #           ~/.local/share/bash-completion/completions/til
 
+# Subcommands, as `til _complete commands` prints them; kept here so the
+# first word completes without starting Python. Keep in sync with
+# _PUBLIC_COMMANDS in til_cli/til_cli/__main__.py (checked by test_til.py).
+_til_commands="list search show execute validate version config update export catalog body serve batch fix history plan dupes"
+
+# Completion cache written by `til` (see til_cli/til_cli/completion.py).
+# Read with builtins only; returns 1 when the cache is missing or stale so
+# the caller falls back to `til _complete`.
+_til_cache=""
+_til_find_cache() {
+    local spec="$1" key header repo
+    if [[ -z "$spec" ]]; then
+        spec="$TIL_REPO_PATH"
+    fi
+    if [[ -n "$spec" ]]; then
+        key="repo-${spec//\//%}"
+    else
+        key="default"
+    fi
+    _til_cache="${TIL_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/til}/completion/$key"
+    [[ -r "$_til_cache" ]] || return 1
+    IFS= read -r header < "$_til_cache" || return 1
+    [[ "$header" == "#til-completion 1"$'\t'* ]] || return 1
+    # Stale once any repository's skills/ changed after it was written.
+    local IFS=$'\t'
+    for repo in ${header#*$'\t'}; do
+        [[ "$_til_cache" -nt "$repo/skills" ]] || return 1
+    done
+    return 0
+}
+
+# Slugs from the cache, into _til_words.
+_til_cached_slugs() {
+    local slug rest
+    _til_words=()
+    while IFS=$'\t' read -r slug rest; do
+        [[ "$slug" == "#"* ]] || _til_words+=("$slug")
+    done < "$_til_cache"
+}
+
+# Executable sections of slug $1 from the cache, into _til_words; returns 1
+# when the skill is unknown or its file changed after the cache was written.
+_til_cached_sections() {
+    local slug path rest
+    _til_words=()
+    while IFS=$'\t' read -r slug path rest; do
+        if [[ "$slug" == "$1" ]]; then
+            [[ "$_til_cache" -nt "$path" ]] || return 1
+            IFS=$'\t' read -r -a _til_words <<< "$rest"
+            return 0
+        fi
+    done < "$_til_cache"
+    return 1
+}
+
 _til() {
     local cur prev cmd
     COMPREPLY=()
@@ -19,7 +74,8 @@ _til() {
     for ((i=1; i<COMP_CWORD; i++)); do
         local w="${COMP_WORDS[i]}"
         case "$w" in
-            --repo-path|--repo-path=*) ;;
+            --repo-path) ((i++)) ;;  # skip its value too
+            --repo-path=*) ;;
             -*) ;;
             *)
                 if [[ -z "$cmd" ]]; then
@@ -30,14 +86,17 @@ _til() {
     done
 
     # Honour --repo-path so completion targets the right repo.
-    local repo_args=()
+    local repo_args=() repo_spec=""
     for ((i=1; i<COMP_CWORD; i++)); do
         if [[ "${COMP_WORDS[i]}" == "--repo-path" && $((i+1)) -lt COMP_CWORD ]]; then
-            repo_args=(--repo-path "${COMP_WORDS[i+1]}")
+            repo_spec="${COMP_WORDS[i+1]}"
+            repo_args=(--repo-path "$repo_spec")
         elif [[ "${COMP_WORDS[i]}" == --repo-path=* ]]; then
-            repo_args=(--repo-path "${COMP_WORDS[i]#*=}")
+            repo_spec="${COMP_WORDS[i]#*=}"
+            repo_args=(--repo-path "$repo_spec")
         fi
     done
+    local _til_words=()
 
     # Complete the option value for --repo-path with directories.
     if [[ "$prev" == "--repo-path" ]]; then
@@ -47,36 +106,69 @@ _til() {
 
     # Subcommand slot.
     if [[ -z "$cmd" ]]; then
-        local cmds
-        cmds="$(til _complete commands 2>/dev/null)"
-        COMPREPLY=( $(compgen -W "$cmds --repo-path" -- "$cur") )
+        COMPREPLY=( $(compgen -W "$_til_commands --repo-path" -- "$cur") )
         return 0
     fi
 
     case "$cmd" in
-        show|validate)
+        show|validate|body|fix|history|plan)
             local slugs
-            slugs="$(til "${repo_args[@]}" _complete slugs 2>/dev/null)"
+            if _til_find_cache "$repo_spec"; then
+                _til_cached_slugs
+                slugs="${_til_words[*]}"
+            else
+                slugs="$(til "${repo_args[@]}" _complete slugs 2>/dev/null)"
+            fi
             COMPREPLY=( $(compgen -W "$slugs" -- "$cur") )
             ;;
         execute)
-            # Argument position within the execute command: 1 = entry, 2 = section.
-            local exec_argc=0 j
+            case "$prev" in
+                --log|--hosts) COMPREPLY=( $(compgen -f -- "$cur") ); return 0 ;;
+                --log-dir) COMPREPLY=( $(compgen -d -- "$cur") ); return 0 ;;
+                --transport) COMPREPLY=( $(compgen -W "ssh local" -- "$cur") ); return 0 ;;
+                --ionice) COMPREPLY=( $(compgen -W "0 1 2 3 4 5 6 7 idle" -- "$cur") ); return 0 ;;
+                --timeout|--memory|--cpu|--nice|--max-concurrent|--parallel) return 0 ;;
+            esac
+            if [[ "$cur" == -* ]]; then
+                COMPREPLY=( $(compgen -W "--timeout --timestamps --prefix --log --memory --cpu --nice --ionice --max-concurrent --hosts --parallel --transport --fail-fast --log-dir" -- "$cur") )
+                return 0
+            fi
+            # Positional arguments given to execute so far (entry, section),
+            # skipping its options and their values.
+            local exec_argc=-1 entry="" j w
             for ((j=1; j<COMP_CWORD; j++)); do
-                if [[ "${COMP_WORDS[j]}" == "execute" ]]; then
-                    exec_argc=$((COMP_CWORD - j - 1))
-                    break
+                w="${COMP_WORDS[j]}"
+                if (( exec_argc < 0 )); then
+                    [[ "$w" == "execute" ]] && exec_argc=0
+                    continue
                 fi
+                case "$w" in
+                    --timeout|--log|--memory|--cpu|--nice|--ionice|--max-concurrent|\
+                    --hosts|--parallel|--transport|--log-dir) ((j++)) ;;
+                    -*) ;;
+                    *)
+                        [[ -z "$entry" ]] && entry="$w"
+                        ((exec_argc++))
+                        ;;
+                esac
             done
             if (( exec_argc <= 0 )); then
                 local slugs
-                slugs="$(til "${repo_args[@]}" _complete slugs 2>/dev/null)"
+                if _til_find_cache "$repo_spec"; then
+                    _til_cached_slugs
+                    slugs="${_til_words[*]}"
+                else
+                    slugs="$(til "${repo_args[@]}" _complete slugs 2>/dev/null)"
+                fi
                 COMPREPLY=( $(compgen -W "$slugs" -- "$cur") )
             elif (( exec_argc == 1 )); then
                 # Section for the previously-given entry.
-                local entry="${COMP_WORDS[COMP_CWORD-1]}"
                 local sections
-                sections="$(til "${repo_args[@]}" _complete sections "$entry" 2>/dev/null)"
+                if _til_find_cache "$repo_spec" && _til_cached_sections "$entry"; then
+                    sections="${_til_words[*]}"
+                else
+                    sections="$(til "${repo_args[@]}" _complete sections "$entry" 2>/dev/null)"
+                fi
                 COMPREPLY=( $(compgen -W "$sections" -- "$cur") )
             fi
             ;;
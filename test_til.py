@@ -427,6 +427,54 @@ This file is missing frontmatter and a level-1 heading.
             f"`til search _complete` looks hijacked by the completion "
             f"helper. stdout=\n{out}")
 
+    def test_empty_repo_path_is_an_error(self):
+        import subprocess
+        til_launcher = Path(__file__).parent / "til"
+        for value in (os.pathsep, ""):
+            proc = subprocess.run(
+                [str(til_launcher), "--repo-path", value, "list"],
+                capture_output=True, text=True)
+            self.assertEqual(proc.returncode, 1)
+            self.assertIn("No repository path in --repo-path", proc.stderr)
+            self.assertNotIn("Unexpected error", proc.stderr)
+        from til_cli.til_cli.til import load_collection
+        with self.assertRaises(ValueError):
+            load_collection([])
+
+    def test_structured_output(self):
+        """`--json` / `--ndjson` expose the parsed entry fields."""
+        import json
+        import subprocess
+        til_launcher = Path(__file__).parent / "til"
+
+        def run(*extra: str) -> str:
+            proc = subprocess.run(
+                [str(til_launcher), "--repo-path", str(self.test_dir),
+                 *extra], capture_output=True, text=True)
+            return proc.stdout
+
+        lines = run("list", "--ndjson").splitlines()
+        records = {r["slug"]: r for r in map(json.loads, lines)}
+        self.assertEqual(set(records), {"sample", "invalid"})
+        sample = records["sample"]
+        self.assertEqual(sample["title"], "Sample TIL")
+        self.assertEqual(sample["frontmatter"]["name"], "sample")
+        self.assertEqual(sample["sections"],
+                         ["Summary", "Details", "Install", "Usage"])
+        self.assertEqual(sample["executable_sections"], ["Install"])
+        self.assertEqual(sample["languages"], ["bash"])
+
+        shown = json.loads(run("show", "--json", "sample"))
+        self.assertEqual(shown[0]["content"], self.sample_content)
+
+        found = json.loads(run("search", "--json", "section:install"))
+        self.assertEqual([r["slug"] for r in found], ["sample"])
+
+        validated = [json.loads(line) for line in
+                     run("validate", "--ndjson").splitlines()]
+        self.assertEqual({r["slug"]: r["valid"] for r in validated},
+                         {"sample": True, "invalid": False})
+
     def test_help_does_not_leak_complete_helper(self):
         """`til --help` must not expose the hidden `_complete` subcommand."""
         import subprocess
@@ -473,6 +521,1816 @@ This file is missing frontmatter and a level-1 heading.
         self.assertEqual(run("sections", "no-such-slug"), [])
 
 
+class TestParallelLoading(unittest.TestCase):
+    """``TIL_LOAD_WORKERS`` loader modes agree with the serial loader."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        for n in range(6):
+            skill_dir = self.root / "skills" / f"skill-{n}"
+            skill_dir.mkdir(parents=True)
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: skill-{n}\ndescription: \"S. Use when.\"\n"
+                f"---\n\n# Skill {n}\n")
+        # Unreadable entry: a directory where the file should be.
+        (self.root / "skills" / "skill-3b" / "SKILL.md").mkdir(parents=True)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self, workers: str):
+        import io
+        err = io.StringIO()
+        with patch("sys.stderr", err):
+            collection = TILCollection(self.root, workers=workers)
+        return [e.slug for e in collection.entries], err.getvalue()
+
+    def test_modes_preserve_order_and_errors(self):
+        serial = self.load("")
+        self.assertEqual(serial[0][3:5], ["skill-3", "skill-3b"])
+        self.assertIn("Error parsing", serial[1])
+        for workers in ("4", "thread:2", "process:2"):
+            self.assertEqual(self.load(workers), serial, workers)
+
+    def test_parse_load_workers(self):
+        from til_cli.til_cli.til import parse_load_workers
+        self.assertEqual(parse_load_workers(None), ("serial", 1))
+        self.assertEqual(parse_load_workers("1"), ("serial", 1))
+        self.assertEqual(parse_load_workers("8"), ("thread", 8))
+        self.assertEqual(parse_load_workers("process:4"), ("process", 4))
+        self.assertEqual(parse_load_workers("bogus"), ("serial", 1))
+
+
+class TestAsyncAPI(unittest.TestCase):
+    """``til_cli.aio`` serves loads, searches and executions from a loop."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        skill_dir = self.root / "skills" / "greet"
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: greet\ndescription: \"Greet. Use when.\"\n---\n\n"
+            "# Greet\n\n## Run (executable)\n\n"
+            "```bash\necho hello\necho oops >&2\n```\n\n"
+            "```python\nprint('from python')\n```\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_search_execute(self):
+        import asyncio
+        from til_cli.til_cli.aio import AsyncTILCollection
+
+        async def scenario():
+            collection = await AsyncTILCollection.load(self.root)
+            found = await collection.search("lang:python")
+            output = []
+            prompts = []
+
+            async def confirm(language, code):
+                prompts.append(language)
+                return True
+
+            code = await collection.execute(
+                "greet", "Run", confirm=confirm,
+                on_output=lambda stream, line: output.append((stream, line)))
+            declined = await collection.execute(
+                "greet", "Run", confirm=lambda language, code: False,
+                on_output=lambda stream, line: output.append(line))
+            return found, code, declined, prompts, output
+
+        found, code, declined, prompts, output = asyncio.run(scenario())
+        self.assertEqual([e.slug for e in found], ["greet"])
+        self.assertEqual(code, 0)
+        self.assertEqual(declined, 0)
+        self.assertEqual(prompts, ["bash", "python"])
+        self.assertIn(("stdout", "hello\n"), output)
+        self.assertIn(("stderr", "oops\n"), output)
+        self.assertIn(("stdout", "from python\n"), output)
+        self.assertEqual(len(output), 3)
+
+    def test_concurrent_executions_share_one_loop(self):
+        import asyncio
+        import time as time_mod
+        from til_cli.til_cli.aio import execute_code_block as run_async
+
+        async def scenario():
+            return await asyncio.gather(*(
+                run_async("bash", "sleep 0.3", on_output=lambda s, l: None)
+                for _ in range(5)))
+
+        start = time_mod.monotonic()
+        results = asyncio.run(scenario())
+        self.assertEqual(results, [0] * 5)
+        self.assertLess(time_mod.monotonic() - start, 1.2)
+
+
+    def test_long_lines_and_failing_callback(self):
+        import asyncio
+        from til_cli.til_cli.aio import READ_SIZE
+        from til_cli.til_cli.aio import execute_code_block as run_async
+        output = []
+        code = asyncio.run(run_async(
+            "python", f"print('x' * {3 * READ_SIZE})\nprint('done')",
+            on_output=lambda stream, text: output.append(text)))
+        self.assertEqual(code, 0)
+        self.assertEqual("".join(output), "x" * 3 * READ_SIZE + "\ndone\n")
+
+        pid_file = Path(self.temp_dir.name) / "pid"
+
+        def fail(stream, text):
+            raise RuntimeError("consumer broke")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run_async(
+                "bash", f"echo $$ > {pid_file}; echo hi; sleep 30",
+                on_output=fail))
+        pid = int(pid_file.read_text())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+
+def _git(cwd: Path, *args: str) -> str:
+    """Run git in ``cwd`` with a throwaway identity; return stdout."""
+    import subprocess
+    return subprocess.run(
+        ["git", "-c", "user.name=til", "-c", "user.email=til@example.com",
+         "-c", "init.defaultBranch=main", *args],
+        cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+class TestGitStore(unittest.TestCase):
+    """Loading skills from git objects instead of the working tree."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo = Path(self.temp_dir.name) / "work"
+        self.repo.mkdir()
+        _git(self.repo, "init", "-q")
+        for slug in ("alpha", "beta"):
+            skill_dir = self.repo / "skills" / slug
+            skill_dir.mkdir(parents=True)
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: {slug}\ndescription: \"{slug}. Use when.\"\n"
+                f"---\n\n# {slug.title()} v1\n")
+        (self.repo / "skills" / "notes.md").write_text("# Not a skill\n")
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-qm", "v1")
+        _git(self.repo, "tag", "v1")
+        (self.repo / "skills" / "alpha" / "SKILL.md").write_text(
+            "---\nname: alpha\ndescription: \"alpha. Use when.\"\n"
+            "---\n\n# Alpha v2\n")
+        _git(self.repo, "commit", "-qam", "v2")
+        # Uncommitted edit: only the working-tree loader should see it.
+        (self.repo / "skills" / "beta" / "SKILL.md").write_text("# Dirty\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def titles(self, collection) -> List[str]:
+        return [e.title for e in collection.entries]
+
+    def test_reads_refs_without_checkout(self):
+        self.assertEqual(self.titles(TILCollection(self.repo, ref="HEAD")),
+                         ["Alpha v2", "Beta v1"])
+        self.assertEqual(self.titles(TILCollection(self.repo, ref="v1")),
+                         ["Alpha v1", "Beta v1"])
+        self.assertEqual(self.titles(TILCollection(self.repo)),
+                         ["Alpha v2", "Dirty"])
+
+        bare = Path(self.temp_dir.name) / "mirror.git"
+        _git(Path(self.temp_dir.name), "clone", "-q", "--mirror",
+             str(self.repo), str(bare))
+        collection = TILCollection(bare, ref="HEAD")
+        self.assertEqual(self.titles(collection), ["Alpha v2", "Beta v1"])
+        entry = collection.get_entry("alpha")
+        self.assertEqual(validate_entry(entry), [])
+        self.assertEqual(
+            entry.blob_sha,
+            _git(self.repo, "rev-parse", "HEAD:skills/alpha/SKILL.md").strip())
+
+    def test_empty_blob_is_validated_without_a_file(self):
+        skill = self.repo / "skills" / "empty" / "SKILL.md"
+        skill.parent.mkdir()
+        skill.write_text("")
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-qm", "empty")
+        skill.unlink()
+        entry = TILCollection(self.repo, ref="HEAD").get_entry("empty")
+        errors = validate_entry(entry)
+        self.assertTrue(errors)
+        self.assertFalse([e for e in errors if "Cannot read" in e])
+
+    def test_unchanged_blobs_are_not_reparsed(self):
+        from til_cli.til_cli import gitstore
+        first = TILCollection(self.repo, ref="v1")
+        with patch.object(gitstore, "read_blobs",
+                          wraps=gitstore.read_blobs) as read_blobs:
+            second = TILCollection(self.repo, ref="HEAD")
+        # Only alpha changed between v1 and HEAD.
+        self.assertEqual(len(read_blobs.call_args[0][1]), 1)
+        self.assertIs(first.get_entry("beta"), second.get_entry("beta"))
+
+    def test_unknown_ref(self):
+        from til_cli.til_cli.gitstore import GitStoreError
+        with self.assertRaises(GitStoreError):
+            TILCollection(self.repo, ref="no-such-ref")
+
+
+class TestUpdateCheck(unittest.TestCase):
+    """Update probe against a local bare repository as the remote."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        tmp = Path(self.temp_dir.name)
+        self.env = patch.dict(os.environ, {
+            "TIL_STATE_DIR": str(tmp / "state"), "HOME": str(tmp)})
+        self.env.start()
+        self.remote = tmp / "remote.git"
+        _git(tmp, "init", "-q", "--bare", str(self.remote))
+        self.publisher = tmp / "publisher"
+        _git(tmp, "clone", "-q", str(self.remote), str(self.publisher))
+        self._publish("one")
+        self.checkout = tmp / "checkout"
+        _git(tmp, "clone", "-q", str(self.remote), str(self.checkout))
+        # Pack refs so the probe has to read ``packed-refs`` too.
+        _git(self.checkout, "pack-refs", "--all")
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def _publish(self, name: str) -> None:
+        (self.publisher / f"{name}.txt").write_text(name)
+        _git(self.publisher, "add", "-A")
+        _git(self.publisher, "commit", "-qm", name)
+        _git(self.publisher, "push", "-q", "origin", "HEAD:main")
+
+    def test_noop_check_costs_one_subprocess(self):
+        from til_cli.til_cli import update
+        import subprocess as subprocess_mod
+        with patch.object(update.subprocess, "run",
+                          wraps=subprocess_mod.run) as run:
+            self.assertFalse(update.check_for_repo_updates(
+                self.checkout, force=True))
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(run.call_args[0][0][:2], ["git", "ls-remote"])
+        state = update.load_state(self.checkout)
+        self.assertEqual(state["outcome"], "up-to-date")
+        self.assertIn("ls_remote", state["timings"])
+
+    def test_pulls_only_when_remote_moved(self):
+        from til_cli.til_cli import update
+        self._publish("two")
+        self.assertTrue(update.check_for_repo_updates(
+            self.checkout, force=True))
+        self.assertTrue((self.checkout / "two.txt").exists())
+        self.assertEqual(update.load_state(self.checkout)["outcome"], "updated")
+        # Throttled: an unforced check right after does nothing.
+        with patch.object(update, "probe_and_update") as probe:
+            self.assertFalse(update.check_for_repo_updates(self.checkout))
+        probe.assert_not_called()
+
+    def test_throttle_is_per_repository_and_configurable(self):
+        from til_cli.til_cli import update
+        other = Path(self.temp_dir.name) / "other"
+        _git(Path(self.temp_dir.name), "clone", "-q", str(self.remote),
+             str(other))
+        update.check_for_repo_updates(self.checkout, force=True)
+        self.assertEqual(update.load_state(other), {})
+        with patch.object(update, "probe_and_update",
+                          return_value={"outcome": "up-to-date"}) as probe:
+            # ``other`` has never been checked, ``checkout`` just was.
+            update.check_for_repo_updates(other)
+            update.check_for_repo_updates(self.checkout)
+            self.assertEqual(probe.call_count, 1)
+            with patch.dict(os.environ, {"TIL_UPDATE_INTERVAL": "0"}):
+                update.check_for_repo_updates(self.checkout)
+            self.assertEqual(probe.call_count, 2)
+
+    def test_config_settings_survive_til_config(self):
+        from til_cli.til_cli import config
+        config.config_path().write_text(
+            "/old/repo\nupdate_interval = 60\n")
+        config.write_repo_path(self.checkout)
+        repos, settings = config.read_config()
+        self.assertEqual(repos, [str(self.checkout)])
+        self.assertEqual(settings, {"update_interval": "60"})
+        from til_cli.til_cli import update
+        self.assertEqual(update.update_interval(), 60)
+
+    def test_concurrent_update_is_skipped_while_locked(self):
+        from til_cli.til_cli import update
+        with update.update_lock(self.checkout) as acquired:
+            self.assertTrue(acquired)
+            with update.update_lock(self.checkout) as second:
+                self.assertFalse(second)
+            with patch.object(update, "probe_and_update") as probe:
+                self.assertFalse(update.check_for_repo_updates(
+                    self.checkout, force=True))
+            probe.assert_not_called()
+        with update.update_lock(self.checkout) as acquired:
+            self.assertTrue(acquired)
+
+    def test_local_commits_are_not_pulled(self):
+        from til_cli.til_cli import update
+        (self.checkout / "local.txt").write_text("local")
+        _git(self.checkout, "add", "-A")
+        _git(self.checkout, "commit", "-qm", "local")
+        record = update.probe_and_update(self.checkout)
+        self.assertEqual(record["outcome"], "ahead")
+        self.assertNotIn("pull", record["timings"])
+
+
+class TestFederation(unittest.TestCase):
+    """Several repositories merged into one namespace."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        tmp = Path(self.temp_dir.name)
+        self.team, self.personal = tmp / "team", tmp / "personal"
+        self._skill(self.team, "shared", "Team shared")
+        self._skill(self.team, "team-only", "Team only")
+        self._skill(self.personal, "shared", "Personal shared")
+        self._skill(self.personal, "mine", "Personal mine")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _skill(self, root: Path, slug: str, title: str) -> None:
+        skill_dir = root / "skills" / slug
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: \"{title}. Use when.\"\n"
+            f"---\n\n# {title}\n")
+
+    def test_precedence_and_sources(self):
+        from til_cli.til_cli.til import load_collection
+        collection = load_collection([self.team, self.personal])
+        self.assertEqual([e.title for e in collection.entries],
+                         ["Personal mine", "Team shared", "Team only"])
+        self.assertEqual([e.title for e in collection.shadowed],
+                         ["Personal shared"])
+        self.assertEqual(
+            [e.title for e in collection.query("shared OR mine")],
+            ["Personal mine", "Team shared"])
+        mine = collection.get_entry("skills/mine/SKILL.md")
+        self.assertEqual(mine.title, "Personal mine")
+        self.assertEqual(collection.root_for(mine), self.personal)
+        self.assertEqual(collection.source_label(mine), "personal")
+
+        # Swapping the order swaps the winner.
+        swapped = load_collection([self.personal, self.team])
+        self.assertEqual(swapped.get_entry("shared").title, "Personal shared")
+
+    def test_reload_keeps_other_repositories(self):
+        from til_cli.til_cli.til import load_collection
+        collection = load_collection([self.team, self.personal])
+        team_collection = collection.collections[0]
+        team_index = team_collection.index
+        self._skill(self.personal, "new-one", "Personal new")
+        collection.reload(self.personal)
+        self.assertIs(collection.collections[0], team_collection)
+        self.assertIs(team_collection.index, team_index)
+        self.assertEqual([e.slug for e in collection.query("new")],
+                         ["new-one"])
+
+    def test_repo_path_lists(self):
+        from til_cli.til_cli.til import get_til_repo_paths
+        value = os.pathsep.join(
+            [str(self.team), "/no/such/dir", str(self.personal)])
+        with patch.dict(os.environ, {"TIL_REPO_PATH": value}):
+            self.assertEqual(get_til_repo_paths(),
+                             [self.team, self.personal])
+
+
+class TestQuery(unittest.TestCase):
+    """Field-aware query language evaluated against the search index."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self._skill("tmux-plugins", "Tmux plugins. Use when.",
+                    "# Tmux plugins\n\n## Install (executable)\n\n"
+                    "```bash\ngit clone tpm\n```\n\n## Usage\n\n"
+                    "Press prefix shift enter to reload.\n")
+        self._skill("ghostty-keys", "Ghostty keys. Use when.",
+                    "# Ghostty keys\n\n## Config\n\n"
+                    "```conf\nkeybind = shift+enter=text:\\n\n```\n\n"
+                    "Enter shift mode.\n")
+        self._skill("py-tool", "Python tool. Use when.",
+                    "# Python tool\n\n## Install\n\n"
+                    "```python\nprint('tmux')\n```\n")
+        self.collection = TILCollection(self.root)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _skill(self, slug: str, description: str, body: str) -> None:
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: \"{description}\"\n---\n\n"
+            + body)
+
+    def slugs(self, expression: str) -> List[str]:
+        return [e.slug for e in self.collection.query(expression)]
+
+    def test_field_filters(self):
+        self.assertEqual(self.slugs("lang:bash"), ["tmux-plugins"])
+        self.assertEqual(self.slugs("lang:python"), ["py-tool"])
+        self.assertEqual(self.slugs("executable:true"), ["tmux-plugins"])
+        self.assertEqual(self.slugs("executable:false"),
+                         ["ghostty-keys", "py-tool"])
+        self.assertEqual(self.slugs("section:install"),
+                         ["py-tool", "tmux-plugins"])
+        self.assertEqual(self.slugs("name:tmux-*"), ["tmux-plugins"])
+        self.assertEqual(self.slugs("title:ghost"), ["ghostty-keys"])
+
+    def test_boolean_operators(self):
+        self.assertEqual(self.slugs("tmux"), ["py-tool", "tmux-plugins"])
+        self.assertEqual(self.slugs("tmux AND NOT lang:python"),
+                         ["tmux-plugins"])
+        self.assertEqual(self.slugs("tmux -lang:python"), ["tmux-plugins"])
+        self.assertEqual(self.slugs("lang:conf OR lang:python"),
+                         ["ghostty-keys", "py-tool"])
+        self.assertEqual(
+            self.slugs("(lang:conf OR lang:bash) section:install"),
+            ["tmux-plugins"])
+
+    def test_words_match_inside_tokens(self):
+        from til_cli.til_cli.query import parse_query
+        from til_cli.til_cli.search import find_matches
+        # As the substring search before the index: "mux" is in "tmux".
+        self.assertEqual(self.slugs("mux"), ["py-tool", "tmux-plugins"])
+        self.assertEqual(self.slugs("title:hostt"), ["ghostty-keys"])
+        self.assertEqual(self.slugs('"ift ent"'),
+                         ["ghostty-keys", "tmux-plugins"])
+        entry = self.collection.get_entry("tmux-plugins")
+        [match] = find_matches(entry, parse_query("mux"))
+        self.assertEqual(match.text[match.start:match.end].lower(), "mux")
+
+    def test_phrases_require_adjacent_words(self):
+        # Both skills contain "shift" and "enter"; only one in that order
+        # as prose, the other has them adjacent in the fenced config.
+        self.assertEqual(self.slugs('"shift enter"'),
+                         ["ghostty-keys", "tmux-plugins"])
+        self.assertEqual(self.slugs('"enter shift"'), ["ghostty-keys"])
+        self.assertEqual(self.slugs('"reload shift"'), [])
+
+    def test_match_offsets_and_snippets(self):
+        from til_cli.til_cli.query import parse_query
+        from til_cli.til_cli.search import find_matches
+        entry = self.collection.get_entry("tmux-plugins")
+        node = parse_query('"shift enter" lang:bash NOT lang:python')
+        matches = find_matches(entry, node)
+        self.assertEqual([m.field for m in matches],
+                         ["sections.Usage", "sections.Install"])
+        usage = entry.sections["Usage"]
+        phrase = matches[0].to_dict()
+        self.assertEqual(
+            usage[phrase["offset"]:phrase["offset"] + phrase["length"]],
+            "shift enter")
+        self.assertIn("prefix shift enter to reload", phrase["snippet"])
+        highlighted = matches[0].snippet(highlight=lambda t: f"<{t}>")
+        self.assertIn("<shift enter>", highlighted)
+
+    def test_lang_matches_wildcards_and_info_strings(self):
+        from til_cli.til_cli.query import parse_query
+        from til_cli.til_cli.search import find_matches
+        self._skill("slow-task", "Slow task. Use when.",
+                    "# Slow task\n\n## Run (executable)\n\n"
+                    "```\nplain\n```\n\n```Bash timeout=30\nsleep 1\n```\n")
+        self.collection = TILCollection(self.root)
+        entry = self.collection.get_entry("slow-task")
+        for query in ("lang:bash", "lang:ba*", "lang:b?sh"):
+            self.assertEqual(self.slugs(query), ["slow-task", "tmux-plugins"])
+            [match] = find_matches(entry, parse_query(query))
+            self.assertEqual(
+                match.text[match.start:match.end], "```Bash timeout=30")
+
+    def test_syntax_errors(self):
+        from til_cli.til_cli.query import QuerySyntaxError
+        for bad in ("(tmux", "tmux OR", "NOT", ")"):
+            with self.assertRaises(QuerySyntaxError, msg=bad):
+                self.collection.query(bad)
+
+
+class TestRegexSearch(unittest.TestCase):
+    """``til search --regex`` line scans."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        for n in range(5):
+            skill_dir = root / "skills" / f"board-{n}"
+            skill_dir.mkdir(parents=True)
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: board-{n}\ndescription: \"Board. Use when.\"\n"
+                "---\n\n# Board\n\n## Setup\n\n```ini\n"
+                f"dtparam=act_led_trigger=mmc{n}\n```\n")
+        self.collection = TILCollection(root)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reports_section_and_line(self):
+        from til_cli.til_cli.search import regex_search
+        hits = regex_search(self.collection.entries, r"dtparam=.*led")
+        self.assertEqual(len(hits), 5)
+        self.assertEqual(hits[0].entry.slug, "board-0")
+        self.assertEqual(hits[0].line, 11)
+        self.assertEqual(hits[0].section, "Setup")
+        self.assertEqual(hits[0].span, (0, 15))
+
+    def test_limit_stops_early(self):
+        from til_cli.til_cli.search import regex_search
+        hits = regex_search(self.collection.entries, r"mmc\d", limit=2)
+        self.assertEqual([h.entry.slug for h in hits], ["board-0", "board-1"])
+
+    def test_pool_matches_serial_order(self):
+        from til_cli.til_cli.search import regex_search
+        serial = regex_search(self.collection.entries, r"mmc[1-4]", limit=3)
+        pooled = regex_search(self.collection.entries, r"mmc[1-4]", limit=3,
+                              workers=2, chunk_size=1)
+        self.assertEqual([str(h) for h in pooled], [str(h) for h in serial])
+
+    def test_pool_scans_entries_without_files(self):
+        import shutil
+        from til_cli.til_cli.search import regex_search
+        entries = self.collection.entries
+        # As if loaded from git objects: the parsed text has no file.
+        entries[1].blob_sha = "0" * 40
+        for entry in entries[:2]:
+            shutil.rmtree(entry.path.parent)
+        serial = regex_search(entries, r"mmc\d")
+        pooled = regex_search(entries, r"mmc\d", workers=2, chunk_size=1)
+        self.assertEqual(len(pooled), 5)
+        self.assertEqual([str(h) for h in pooled], [str(h) for h in serial])
+
+    def test_pool_scans_the_loaded_text(self):
+        from til_cli.til_cli.search import regex_search
+        entries = self.collection.entries
+        # Changed on disk after loading: both scans see the parsed text.
+        entries[0].path.write_text("mmc9\n")
+        # Breaks for ``splitlines`` but not for the parser's line numbers.
+        entries[1].content = entries[1].content.replace(
+            "\n", "\x0c\u2028\n", 2)
+        serial = regex_search(entries, r"mmc\d")
+        pooled = regex_search(entries, r"mmc\d", workers=2, chunk_size=1)
+        self.assertEqual([str(h) for h in pooled], [str(h) for h in serial])
+        self.assertEqual([h.text[-4:] for h in serial],
+                         ["mmc0", "mmc1", "mmc2", "mmc3", "mmc4"])
+        self.assertEqual({h.line for h in serial}, {11})
+
+    def test_section_of_repeated_heading(self):
+        entry = TILEntry(Path("x.md"), content=(
+            "# T\n\n## Notes\n\na\n\n## Setup\n\nb\n\n## Notes\n\nc\n"))
+        self.assertEqual(
+            [entry.section_at(n) for n in (1, 5, 9, 13)],
+            [None, "Notes", "Setup", "Notes"])
+
+
+class TestExport(unittest.TestCase):
+    """``til export`` SQLite/JSON artifacts and incremental refresh."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "repo"
+        for slug in ("alpha", "beta"):
+            self._write(slug, "echo hi")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, slug, command):
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: \"{slug.title()} tricks. "
+            "Use when testing.\"\n---\n\n"
+            f"# {slug.title()}\n\n## Run (executable)\n\n"
+            f"```bash\n{command}\n```\n")
+
+    def test_sqlite_export_and_fts(self):
+        import sqlite3
+        from til_cli.til_cli.export import export_collection
+        db = Path(self.temp_dir.name) / "til.sqlite"
+        stats = export_collection(TILCollection(self.root), db, "sqlite")
+        self.assertEqual((stats.total, stats.written), (2, 2))
+        conn = sqlite3.connect(str(db))
+        try:
+            self.assertEqual(conn.execute(
+                "SELECT slug, valid FROM skills ORDER BY slug").fetchall(),
+                [("alpha", 1), ("beta", 1)])
+            self.assertEqual(conn.execute(
+                "SELECT b.language, b.section, b.code FROM code_blocks b "
+                "JOIN skills s ON s.id = b.skill_id WHERE s.slug = 'beta'"
+            ).fetchall(), [("bash", "Run", "echo hi")])
+            self.assertEqual(conn.execute(
+                "SELECT slug FROM skills_fts WHERE skills_fts MATCH 'alph*'"
+            ).fetchall(), [("alpha",)])
+        finally:
+            conn.close()
+
+    def test_sqlite_export_is_incremental(self):
+        import sqlite3
+        from til_cli.til_cli.export import export_collection
+        db = Path(self.temp_dir.name) / "til.sqlite"
+        export_collection(TILCollection(self.root), db, "sqlite")
+        self._write("beta", "echo changed")
+        (self.root / "skills" / "alpha" / "SKILL.md").unlink()
+        (self.root / "skills" / "alpha").rmdir()
+        stats = export_collection(TILCollection(self.root), db, "sqlite")
+        self.assertEqual((stats.total, stats.written, stats.removed),
+                         (1, 1, 1))
+        stats = export_collection(TILCollection(self.root), db, "sqlite")
+        self.assertEqual(stats.written, 0)
+        conn = sqlite3.connect(str(db))
+        try:
+            self.assertEqual(conn.execute(
+                "SELECT slug FROM skills_fts WHERE skills_fts MATCH 'changed'"
+            ).fetchall(), [("beta",)])
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM skills_fts").fetchone(),
+                (1,))
+        finally:
+            conn.close()
+
+    def test_json_export_reuses_unchanged_records(self):
+        import json
+        from til_cli.til_cli.export import export_collection
+        out = Path(self.temp_dir.name) / "til.json"
+        export_collection(TILCollection(self.root), out, "json")
+        document = json.loads(out.read_text())
+        self.assertEqual([r["slug"] for r in document["skills"]],
+                         ["alpha", "beta"])
+        self.assertEqual(document["skills"][0]["code_blocks"][0]["language"],
+                         "bash")
+        before = out.stat().st_mtime_ns
+        stats = export_collection(TILCollection(self.root), out, "json")
+        self.assertEqual(stats.written, 0)
+        self.assertEqual(out.stat().st_mtime_ns, before)
+
+    def test_validity_follows_required_skills(self):
+        import json
+        import shutil
+        import sqlite3
+        from til_cli.til_cli.export import export_collection
+        path = self.root / "skills" / "alpha" / "SKILL.md"
+        path.write_text(path.read_text().replace(
+            "---\n\n", "requires: beta\n---\n\n", 1))
+        db = Path(self.temp_dir.name) / "til.sqlite"
+        out = Path(self.temp_dir.name) / "til.json"
+        for output, fmt in ((db, "sqlite"), (out, "json")):
+            export_collection(TILCollection(self.root), output, fmt)
+        shutil.rmtree(self.root / "skills" / "beta")
+        for output, fmt in ((db, "sqlite"), (out, "json")):
+            stats = export_collection(TILCollection(self.root), output, fmt)
+            self.assertEqual((stats.written, stats.removed), (1, 1))
+        conn = sqlite3.connect(str(db))
+        try:
+            valid, errors = conn.execute(
+                "SELECT valid, errors FROM skills WHERE slug = 'alpha'"
+            ).fetchone()
+        finally:
+            conn.close()
+        self.assertEqual((valid, json.loads(errors)),
+                         (0, ["Unknown required skill: beta"]))
+        [record] = json.loads(out.read_text())["skills"]
+        self.assertEqual(record["errors"], ["Unknown required skill: beta"])
+
+
+    def test_refuses_to_overwrite_other_files(self):
+        import sqlite3
+        from til_cli.til_cli.export import ExportError, export_collection
+        db = Path(self.temp_dir.name) / "mine.sqlite"
+        conn = sqlite3.connect(str(db))
+        conn.execute("CREATE TABLE skills (name TEXT)")
+        conn.execute("INSERT INTO skills VALUES ('juggling')")
+        conn.commit()
+        conn.close()
+        with self.assertRaises(ExportError):
+            export_collection(TILCollection(self.root), db, "sqlite")
+        conn = sqlite3.connect(str(db))
+        try:
+            self.assertEqual(conn.execute("SELECT * FROM skills").fetchall(),
+                             [("juggling",)])
+        finally:
+            conn.close()
+        notes = Path(self.temp_dir.name) / "notes.json"
+        notes.write_text('{"todo": []}')
+        with self.assertRaises(ExportError):
+            export_collection(TILCollection(self.root), notes, "json")
+        self.assertEqual(notes.read_text(), '{"todo": []}')
+
+class TestSearchBackends(unittest.TestCase):
+    """Linear and SQLite FTS5 engines behind ``TILCollection.search``."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "repo"
+        self.env = patch.dict(os.environ, {
+            "TIL_CACHE_DIR": str(Path(self.temp_dir.name) / "cache")})
+        self.env.start()
+        self._write("tmux-copy", "Tmux copy mode",
+                    "Scroll back with tmux copy-mode.")
+        self._write("ghostty-keys", "Ghostty keys",
+                    "Bind shift enter in ghostty; tmux passes it through.")
+        self._write("git-bisect", "Git bisect", "Find the bad commit.")
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def _write(self, slug, title, body):
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: \"{title}. Use when.\"\n"
+            f"---\n\n# {title}\n\n## Notes\n\n{body}\n")
+
+    def test_fts_sync_reads_under_the_write_lock(self):
+        import sqlite3
+        from til_cli.til_cli.backends import FTSBackend, SearchBackend
+        with self.assertRaises(TypeError):
+            SearchBackend(None)
+        db = Path(self.temp_dir.name) / "index.sqlite"
+        backend = FTSBackend(TILCollection(self.root), db)
+        other = sqlite3.connect(str(db), timeout=0)
+        blocked = []
+
+        def trace(statement):
+            if statement.startswith("SELECT id, path, stamp FROM docs"):
+                # Another process syncing now must wait for this one.
+                try:
+                    other.execute("BEGIN IMMEDIATE")
+                    other.rollback()
+                except sqlite3.OperationalError:
+                    blocked.append(True)
+
+        backend.conn.set_trace_callback(trace)
+        backend.sync()
+        other.close()
+        self.assertEqual(blocked, [True])
+
+    def test_backend_selected_by_env(self):
+        from til_cli.til_cli.backends import FTSBackend, LinearBackend
+        self.assertIsInstance(TILCollection(self.root).search_backend,
+                              LinearBackend)
+        with patch.dict(os.environ, {"TIL_SEARCH_BACKEND": "fts"}):
+            self.assertIsInstance(TILCollection(self.root).search_backend,
+                                  FTSBackend)
+        with patch.dict(os.environ, {"TIL_SEARCH_BACKEND": "bogus"}):
+            with self.assertRaises(ValueError):
+                TILCollection(self.root).search("tmux")
+
+    def test_fts_prefix_bm25_and_snippet(self):
+        from til_cli.til_cli.backends import create_backend
+        backend = create_backend(TILCollection(self.root), "fts")
+        hits = backend.search("tmu")
+        # Both mention tmux; the one with it in slug and title ranks first.
+        self.assertEqual([h.entry.slug for h in hits],
+                         ["tmux-copy", "ghostty-keys"])
+        self.assertGreater(hits[0].score, hits[1].score)
+        self.assertIn("[tmux]", hits[1].snippet(
+            highlight=lambda m: f"[{m}]").lower())
+        self.assertEqual(backend.search("tmux", limit=1)[0].entry.slug,
+                         "tmux-copy")
+
+    def test_fts_sync_follows_file_changes(self):
+        from til_cli.til_cli.backends import create_backend
+        backend = create_backend(TILCollection(self.root), "fts")
+        self.assertEqual(backend.search("zellij"), [])
+        self._write("tmux-copy", "Zellij copy mode", "Scroll back.")
+        os.utime(self.root / "skills" / "tmux-copy" / "SKILL.md",
+                 ns=(1, 1))
+        backend = create_backend(TILCollection(self.root), "fts")
+        self.assertEqual([h.entry.slug for h in backend.search("zellij")],
+                         ["tmux-copy"])
+        self.assertEqual(backend.sync(), 0)
+
+    def test_linear_matches_legacy_scan(self):
+        collection = TILCollection(self.root)
+        self.assertEqual(
+            [e.slug for e in collection.search("PASSES")],
+            [e.slug for e in collection.entries
+             if e.matches_search("PASSES")])
+
+
+class TestCatalog(unittest.TestCase):
+    """Frontmatter-only catalog and on-demand bodies."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "repo"
+        self.env = patch.dict(os.environ, {
+            "TIL_CACHE_DIR": str(Path(self.temp_dir.name) / "cache")})
+        self.env.start()
+        skill_dir = self.root / "skills" / "tmux-copy"
+        skill_dir.mkdir(parents=True)
+        self.path = skill_dir / "SKILL.md"
+        self.path.write_bytes(
+            b"---\nname: tmux-copy\ndescription: \"Copy mode. Use when.\"\n"
+            b"---\n\n# Tmux copy\n\nBody \xff not utf-8.\n")
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_reads_only_frontmatter(self):
+        from til_cli.til_cli.catalog import load_catalog, read_frontmatter
+        self.assertEqual(read_frontmatter(self.path),
+                         {"name": "tmux-copy",
+                          "description": "Copy mode. Use when."})
+        records = load_catalog([self.root])
+        self.assertEqual([r["slug"] for r in records], ["tmux-copy"])
+        self.assertEqual(records[0]["frontmatter"]["name"], "tmux-copy")
+
+    def test_unterminated_frontmatter_is_empty(self):
+        from til_cli.til_cli.catalog import read_frontmatter
+        self.path.write_text("---\nname: x\n\n# No closing fence\n")
+        self.assertEqual(read_frontmatter(self.path), {})
+
+    def test_cache_is_keyed_by_mtime_and_size(self):
+        from til_cli.til_cli.catalog import load_catalog
+        load_catalog([self.root])
+        stat = self.path.stat()
+        # Same size and mtime: served from the cache without reading.
+        self.path.write_bytes(self.path.read_bytes().replace(b"tmux", b"TMUX"))
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(load_catalog([self.root])[0]["frontmatter"]["name"],
+                         "tmux-copy")
+        os.utime(self.path, ns=(1, 1))
+        self.assertEqual(load_catalog([self.root])[0]["frontmatter"]["name"],
+                         "TMUX-copy")
+
+    def test_ref_catalog_parses_only_frontmatter(self):
+        from til_cli.til_cli.catalog import load_catalog
+        _git(self.root, "init", "-q")
+        _git(self.root, "add", "-A")
+        _git(self.root, "commit", "-qm", "v1")
+        self.path.unlink()
+        with patch("til_cli.til_cli.catalog.TILEntry.__init__",
+                   side_effect=AssertionError("parsed a body")):
+            records = load_catalog([self.root], ref="HEAD")
+        self.assertEqual([(r["slug"], r["frontmatter"]["name"])
+                          for r in records], [("tmux-copy", "tmux-copy")])
+        self.assertEqual(records[0]["path"], str(self.path))
+
+    def test_load_body(self):
+        from til_cli.til_cli.catalog import body_text, load_body
+        self.path.write_text("---\nname: tmux-copy\n---\n\n# Tmux copy\n")
+        entry = load_body([self.root], "tmux-copy")
+        self.assertTrue(body_text(entry).startswith("# Tmux copy\n"))
+        self.assertIsNone(load_body([self.root], "missing"))
+        self.assertIsNone(load_body([self.root], "../repo"))
+
+
+class TestCompletionCache(unittest.TestCase):
+    """Plain-text cache read by the shell completion scripts."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "repo"
+        self.env = patch.dict(os.environ, {
+            "TIL_CACHE_DIR": str(Path(self.temp_dir.name) / "cache")})
+        self.env.start()
+        skill_dir = self.root / "skills" / "tmux-copy"
+        skill_dir.mkdir(parents=True)
+        self.path = skill_dir / "SKILL.md"
+        self.path.write_text(
+            "---\nname: tmux-copy\ndescription: Copy mode. Use when.\n---\n\n"
+            "# Tmux copy\n\n## Notes\n\nText.\n\n"
+            "## Run (executable)\n\n```bash\necho hi\n```\n")
+        self.spec = str(self.root)
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_render_and_write(self):
+        from til_cli.til_cli.completion import (
+            HEADER, cache_key, cache_path, render, write_cache)
+        from til_cli.til_cli.til import load_collection
+        collection = load_collection([self.root])
+        lines = render(collection).splitlines()
+        self.assertEqual(lines[0], f"{HEADER}\t{self.root.resolve()}")
+        self.assertEqual(lines[1], f"tmux-copy\t{self.path.resolve()}\tRun")
+
+        self.assertEqual(cache_key(None), "default")
+        self.assertEqual(cache_key("/a/b"), "repo-%a%b")
+        write_cache(collection, self.spec)
+        path = cache_path(self.spec)
+        self.assertEqual(path.read_text(), render(collection))
+        # Unchanged content is only touched, to stay newer than skills/.
+        os.utime(path, ns=(1, 1))
+        write_cache(collection, self.spec)
+        self.assertGreater(path.stat().st_mtime_ns, 1)
+
+    def test_skips_ref_and_unconfigured_default(self):
+        from til_cli.til_cli.completion import cache_path, write_cache
+        collection = MagicMock(ref="HEAD")
+        write_cache(collection, self.spec)
+        self.assertFalse(cache_path(self.spec).exists())
+        with patch("til_cli.til_cli.completion.read_config",
+                   return_value=([], {})), patch.dict(os.environ):
+            os.environ.pop("TIL_REPO_PATH", None)
+            write_cache(MagicMock(ref=None), None)
+        self.assertFalse(cache_path(None).exists())
+
+    def test_launcher_uses_the_shell_key(self):
+        from til_cli.til_cli.completion import selection_spec
+        with patch.dict(os.environ, {"TIL_REPO_PATH": self.spec}):
+            self.assertEqual(selection_spec(None), self.spec)
+            # As set by ./til when the shell had no TIL_REPO_PATH.
+            os.environ["TIL_SHELL_REPO_PATH"] = ""
+            self.assertIsNone(selection_spec(None))
+            os.environ["TIL_SHELL_REPO_PATH"] = "/a"
+            self.assertEqual(selection_spec(None), "/a")
+            self.assertEqual(selection_spec("/b"), "/b")
+
+    def test_scripts_list_every_command(self):
+        import re
+        import subprocess
+        til_launcher = Path(__file__).parent / "til"
+        commands = tuple(subprocess.run(
+            [str(til_launcher), "--repo-path", self.spec, "_complete",
+             "commands"], capture_output=True, text=True).stdout.split())
+        self.assertIn("dupes", commands)
+        scripts = Path(__file__).parent / "completions"
+        bash = re.search(r'^_til_commands="(.*)"$',
+                         (scripts / "til.bash").read_text(), re.M)
+        self.assertEqual(tuple(bash.group(1).split()), commands)
+        zsh = re.search(r"subcommands=\(\n(.*?)\n\s*\)",
+                        (scripts / "_til").read_text(), re.S)
+        self.assertEqual(
+            tuple(re.findall(r"^\s*'([\w-]+):", zsh.group(1), re.M)),
+            commands)
+
+    def test_bash_reads_cache(self):
+        import shutil
+        import subprocess
+        from til_cli.til_cli.completion import write_cache
+        from til_cli.til_cli.til import load_collection
+        if not shutil.which("bash"):
+            self.skipTest("bash not available")
+        write_cache(load_collection([self.root]), self.spec)
+        script = Path(__file__).parent / "completions" / "til.bash"
+        probe = (
+            'complete() { :; }; source "$1"; '
+            '_til_find_cache "$2" || { echo stale; exit; }; '
+            '_til_cached_slugs; echo "${_til_words[*]}"; '
+            '_til_cached_sections tmux-copy && echo "${_til_words[*]}"; '
+            'touch -d "+1 minute" "$2/skills"; '
+            '_til_find_cache "$2" || echo stale')
+        out = subprocess.run(["bash", "-c", probe, "bash", str(script),
+                              self.spec], capture_output=True, text=True)
+        self.assertEqual(out.stdout.splitlines(), ["tmux-copy", "Run", "stale"])
+
+
+class TestHTTPServer(unittest.TestCase):
+    """``til serve``: JSON endpoints, ETags, gzip and reloads."""
+
+    def setUp(self):
+        import threading
+        from til_cli.til_cli.server import PooledHTTPServer, SkillService
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self._write("tmux-copy", "Tmux copy")
+        self._write("git-bisect", "Git bisect")
+        self.server = PooledHTTPServer(
+            ("127.0.0.1", 0), SkillService([self.root], recheck=0), 2)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.temp_dir.cleanup()
+
+    def _write(self, slug, title):
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: \"{title}. Use when.\"\n"
+            f"---\n\n# {title}\n\n## Notes\n\n" + "text " * 200 + "\n")
+
+    def _get(self, path, **headers):
+        import urllib.error
+        import urllib.request
+        request = urllib.request.Request(self.base + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_endpoints(self):
+        import json
+        status, _, body = self._get("/skills")
+        self.assertEqual(status, 200)
+        self.assertEqual([r["slug"] for r in json.loads(body)],
+                         ["git-bisect", "tmux-copy"])
+        status, _, body = self._get("/skills/tmux-copy")
+        self.assertIn("# Tmux copy", json.loads(body)["content"])
+        status, _, body = self._get("/search?q=title:bisect")
+        self.assertEqual([r["slug"] for r in json.loads(body)],
+                         ["git-bisect"])
+        status, _, body = self._get("/validate?slug=git-bisect")
+        self.assertTrue(json.loads(body)[0]["valid"])
+        self.assertEqual(self._get("/skills/missing")[0], 404)
+        self.assertEqual(self._get("/search?q=(")[0], 400)
+
+    def test_etag_and_gzip(self):
+        import gzip
+        import json
+        status, headers, body = self._get("/skills",
+                                          **{"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(body))), 2)
+        etag = headers["ETag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertEqual(self._get("/skills", **{
+            "If-None-Match": f'"other", W/{etag}',
+            "Accept-Encoding": "gzip"})[0], 304)
+        # The identity body is another representation: its own ETag.
+        status, headers, _ = self._get("/skills", **{"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(self._get("/skills", **{"If-None-Match": "*"})[0],
+                         304)
+        # Touching a file changes the ETag and reloads the collection.
+        self._write("tmux-copy", "Tmux scrollback")
+        os.utime(self.root / "skills" / "tmux-copy" / "SKILL.md", ns=(1, 1))
+        status, headers, body = self._get("/skills",
+                                          **{"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+        self.assertIn("Tmux scrollback", body.decode())
+
+    def test_validate_follows_required_skills(self):
+        import json
+        import shutil
+        path = self.root / "skills" / "tmux-copy" / "SKILL.md"
+        path.write_text(path.read_text().replace(
+            "---\n\n", "requires: git-bisect\n---\n\n", 1))
+        status, headers, body = self._get("/validate?slug=tmux-copy")
+        self.assertTrue(json.loads(body)[0]["valid"])
+        etag = headers["ETag"]
+        shutil.rmtree(self.root / "skills" / "git-bisect")
+        status, headers, body = self._get("/validate?slug=tmux-copy",
+                                          **{"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        [result] = json.loads(body)
+        self.assertFalse(result["valid"])
+        self.assertTrue(any("git-bisect" in e for e in result["errors"]))
+
+    def test_accepts_gzip(self):
+        from til_cli.til_cli.server import accepts_gzip
+        self.assertTrue(accepts_gzip("gzip, deflate"))
+        self.assertTrue(accepts_gzip("br;q=1.0, *;q=0.5"))
+        self.assertFalse(accepts_gzip("gzip;q=0, deflate"))
+        self.assertFalse(accepts_gzip("*;q=0.5, gzip;q=0"))
+        self.assertFalse(accepts_gzip("identity"))
+        self.assertFalse(accepts_gzip(""))
+        status, headers, _ = self._get("/skills",
+                                       **{"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(headers["Content-Encoding"])
+
+    def test_reload_swaps_the_snapshot(self):
+        service = self.server.service
+        old = service.refresh()
+        entry = old.collection.get_entry("tmux-copy")
+        old.validate(entry)
+        self._write("tmux-copy", "Tmux scrollback")
+        os.utime(self.root / "skills" / "tmux-copy" / "SKILL.md", ns=(1, 1))
+        new = service.refresh()
+        self.assertIsNot(new, old)
+        self.assertNotEqual(new.version, old.version)
+        # A request still holding the old snapshot caches into it only.
+        old.validate(old.collection.get_entry("git-bisect"))
+        self.assertEqual(new._validation, {})
+
+
+class TestBatch(unittest.TestCase):
+    """``til batch`` request/response framing."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        skill_dir = root / "skills" / "tmux-copy"
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: tmux-copy\ndescription: \"Copy mode. Use when.\"\n"
+            "---\n\n# Tmux copy\n\n## Summary\n\nCopy.\n\n"
+            "## Run (executable)\n\n```bash\ntmux copy-mode\n```\n")
+        self.collection = TILCollection(root)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self, text):
+        import json
+        from til_cli.til_cli.batch import run_batch
+        out = []
+        failed = run_batch(self.collection, text.splitlines(), out.append)
+        return failed, [json.loads(line) for line in out]
+
+    def test_one_response_per_request(self):
+        failed, responses = self._run(
+            "show tmux-copy\n\n# comment\nsections tmux-copy\n"
+            "search title:tmux\nvalidate\n")
+        self.assertEqual(failed, 0)
+        self.assertEqual([r["id"] for r in responses], [1, 2, 3, 4])
+        self.assertIn("# Tmux copy", responses[0]["result"]["content"])
+        self.assertEqual(responses[1]["result"], [
+            {"name": "Summary", "line": 8, "executable": False},
+            {"name": "Run", "line": 12, "executable": True}])
+        self.assertEqual([r["slug"] for r in responses[2]["result"]],
+                         ["tmux-copy"])
+        self.assertTrue(responses[3]["result"][0]["valid"])
+
+    def test_failures_are_reported_inline(self):
+        failed, responses = self._run("show nope\nsearch (\nfrobnicate x\n")
+        self.assertEqual(failed, 3)
+        self.assertEqual([r["ok"] for r in responses], [False] * 3)
+        self.assertEqual(responses[0]["error"], "Entry not found: nope")
+
+
+class TestBlockRunner(unittest.TestCase):
+    """Timeouts, streamed output and fence options for executed blocks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fence_options(self):
+        path = self.tmp / "SKILL.md"
+        path.write_text("# Demo\n\n## Run (executable)\n\n"
+                        "```bash timeout=5 other=x\necho a\n```\n\n"
+                        "```python\nprint(1)\n```\n")
+        entry = TILEntry(path)
+        blocks = entry.executable_blocks("Run")
+        self.assertEqual([b.options for b in blocks],
+                         [{"timeout": "5", "other": "x"}, {}])
+        self.assertEqual(entry.get_executable_blocks("Run"),
+                         [("bash", "echo a"), ("python", "print(1)")])
+        # Still one block to the parser and validator.
+        self.assertEqual(len(entry.code_blocks), 2)
+        self.assertNotIn("Unclosed code block (missing closing ```)",
+                         validate_entry(entry))
+
+    def test_parse_timeout(self):
+        from til_cli.til_cli.runner import parse_timeout
+        self.assertIsNone(parse_timeout(None))
+        self.assertIsNone(parse_timeout("0"))
+        self.assertEqual(parse_timeout("2.5"), 2.5)
+        for bad in ("-1", "soon", "inf", "nan"):
+            with self.assertRaises(ValueError):
+                parse_timeout(bad)
+
+    def test_streams_prefixed_lines_to_log(self):
+        import io
+        from til_cli.til_cli.runner import BlockRunner
+        log = self.tmp / "run.log"
+        out, err = io.StringIO(), io.StringIO()
+        with patch("sys.stdout", out), patch("sys.stderr", err), \
+                BlockRunner(prefix=True, log=log) as runner:
+            code = runner.run(["/bin/sh", "-c", "echo one; echo two >&2; exit 3"],
+                              label="demo:Run#1")
+        self.assertEqual(code, 3)
+        self.assertEqual(out.getvalue(), "[demo:Run#1] one\n")
+        self.assertEqual(err.getvalue(), "[demo:Run#1] two\n")
+        self.assertEqual(sorted(log.read_text().splitlines()),
+                         ["[demo:Run#1] one", "[demo:Run#1] two"])
+
+    def test_timeout_kills_process_group(self):
+        import time
+        from til_cli.til_cli.runner import TIMEOUT_EXIT, BlockRunner
+        pid_file = self.tmp / "child.pid"
+        start = time.monotonic()
+        with self.assertLogs("til", level="ERROR") as logs:
+            code = BlockRunner(timeout=0.5).run(
+                ["/bin/sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"],
+                label="demo:Run#2")
+        self.assertEqual(code, TIMEOUT_EXIT)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertIn("demo:Run#2: timed out after 0.5s", logs.output[0])
+        # Gone, or a zombie awaiting a reaper that isn't us (SIGKILL is
+        # delivered asynchronously, so allow it a moment).
+        stat = Path(f"/proc/{int(pid_file.read_text())}/stat")
+        deadline = time.monotonic() + 2
+        state = None
+        while time.monotonic() < deadline:
+            try:
+                state = stat.read_text().rsplit(")", 1)[1].split()[0]
+            except OSError:
+                state = None
+            if state in (None, "Z"):
+                break
+            time.sleep(0.01)
+        self.assertIn(state, (None, "Z"))
+
+    def test_timeout_keeps_the_controlling_terminal(self):
+        """A timed block can still prompt on /dev/tty (e.g. sudo)."""
+        import pty
+        import time
+        pid, fd = pty.fork()
+        if pid == 0:  # child: til on a terminal
+            try:
+                from til_cli.til_cli.runner import BlockRunner
+                code = BlockRunner(timeout=5).run(
+                    ["/bin/sh", "-c", "read x </dev/tty; echo got:$x"])
+                os.write(1, f"code:{code}\n".encode())
+            finally:
+                os._exit(0)
+        time.sleep(0.5)
+        os.write(fd, b"hello\n")
+        out = b""
+        while True:
+            try:
+                chunk = os.read(fd, 1024)
+            except OSError:
+                break
+            if not chunk:
+                break
+            out += chunk
+        os.waitpid(pid, 0)
+        self.assertIn(b"got:hello", out)
+        self.assertIn(b"code:0", out)
+
+    def test_unread_input_does_not_outlast_the_timeout(self):
+        import time
+        from til_cli.til_cli.runner import TIMEOUT_EXIT, BlockRunner
+        start = time.monotonic()
+        with self.assertLogs("til", level="ERROR"):
+            code = BlockRunner(timeout=0.5).run(
+                ["/bin/sh", "-c", "sleep 30"], input=b"x" * (1 << 20))
+        self.assertEqual(code, TIMEOUT_EXIT)
+        self.assertLess(time.monotonic() - start, 5)
+
+
+class TestResourceLimits(unittest.TestCase):
+    """rlimits, niceness, machine-wide slots and wait4 usage for blocks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"TIL_STATE_DIR": self.temp_dir.name})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_parse(self):
+        from til_cli.til_cli.config import parse_size
+        from til_cli.til_cli.runner import Limits
+        self.assertEqual(parse_size("512M"), 512 << 20)
+        self.assertEqual(parse_size("2GiB"), 2 << 30)
+        self.assertIsNone(parse_size("0"))
+        limits = Limits.parse("64k", "1.5", "5", "idle", "2")
+        self.assertEqual(limits, Limits(64 << 10, 1.5, 5, "idle", 2))
+        self.assertEqual(Limits.parse(), Limits())
+        for bad in ({"memory": "lots"}, {"nice": "x"}, {"ionice": "9"},
+                    {"max_concurrent": "-1"}):
+            with self.assertRaises(ValueError):
+                Limits.parse(**bad)
+
+    def test_limits_apply_and_usage_is_reported(self):
+        from til_cli.til_cli.runner import BlockRunner, Limits
+        runner = BlockRunner(limits=Limits(cpu=1, nice=5))
+        with self.assertLogs("til", level="INFO") as logs:
+            code = runner.run(["/bin/sh", "-c",
+                               f'[ "$(nice)" -ge 5 ] && exec {sys.executable} '
+                               '-c "while True: pass"'], label="spin")
+        self.assertEqual(code, -24)  # SIGXCPU at the soft limit
+        self.assertGreaterEqual(runner.last.cpu, 0.9)
+        self.assertGreater(runner.last.max_rss, 0)
+        self.assertIn("spin: killed by SIGXCPU in", logs.output[-1])
+
+    def test_usage_names_unnamed_signals(self):
+        import signal
+        from til_cli.til_cli.runner import Usage
+        number = signal.SIGRTMIN + 1
+        usage = Usage(-number, 1.0, 0.5, 0.0, 1 << 20)
+        self.assertTrue(str(usage).startswith(f"killed by signal {number} "))
+        self.assertTrue(str(usage._replace(returncode=-9)).startswith(
+            "killed by SIGKILL "))
+
+    def test_memory_limit(self):
+        from til_cli.til_cli.runner import BlockRunner, Limits
+        runner = BlockRunner(limits=Limits(memory=256 << 20))
+        with patch("sys.stderr"), self.assertLogs("til", level="INFO"):
+            code = runner.run([sys.executable, "-c",
+                               "bytearray(512 << 20)"], label="mem")
+        self.assertEqual(code, 1)  # MemoryError
+
+    def test_threaded_runs_apply_limits_without_preexec(self):
+        import subprocess
+        import threading
+        from til_cli.til_cli.runner import BlockRunner, Limits
+        out = Path(self.temp_dir.name) / "limits"
+        runner = BlockRunner(timeout=0.5, limits=Limits(
+            memory=256 << 20, cpu=3, nice=5))
+        results = []
+
+        def run():
+            results.append(runner.run(["/bin/sh", "-c",
+                                       "(nice; ulimit -S -t; ulimit -H -t; "
+                                       f"ulimit -v) > {out}; sleep 30"]))
+
+        with patch("til_cli.til_cli.runner.subprocess.Popen",
+                   wraps=subprocess.Popen) as popen, \
+                self.assertLogs("til", level="INFO"):
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join(10)
+        # Not the only thread, where a ``preexec_fn`` would not be safe.
+        self.assertNotIn("preexec_fn", popen.call_args.kwargs)
+        self.assertTrue(popen.call_args.kwargs["start_new_session"])
+        self.assertEqual(results, [124])
+        nice, soft, hard, memory = out.read_text().split()
+        self.assertGreaterEqual(int(nice), 5)
+        self.assertEqual((soft, hard, memory), ("3", "4", str(256 << 10)))
+
+    def test_execution_slots_are_machine_wide(self):
+        import threading
+        from til_cli.til_cli.runner import execution_slot
+        entered = threading.Event()
+
+        def second():
+            with execution_slot(1):
+                entered.set()
+
+        with execution_slot(1):
+            # A separate open of the lock file, as another process would.
+            with self.assertLogs("til", level="INFO"):
+                thread = threading.Thread(target=second)
+                thread.start()
+                self.assertFalse(entered.wait(0.5))
+        self.assertTrue(entered.wait(5))
+        thread.join()
+        self.assertTrue(
+            (Path(self.temp_dir.name) / "execute" / "slot-0.lock").exists())
+
+
+class TestFleet(unittest.TestCase):
+    """One section on many hosts through a pluggable transport."""
+
+    def setUp(self):
+        from til_cli.til_cli.til import ExecutableBlock
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.temp_dir.name)
+        self.blocks = [
+            ExecutableBlock("bash", 'echo "hi $1"; [ "$1" != bad ]', {}),
+            ExecutableBlock("python", "import sys; print('py', sys.argv[1])",
+                            {}),
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_fleet(self, hosts, **kwargs):
+        import io
+        from til_cli.til_cli.fleet import LocalTransport, run_fleet
+        with patch("sys.stdout", io.StringIO()), \
+                self.assertLogs("til", level="INFO"):
+            return run_fleet(hosts, self.blocks, self.tmp / "logs",
+                             LocalTransport(), **kwargs)
+
+    def test_read_hosts(self):
+        from til_cli.til_cli.fleet import read_hosts
+        path = self.tmp / "hosts"
+        path.write_text("pi-01\n# spare\n\npi@pi-02  # kitchen\npi-01\n")
+        self.assertEqual(read_hosts(path), ["pi-01", "pi@pi-02"])
+        path.write_text("-oProxyCommand=x\n")
+        with self.assertRaises(ValueError):
+            read_hosts(path)
+
+    def test_transports(self):
+        from til_cli.til_cli.fleet import create_transport
+        self.assertEqual(create_transport("ssh").argv("pi-01", "bash"),
+                         ["ssh", "-o", "BatchMode=yes", "pi-01",
+                          "bash", "-s", "--", "pi-01"])
+        self.assertEqual(
+            create_transport("ssh").argv("pi-01", "bash", timeout=30),
+            ["ssh", "-o", "BatchMode=yes", "pi-01", "timeout", "-k", "2",
+             "30", "bash", "-s", "--", "pi-01"])
+        with self.assertRaises(ValueError):
+            create_transport("carrier-pigeon")
+        from til_cli.til_cli.fleet import Transport
+        with self.assertRaises(TypeError):
+            Transport()
+
+    def test_local_only_options_are_rejected_with_hosts(self):
+        import subprocess
+        skill_dir = self.tmp / "repo" / "skills" / "demo"
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: demo\ndescription: Demo. Use when.\n---\n\n"
+            "# Demo\n\n## Run (executable)\n\n```bash\necho hi\n```\n")
+        (self.tmp / "hosts").write_text("a\n")
+        til_launcher = Path(__file__).parent / "til"
+        proc = subprocess.run(
+            [str(til_launcher), "--repo-path", str(self.tmp / "repo"),
+             "execute", "demo", "Run", "--hosts", str(self.tmp / "hosts"),
+             "--transport", "local", "--memory", "1G", "--prefix"],
+            capture_output=True, text=True, input="")
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn("--memory, --prefix cannot be used with --hosts",
+                      proc.stderr)
+
+    def test_runs_every_host_with_logs(self):
+        results = self.run_fleet(["a", "bad", "b"], parallel=3)
+        self.assertEqual([r.status for r in results], ["ok", "exit 1", "ok"])
+        self.assertEqual([len(r.blocks) for r in results], [2, 1, 2])
+        self.assertEqual((self.tmp / "logs" / "a.log").read_text(),
+                         "[a] hi a\n[a] py a\n")
+
+    def test_fail_fast_skips_remaining_hosts(self):
+        results = self.run_fleet(["bad", "a", "b"], parallel=1,
+                                 fail_fast=True)
+        self.assertEqual([r.status for r in results],
+                         ["exit 1", "skipped", "skipped"])
+        self.assertFalse(any(r.ok for r in results))
+
+
+class TestJournal(unittest.TestCase):
+    """Append-only execution journal and ``til history`` statistics."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"TIL_STATE_DIR": self.temp_dir.name})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def usage(self, returncode=0, wall=1.0):
+        from til_cli.til_cli.runner import Usage
+        return Usage(returncode, wall, 0.1, 0.05, 1 << 20)
+
+    def test_execute_code_block_appends_a_record(self):
+        from til_cli.til_cli.journal import block_hash, read_journal
+        from til_cli.til_cli.runner import BlockRunner
+        with patch("builtins.input", return_value="y"), \
+                patch("sys.stdout"), self.assertLogs("til", level="INFO"):
+            code = execute_code_block(
+                "bash", "exit 3", runner=BlockRunner(), label="demo:Run#2",
+                journal={"slug": "demo", "section": "Run", "block": 2})
+        self.assertEqual(code, 3)
+        [record] = list(read_journal())
+        self.assertEqual(
+            {k: record[k] for k in ("slug", "section", "block", "hash",
+                                    "language", "returncode")},
+            {"slug": "demo", "section": "Run", "block": 2,
+             "hash": block_hash("exit 3"), "language": "bash",
+             "returncode": 3})
+        self.assertGreaterEqual(record["end"], record["start"])
+
+    def test_disabled_and_corrupt_lines(self):
+        from til_cli.til_cli.journal import (
+            append, journal_path, read_journal, record)
+        entry = record("demo", "Run", 1, "bash", "true", self.usage(), 0.0,
+                       host="pi-01")
+        with patch.dict(os.environ, {"TIL_JOURNAL": "off"}):
+            append(entry)
+        self.assertFalse(journal_path().exists())
+        append(entry)
+        with open(journal_path(), "a") as fh:
+            fh.write('{"truncated": \n')
+        append(entry)
+        self.assertEqual(list(read_journal()), [entry, entry])
+
+    def test_filters_and_stats(self):
+        from til_cli.til_cli.journal import (
+            block_stats, filter_records, parse_since, record)
+        records = [
+            record("demo", "Run", 1, "bash", "v1", self.usage(0, 1.0), 100.0,
+                   host="a"),
+            record("demo", "Run", 1, "bash", "v1", self.usage(1, 3.0), 200.0,
+                   host="b"),
+            record("demo", "Run", 1, "bash", "v2", self.usage(0, 2.0), 300.0,
+                   host="a"),
+            record("other", "Run", 1, "bash", "x", self.usage(), 400.0,
+                   host="a"),
+        ]
+        self.assertEqual(len(list(filter_records(records, slug="demo",
+                                                 host="a"))), 2)
+        self.assertEqual([r["start"] for r in filter_records(
+            records, failed=True)], [200.0])
+        self.assertEqual(len(list(filter_records(records, since=250))), 2)
+        stats = block_stats(records)
+        self.assertEqual([(r["slug"], r["runs"]) for r in stats],
+                         [("demo", 1), ("demo", 2), ("other", 1)])
+        self.assertEqual(stats[1]["failure_rate"], 0.5)
+        self.assertEqual(stats[1]["mean_wall"], 2.0)
+        self.assertEqual(stats[1]["hosts"], 2)
+        self.assertEqual(parse_since("2d", now=1000000.0), 1000000.0 - 172800)
+        with self.assertRaises(ValueError):
+            parse_since("soon")
+
+
+class TestDependencyGraph(unittest.TestCase):
+    """``requires:`` frontmatter, cycle detection and ``til plan`` steps."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def skill(self, slug, requires=""):
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: Test. Use when testing.\n"
+            f"{requires}---\n\n# {slug}\n")
+
+    def test_requires_forms(self):
+        parse = TILEntry._split_frontmatter
+        self.assertEqual(parse("---\nrequires: a, 'b'\n---\n")[0],
+                         {"requires": ["a", "b"]})
+        self.assertEqual(parse("---\nrequires: [a, b]\nname: x\n---\n")[0],
+                         {"requires": ["a", "b"], "name": "x"})
+        self.assertEqual(parse("---\nrequires:\n  - a\n  - b\n"
+                               "name: x\n---\n")[0],
+                         {"requires": ["a", "b"], "name": "x"})
+        self.assertEqual(parse("---\nrequires:\n---\n")[0], {"requires": []})
+        self.assertEqual(parse("---\nrequires:\n- a\n- b\nname: x\n---\n")[0],
+                         {"requires": ["a", "b"], "name": "x"})
+
+    def test_plan_levels(self):
+        self.skill("base")
+        self.skill("a", "requires: base\n")
+        self.skill("b", "requires:\n  - base\n")
+        self.skill("top", "requires: [a, b]\n")
+        self.skill("unrelated")
+        collection = TILCollection(self.root)
+        graph = collection.dependency_graph
+        self.assertIs(collection.dependency_graph, graph)
+        self.assertEqual(graph.plan("top"), [["base"], ["a", "b"], ["top"]])
+        self.assertEqual(graph.plan("base"), [["base"]])
+        self.assertEqual(graph.cycles, [])
+        self.assertEqual(graph.errors_for("top"), [])
+
+    def test_cycles_and_missing(self):
+        from til_cli.til_cli.deps import DependencyError
+        self.skill("loop1", "requires: loop2\n")
+        self.skill("loop2", "requires: loop1\n")
+        self.skill("self", "requires: self\n")
+        self.skill("after", "requires: loop1\n")
+        self.skill("orphan", "requires: nope\n")
+        graph = TILCollection(self.root).dependency_graph
+        self.assertEqual(graph.cycles, [["loop1", "loop2"], ["self"]])
+        self.assertEqual(graph.errors_for("loop2"),
+                         ["Dependency cycle: loop1, loop2"])
+        self.assertEqual(graph.errors_for("orphan"),
+                         ["Unknown required skill: nope"])
+        self.assertEqual(graph.errors_for("after"), [])
+        for slug in ("after", "self", "orphan", "missing"):
+            with self.assertRaises(DependencyError):
+                graph.plan(slug)
+
+    def test_graph_errors_on_every_validate_path(self):
+        import io
+        import json
+        from til_cli.til_cli.batch import run_batch
+        from til_cli.til_cli.server import Snapshot
+        self.skill("orphan", "requires: nope\n")
+        collection = TILCollection(self.root)
+        entry = collection.get_entry("orphan")
+        expected = ["Unknown required skill: nope"]
+        self.assertEqual(collection.validate(entry)[-1:], expected)
+        self.assertEqual(Snapshot(collection, {}).validate(entry)[-1:],
+                         expected)
+        out = io.StringIO()
+        run_batch(collection, ["validate orphan"], out.write)
+        self.assertEqual(json.loads(out.getvalue())["result"]["errors"][-1:],
+                         expected)
+
+
+class TestBlockStore(unittest.TestCase):
+    """Block ids, the deduplicated export and ``til dupes``."""
+
+    SETUP = ("sudo apt-get install -y gpiod\n"
+             "echo 'dtparam=act_led_trigger=heartbeat' | sudo tee -a "
+             "/boot/config.txt\nsudo reboot")
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "repo"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def skill(self, slug, *blocks):
+        skill_dir = self.root / "skills" / slug
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        fences = "".join(f"```bash\n{code}\n```\n\n" for code in blocks)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: {slug}\ndescription: Test. Use when testing.\n"
+            f"---\n\n# {slug}\n\n## Setup\n\n{fences}")
+
+    def test_block_ids(self):
+        from til_cli.til_cli.blocks import block_id
+        from til_cli.til_cli.journal import block_hash
+        self.assertEqual(block_id("echo hi  \r\nls\n\n"),
+                         block_id("\necho hi\nls"))
+        self.assertNotEqual(block_id("echo hi"), block_id("echo  hi"))
+        self.assertEqual(block_hash("echo hi"), block_id("echo hi"))
+        self.skill("alpha", "echo hi", "ls -la")
+        entry = TILCollection(self.root).get_entry("alpha")
+        self.assertEqual(entry.block_ids,
+                         [block_id("echo hi"), block_id("ls -la")])
+
+    def test_find_duplicates(self):
+        from til_cli.til_cli.blocks import find_duplicates
+        self.skill("rpi-led", self.SETUP, "cd ~")
+        self.skill("orangepi-led",
+                   self.SETUP.replace("/boot/config.txt",
+                                      "/boot/firmware/config.txt"), "cd ~")
+        self.skill("copy", self.SETUP)
+        self.skill("other", "brew install --cask ghostty && open -a Ghostty")
+        dupes = find_duplicates(TILCollection(self.root).entries)
+        self.assertEqual(len(dupes.identical), 1)
+        self.assertEqual(
+            [r.slug for r in dupes.store.refs[dupes.identical[0]]],
+            ["copy", "rpi-led"])
+        self.assertEqual(len(dupes.near), 1)
+        self.assertGreaterEqual(dupes.near[0].similarity, 0.7)
+        self.assertEqual(dupes.skill_pairs()[0],
+                         {"skills": ["copy", "rpi-led"],
+                          "identical": 1, "similar": 0})
+        self.assertEqual(
+            {tuple(row["skills"]) for row in dupes.skill_pairs()},
+            {("copy", "rpi-led"), ("copy", "orangepi-led"),
+             ("orangepi-led", "rpi-led")})
+        # "cd ~" is below --min-tokens; with no minimum it is a duplicate.
+        self.assertEqual(
+            len(find_duplicates(TILCollection(self.root).entries,
+                                min_tokens=0).identical), 2)
+
+    def test_exports_store_each_block_once(self):
+        import json
+        import sqlite3
+        from til_cli.til_cli.export import export_collection
+        self.skill("alpha", "echo shared", "echo alpha")
+        self.skill("beta", "echo shared")
+        db = Path(self.temp_dir.name) / "til.sqlite"
+        # An export in the previous schema is dropped and rebuilt.
+        conn = sqlite3.connect(str(db))
+        conn.executescript(
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+            "INSERT INTO meta VALUES ('schema_version', '1');"
+            "CREATE TABLE code_blocks (skill_id INTEGER, code TEXT);")
+        conn.close()
+        export_collection(TILCollection(self.root), db, "sqlite")
+        conn = sqlite3.connect(str(db))
+        try:
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM blocks").fetchone(), (2,))
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM code_blocks WHERE code = 'echo shared'"
+            ).fetchone(), (2,))
+        finally:
+            conn.close()
+        (self.root / "skills" / "alpha" / "SKILL.md").unlink()
+        export_collection(TILCollection(self.root), db, "sqlite")
+        conn = sqlite3.connect(str(db))
+        try:
+            self.assertEqual(conn.execute("SELECT code FROM blocks").fetchall(),
+                             [("echo shared",)])
+        finally:
+            conn.close()
+
+        out = Path(self.temp_dir.name) / "til.json"
+        self.skill("alpha", "echo shared")
+        export_collection(TILCollection(self.root), out, "json")
+        document = json.loads(out.read_text())
+        self.assertEqual(list(document["blocks"].values()), ["echo shared"])
+        ids = {r["code_blocks"][0]["block"] for r in document["skills"]}
+        self.assertEqual(ids, set(document["blocks"]))
+        self.assertNotIn("code", document["skills"][0]["code_blocks"][0])
+
+
+class TestFix(unittest.TestCase):
+    """``til fix``: fence tagging, H1 promotion, check mode."""
+
+    BROKEN = ("---\nname: tmux-copy\ndescription: \"Copy. Use when.\"\n"
+              "---\n\n## Tmux copy\n\n```\nset -g mode-keys vi\n```\n\n"
+              "```python\nprint(1)\n```\n\n```\ngit status\n```\n")
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        for slug in ("tmux-copy", "tmux-other"):
+            skill_dir = self.root / "skills" / slug
+            skill_dir.mkdir(parents=True)
+            (skill_dir / "SKILL.md").write_text(
+                self.BROKEN.replace("tmux-copy", slug))
+        clean_dir = self.root / "skills" / "clean"
+        clean_dir.mkdir(parents=True)
+        (clean_dir / "SKILL.md").write_text(
+            "---\nname: clean\ndescription: \"Clean. Use when.\"\n---\n\n"
+            "# Clean\n\n```bash\nls\n```\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fix_text(self):
+        from til_cli.til_cli.fix import fix_text
+        new, tagged, promoted, skipped = fix_text(self.BROKEN, "tmux-copy")
+        self.assertEqual((tagged, promoted, skipped), (2, True, 0))
+        self.assertIn("\n# Tmux copy\n", new)
+        self.assertIn("```tmux\nset -g", new)
+        self.assertIn("```python\nprint(1)", new)
+        self.assertIn("```bash\ngit status\n```\n", new)
+        self.assertTrue(new.startswith("---\nname: tmux-copy\n"))
+        self.assertEqual(fix_text(new, "tmux-copy"), (new, 0, False, 0))
+
+    def test_low_confidence_guesses_are_skipped(self):
+        from til_cli.til_cli.fix import fix_text
+        text = "# T\n\n```\nfrobnicate --all\n```\n"
+        self.assertEqual(fix_text(text, "misc")[1:], (0, False, 1))
+        new, tagged, _, skipped = fix_text(text, "misc", min_confidence=0.2)
+        self.assertEqual((tagged, skipped), (1, 0))
+        self.assertIn("```bash\n", new)
+
+    def test_check_mode_does_not_write(self):
+        from til_cli.til_cli.fix import fix_files, skill_paths
+        paths = skill_paths([self.root])
+        before = [p.read_text() for p in paths]
+        results = fix_files(paths, write=False)
+        self.assertEqual([p.read_text() for p in paths], before)
+        self.assertEqual([r.changed for r in results], [False, True, True])
+        self.assertIn("+```tmux", results[1].diff())
+
+    def test_writes_only_changed_files(self):
+        from til_cli.til_cli.fix import fix_files, skill_paths
+        clean = self.root / "skills" / "clean" / "SKILL.md"
+        os.utime(clean, ns=(1, 1))
+        results = fix_files(skill_paths([self.root]), jobs=2)
+        self.assertEqual(sum(r.changed for r in results), 2)
+        self.assertEqual(clean.stat().st_mtime_ns, 1)
+        for entry in TILCollection(self.root).entries:
+            self.assertEqual(validate_entry(entry), [], entry.slug)
+
+    def test_unknown_entry(self):
+        from til_cli.til_cli.fix import skill_paths
+        with self.assertRaises(FileNotFoundError):
+            skill_paths([self.root], ["missing"])
+
+
+class TestLanguageInference(unittest.TestCase):
+    """Rule table and confidence scores in ``til_cli.langinfer``."""
+
+    def test_rules(self):
+        from til_cli.til_cli.langinfer import infer
+        cases = [
+            ("#!/usr/bin/env python3\nprint(1)", "x", "python", "shebang"),
+            ("#!/bin/sh\necho", "x", "sh", "shebang"),
+            ('" vimrc\nsyntax enable', "x", "vim", "vim"),
+            ("font-family = Iosevka", "x", "conf", "app-config"),
+            ("set -g mouse on", "tmux-mouse", "tmux", "tmux-directive"),
+            ("theme = onedark", "hx-theme", "conf", "app-config"),
+            ("[editor]\nline-number = \"relative\"", "hx-x", "bash",
+             "fallback"),
+            ("line-number = 1", "hx-x", "toml", "helix-config"),
+            ("dtoverlay=disable-bt", "x", "conf", "boot-config"),
+            ("\n  git log --oneline", "x", "bash", "shell-command"),
+            ("<prefix>:list-keys", "x", "text", "tmux-keys"),
+            ("", "x", "text", "empty"),
+        ]
+        for code, slug, language, rule in cases:
+            guess = infer(code, slug)
+            self.assertEqual((guess.language, guess.rule), (language, rule),
+                             code)
+        self.assertGreater(infer("git status").confidence,
+                           infer("frobnicate").confidence)
+
+    def test_suggest_tags(self):
+        from til_cli.til_cli.langinfer import suggest_tags
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "skills" / "demo" / "SKILL.md"
+            path.parent.mkdir(parents=True)
+            path.write_text("# Demo\n\n```bash\nls\n```\n\n```\n"
+                            "brew install jq\n```\n")
+            suggestions = suggest_tags(TILEntry(path))
+        self.assertEqual([(line, g.language) for line, g in suggestions],
+                         [(7, "bash")])
+
+
 class TestRenderer(unittest.TestCase):
     """Renderer selection rules for ``til show``."""
 
@@ -513,6 +2371,89 @@ class TestRenderer(unittest.TestCase):
             self.assertIsNone(render_mod.pick_renderer(
                 tty=True, env={"TIL_RENDERER": "bat"}))
 
+    def test_with_width(self):
+        from til_cli.til_cli.render import with_width
+        self.assertEqual(with_width(["/bin/bat", "--paging=never"], 100),
+                         ["/bin/bat", "--paging=never",
+                          "--terminal-width=100"])
+        self.assertEqual(with_width(["/bin/glow", "-s", "dracula", "-"], 80),
+                         ["/bin/glow", "-s", "dracula", "-w", "80", "-"])
+
+    def _render(self, content, argv, cache):
+        import io
+        from til_cli.til_cli import render as render_mod
+        out = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with patch.object(render_mod, "pick_renderer", return_value=argv), \
+                patch.object(render_mod.sys, "stdout", out):
+            code = render_mod.render(content, cache=cache)
+            out.flush()
+            return code, out.buffer.getvalue()
+
+    def test_render_cache(self):
+        from til_cli.til_cli.render import RenderCache
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            calls = tmp_path / "calls"
+            renderer = tmp_path / "fake-renderer"
+            renderer.write_text(
+                f"#!/bin/sh\necho x >> {calls}\nprintf '\\033[1m'\n"
+                "tr a-z A-Z\n")
+            renderer.chmod(0o755)
+            cache = RenderCache(tmp_path / "render", 1 << 20)
+            argv = [str(renderer)]
+
+            self.assertEqual(self._render("# hi\n", argv, cache),
+                             (0, b"\033[1m# HI\n"))
+            self.assertEqual(self._render("# hi\n", argv, cache),
+                             (0, b"\033[1m# HI\n"))
+            self.assertEqual(len(calls.read_text().split()), 1)
+            self._render("# changed\n", argv, cache)
+            self.assertEqual(len(calls.read_text().split()), 2)
+            # A changed renderer binary invalidates its entries.
+            st = renderer.stat()
+            os.utime(renderer, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            self._render("# hi\n", argv, cache)
+            self.assertEqual(len(calls.read_text().split()), 3)
+
+    def test_render_cache_key_covers_bat_config(self):
+        from til_cli.til_cli.render import RenderCache, bat_config_files
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            bat = tmp_path / "bin" / "bat"
+            bat.parent.mkdir()
+            bat.write_text("")
+            config = tmp_path / "xdg" / "bat" / "config"
+            config.parent.mkdir(parents=True)
+            config.write_text("--theme=Nord\n")
+            env = {"XDG_CONFIG_HOME": str(tmp_path / "xdg")}
+            self.assertEqual(bat_config_files(env)[-1], str(config))
+            self.assertEqual(
+                bat_config_files(dict(env, BAT_CONFIG_PATH="/b/c")),
+                ["/etc/bat/config", "/b/c"])
+
+            argv = [str(bat), "--color=always"]
+            key = RenderCache.key("# hi\n", argv, env)
+            self.assertEqual(RenderCache.key("# hi\n", argv, env), key)
+            config.write_text("--theme=Dracula\n")
+            self.assertNotEqual(RenderCache.key("# hi\n", argv, env), key)
+
+    def test_render_cache_evicts_least_recently_used(self):
+        from til_cli.til_cli.render import RenderCache
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = RenderCache(Path(tmp) / "render", 250)
+            for i, key in enumerate(("old", "used", "new")):
+                cache.put(key, b"x" * 100)
+                path = cache.directory / key
+                os.utime(path, ns=(i * 10**9, i * 10**9))
+                if key == "used":
+                    self.assertEqual(cache.get("old"), b"x" * 100)
+            # "old" was read after "used" was written, so "used" goes.
+            self.assertEqual(sorted(p.name for p in
+                                    cache.directory.iterdir()),
+                             ["new", "old"])
+            cache.put("huge", b"x" * 300)
+            self.assertIsNone(cache.get("huge"))
+
     def test_til_show_plain_flag_end_to_end(self):
         """`til show --plain` emits raw markdown to a pipe."""
         import subprocess
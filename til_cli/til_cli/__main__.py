@@ -6,22 +6,61 @@ TIL CLI Tool - Manage Today I Learned entries
 Command-line interface for the TIL CLI Tool.
 """
 import argparse
+import json
 import logging
 import os
+import re
+import sqlite3
 import sys
 import subprocess
+import time
 from pathlib import Path
 import platform as sys_platform  # Rename to avoid conflicts
 
 # Import core functionality
 from til_cli.til import (
-    TILCollection,
     execute_code_block,
-    validate_entry,
-    get_til_repo_path,
-    check_for_repo_updates
+    get_til_repo_paths,
+    check_for_repo_updates,
+    load_collection,
+    split_repo_paths,
+)
+from til_cli.backends import backend_name
+from til_cli.batch import run_batch
+from til_cli.blocks import (
+    DEFAULT_MIN_TOKENS, DEFAULT_THRESHOLD, find_duplicates)
+from til_cli.catalog import body_text, load_body, load_catalog
+from til_cli.deps import DependencyError
+from til_cli.completion import selection_spec, write_cache as write_completion_cache
+from til_cli.config import get_setting, read_config, state_dir, write_repo_path
+from til_cli.export import (
+    FORMATS as EXPORT_FORMATS, ExportError, export_collection)
+from til_cli.fix import DEFAULT_MIN_CONFIDENCE, fix_files, skill_paths
+from til_cli.fleet import (
+    DEFAULT_PARALLEL,
+    TRANSPORTS,
+    create_transport,
+    read_hosts,
+    run_fleet,
+)
+from til_cli.gitstore import GitStoreError
+from til_cli.journal import (
+    block_stats,
+    filter_records,
+    parse_since,
+    read_journal,
+)
+from til_cli.langinfer import suggest_tags
+from til_cli.query import QuerySyntaxError, parse_query
+from til_cli.render import color_enabled, render as render_markdown
+from til_cli.runner import BlockRunner, Limits, parse_timeout
+from til_cli.search import find_matches, regex_search
+from til_cli.server import (
+    DEFAULT_WORKERS as DEFAULT_HTTP_WORKERS,
+    PooledHTTPServer,
+    SkillService,
+    parse_address,
 )
-from til_cli.render import render as render_markdown
 
 # Configure logging
 logging.basicConfig(
@@ -35,19 +74,217 @@ logger = logging.getLogger("til")
 def auto_update_repository(repo_path, command):
     """Automatically update repository if needed based on command type"""
     if command in ('update', '_complete'):
-        # 'update' handles its own pull. '_complete' must stay fast and
-        # side-effect-free.
+        # 'update' handles its own pull. '_complete' must stay fast; its
+        # only side effect is refreshing the completion cache, like every
+        # command that loads the collection.
         return
     # Only force update for commands that depend on content
     force_update = command in ['list', 'search', 'show', 'execute']
     check_for_repo_updates(repo_path, force=force_update)
 
 
+def _describe(collection, entry) -> str:
+    """``str(entry)``, plus the source repository when several are loaded."""
+    label = collection.source_label(entry)
+    return f"{entry} [{label}]" if label else str(entry)
+
+
+def _pull_repository(repo_path: Path) -> int:
+    """``git pull`` one repository for ``til update``."""
+    print(f"Updating TIL repository at: {repo_path}")
+    try:
+        # Check if it's a git repository
+        git_dir = repo_path / '.git'
+        if not git_dir.is_dir():
+            logger.error(f"Error: Not a git repository: {repo_path}")
+            return 1
+
+        # Run git pull
+        result = subprocess.run(
+            ['git', 'pull'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True
+        )
+
+        if result.returncode == 0:
+            print(f"Successfully updated:\n{result.stdout}")
+            return 0
+        else:
+            logger.error(
+                f"Error updating repository:\n{result.stderr}")
+            return 1
+    except Exception as e:
+        logger.error(f"Error updating repository: {e}")
+        return 1
+
+
+def _entry_record(collection, entry) -> dict:
+    """``entry.to_dict()`` plus the repository it was loaded from."""
+    return dict(entry.to_dict(), repo=str(collection.root_for(entry)))
+
+
+def _emit_records(records, output: str) -> None:
+    """Write ``records`` as a JSON array or as NDJSON.
+
+    NDJSON lines are flushed one by one so a consumer (``| jq``) sees each
+    record as soon as it is produced.
+    """
+    if output == 'ndjson':
+        for record in records:
+            sys.stdout.write(json.dumps(record) + '\n')
+            sys.stdout.flush()
+        return
+    json.dump(list(records), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+def _print_dupes(dupes, threshold: float) -> None:
+    refs = dupes.store.refs
+    if not dupes.identical and not dupes.near:
+        print("No duplicate code blocks found.")
+        return
+    if dupes.identical:
+        print("Identical blocks:")
+        for bid in dupes.identical:
+            lines = dupes.store.code[bid].count('\n') + 1
+            print(f"  {bid} ({lines} line{'s' if lines != 1 else ''}):")
+            for ref in refs[bid]:
+                print(f"    {ref.label()}")
+    if dupes.near:
+        if dupes.identical:
+            print()
+        print(f"Near-identical blocks (similarity >= {threshold:g}):")
+        for pair in dupes.near:
+            print(f"  {pair.similarity:.2f}  "
+                  f"{', '.join(r.label() for r in refs[pair.a])}")
+            print(f"        {', '.join(r.label() for r in refs[pair.b])}")
+    pairs = dupes.skill_pairs()
+    if pairs:
+        print()
+        print("Skills sharing blocks:")
+        for row in pairs:
+            print(f"  {row['skills'][0]}  {row['skills'][1]}  "
+                  f"({row['identical']} identical, {row['similar']} similar)")
+
+
+# ``til execute`` resource-limit options, in ``Limits.parse`` order; each
+# defaults to the ``execute_<name>`` setting for local runs.
+_LIMIT_OPTIONS = ('memory', 'cpu', 'nice', 'ionice', 'max_concurrent')
+
+
+def _execute_on_hosts(entry, args, blocks) -> int:
+    """``til execute --hosts``: run ``blocks`` on every host, summarise."""
+    local_only = [f"--{name.replace('_', '-')}"
+                  for name in (*_LIMIT_OPTIONS, 'log', 'prefix')
+                  if getattr(args, name) not in (None, False)]
+    if local_only:
+        logger.error(f"{', '.join(local_only)} cannot be used with --hosts "
+                     "(fleet output is always prefixed and logged per host; "
+                     "see --log-dir)")
+        return 1
+    try:
+        hosts = read_hosts(Path(args.hosts))
+        transport = create_transport(args.transport)
+        timeout = parse_timeout(args.timeout)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+    if not hosts:
+        logger.error(f"No hosts in {args.hosts}")
+        return 1
+
+    for block in blocks:
+        print(f"Executing {block.language} code:")
+        for line in block.code.split('\n'):
+            print(f"  {line}")
+    confirm = input(f"Continue with execution on {len(hosts)} host(s) "
+                    f"via {transport.name}? [y/N] ")
+    if confirm.lower() != 'y':
+        print("Execution cancelled")
+        return 0
+
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    log_dir = (Path(args.log_dir) if args.log_dir else
+               state_dir() / 'fleet' / f"{entry.slug}-{stamp}")
+    try:
+        results = run_fleet(hosts, blocks, log_dir, transport,
+                            parallel=args.parallel, fail_fast=args.fail_fast,
+                            timeout=timeout, timestamps=args.timestamps,
+                            journal={'slug': entry.slug,
+                                     'section': args.section})
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    width = max(len(r.host) for r in results)
+    for r in results:
+        ran = r.returncode is not None
+        timing = f"{r.wall:7.1f}s" if ran else f"{'-':>8}"
+        print(f"{r.host:<{width}}  {r.status:<9}  {timing}  "
+              f"{r.log if ran else '-'}")
+    failed = sum(not r.ok for r in results)
+    print(f"{len(results) - failed}/{len(results)} host(s) succeeded; "
+          f"logs in {log_dir}")
+    return 1 if failed else 0
+
+
+def _history(args) -> int:
+    """``til history``: journal records (or per-block statistics)."""
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    records = list(filter_records(
+        read_journal(), slug=args.entry, section=args.section,
+        host=args.host, since=since, failed=args.failed))
+    if args.limit is not None:
+        records = records[-args.limit:] if args.limit > 0 else []
+
+    if args.stats:
+        rows = block_stats(records)
+        if args.output:
+            _emit_records(rows, args.output)
+            return 0
+        for row in rows:
+            print(f"{row['slug']}:{row['section']}#{row['block']} "
+                  f"[{row['hash'][:8]}]  runs {row['runs']}  "
+                  f"failed {row['failure_rate']:.0%}  "
+                  f"mean {row['mean_wall']:.2f}s  max {row['max_wall']:.2f}s  "
+                  f"hosts {row['hosts']}")
+        return 0
+
+    if args.output:
+        _emit_records(records, args.output)
+        return 0
+    for record in records:
+        started = time.strftime('%Y-%m-%d %H:%M:%S',
+                                time.localtime(record.get('start', 0)))
+        status = ('timed out' if record.get('timed_out')
+                  else f"exit {record.get('returncode')}")
+        print(f"{started}  {record.get('host')}  "
+              f"{record.get('slug')}:{record.get('section')}"
+              f"#{record.get('block')}  {status}  "
+              f"{record.get('wall', 0):.2f}s")
+    return 0
+
+
+def _highlighter():
+    """Return a function that highlights a search match, or ``None``."""
+    if not color_enabled():
+        return None
+    return lambda text: f"\033[1;31m{text}\033[0m"
+
+
 # Public, user-facing subcommands. Single source of truth used by both the
-# argument parser and the completion helper.
+# argument parser and the completion helper; completions/til.bash and
+# completions/_til list them too, so the first word completes without
+# starting Python.
 _PUBLIC_COMMANDS = (
     'list', 'search', 'show', 'execute', 'validate',
-    'version', 'config', 'update',
+    'version', 'config', 'update', 'export', 'catalog', 'body', 'serve',
+    'batch', 'fix', 'history', 'plan', 'dupes',
 )
 
 
@@ -99,8 +336,13 @@ def _handle_complete(argv: list) -> int:
             print(cmd)
         return 0
 
-    root_dir = Path(repo_path) if repo_path else get_til_repo_path()
-    collection = TILCollection(root_dir)
+    root_dirs = (split_repo_paths(repo_path) if repo_path
+                 else get_til_repo_paths())
+    if not root_dirs:
+        return 0
+    collection = load_collection(root_dirs)
+    # Let the next Tab read the cache instead of starting Python again.
+    write_completion_cache(collection, selection_spec(repo_path))
 
     if what == 'slugs':
         for entry in sorted(collection.entries, key=lambda e: e.slug):
@@ -134,33 +376,212 @@ def main():
         subparsers = parser.add_subparsers(
             dest='command', help='Command to run')
 
+        # Structured output flags shared by list/search/show/validate.
+        output_parent = argparse.ArgumentParser(add_help=False)
+        output_group = output_parent.add_mutually_exclusive_group()
+        output_group.add_argument(
+            '--json', dest='output', action='store_const', const='json',
+            help='Print results as one JSON array')
+        output_group.add_argument(
+            '--ndjson', dest='output', action='store_const', const='ndjson',
+            help='Print one JSON object per line as each result is produced')
+
         # List command
-        subparsers.add_parser('list', help='List TIL entries')
+        subparsers.add_parser(
+            'list', help='List TIL entries', parents=[output_parent])
 
         # Search command
         search_parser = subparsers.add_parser(
-            'search', help='Search TIL entries')
-        search_parser.add_argument('term', help='Search term')
+            'search', help='Search TIL entries', parents=[output_parent])
+        search_parser.add_argument(
+            'term', nargs='+',
+            help='Search query: words, "phrases", field filters '
+                 '(name:, title:, description:, section:, lang:, '
+                 'executable:) and AND/OR/NOT')
+        search_parser.add_argument(
+            '--regex', action='store_true',
+            help='Treat the term as a regular expression and report '
+                 'matching lines')
+        search_parser.add_argument(
+            '--limit', type=int, metavar='N',
+            help='Stop after N results')
+        search_parser.add_argument(
+            '--jobs', type=int, default=1, metavar='N',
+            help='Worker processes for --regex scans (default: 1)')
 
         # Show command
-        show_parser = subparsers.add_parser('show', help='Show a TIL entry')
+        show_parser = subparsers.add_parser(
+            'show', help='Show a TIL entry', parents=[output_parent])
         show_parser.add_argument('entry', help='Entry path or name')
         show_parser.add_argument(
             '--plain', action='store_true',
             help='Disable Markdown rendering; print raw text')
 
+        # Catalog command
+        subparsers.add_parser(
+            'catalog',
+            help='List every skill\'s frontmatter without reading bodies',
+            parents=[output_parent])
+
+        # Body command
+        body_parser = subparsers.add_parser(
+            'body', help='Print one skill without its frontmatter',
+            parents=[output_parent])
+        body_parser.add_argument('entry', help='Skill slug')
+
         # Execute command
         exec_parser = subparsers.add_parser(
             'execute', help='Execute a TIL entry section')
         exec_parser.add_argument('entry', help='Entry path or name')
         exec_parser.add_argument('section', help='Section name to execute')
+        exec_parser.add_argument(
+            '--timeout', metavar='SECONDS',
+            default=get_setting('execute_timeout'),
+            help='Kill a block (and its children) after SECONDS; a '
+                 '"timeout=N" fence option overrides it (default: none)')
+        exec_parser.add_argument(
+            '--timestamps', action='store_true',
+            help='Stream output line by line with a timestamp on each line')
+        exec_parser.add_argument(
+            '--prefix', action='store_true',
+            help='Stream output line by line prefixed with the block name')
+        exec_parser.add_argument(
+            '--log', metavar='FILE',
+            help='Also append the streamed output to FILE')
+        fleet_group = exec_parser.add_argument_group(
+            'fleet execution (run the section on many hosts)')
+        fleet_group.add_argument(
+            '--hosts', metavar='FILE',
+            help='Run on every host listed in FILE (one per line)')
+        fleet_group.add_argument(
+            '--parallel', type=int, metavar='N', default=DEFAULT_PARALLEL,
+            help=f'Hosts to run at once (default: {DEFAULT_PARALLEL})')
+        fleet_group.add_argument(
+            '--transport', choices=sorted(TRANSPORTS), default='ssh',
+            help='How blocks reach a host (default: ssh HOST bash -s)')
+        fleet_group.add_argument(
+            '--fail-fast', action='store_true',
+            help='Start no more hosts once one has failed')
+        fleet_group.add_argument(
+            '--log-dir', metavar='DIR',
+            help='Per-host logs (default: under the state directory)')
+        limits_group = exec_parser.add_argument_group(
+            'resource limits (defaults: the execute_* settings; '
+            'not with --hosts)')
+        limits_group.add_argument(
+            '--memory', metavar='SIZE',
+            help='Address-space limit per block, e.g. 512M (RLIMIT_AS)')
+        limits_group.add_argument(
+            '--cpu', metavar='SECONDS',
+            help='CPU time limit per block (RLIMIT_CPU)')
+        limits_group.add_argument(
+            '--nice', metavar='N',
+            help='Niceness increment for each block')
+        limits_group.add_argument(
+            '--ionice', metavar='LEVEL',
+            help='I/O priority: best-effort level 0-7, or idle')
+        limits_group.add_argument(
+            '--max-concurrent', metavar='N',
+            help='Blocks run at once by all til processes on this machine')
 
         # Validate command
         validate_parser = subparsers.add_parser(
-            'validate', help='Validate TIL entries')
+            'validate', help='Validate TIL entries', parents=[output_parent])
         validate_parser.add_argument(
             'entry', nargs='?', help='Entry path (or all if not specified)')
 
+        # Export command
+        export_parser = subparsers.add_parser(
+            'export', help='Export the parsed collection to one file')
+        export_parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='sqlite',
+            help='Output format (default: sqlite)')
+        export_parser.add_argument(
+            '-o', '--output', metavar='FILE',
+            help='Output file (default: til-export.sqlite or '
+                 'til-export.json); an existing export is updated in place')
+
+        # Fix command
+        fix_parser = subparsers.add_parser(
+            'fix', help='Tag untagged code fences and promote a missing H1')
+        fix_parser.add_argument(
+            'entries', nargs='*', metavar='ENTRY',
+            help='Skill slugs or SKILL.md paths (default: every skill)')
+        fix_mode = fix_parser.add_mutually_exclusive_group()
+        fix_mode.add_argument(
+            '--check', action='store_true',
+            help='Print diffs without writing; exit 1 if any file would '
+                 'change')
+        fix_mode.add_argument(
+            '--diff', action='store_true',
+            help='Print diffs without writing')
+        fix_parser.add_argument(
+            '--jobs', type=int, default=1, metavar='N',
+            help='Worker processes (default: 1)')
+        fix_parser.add_argument(
+            '--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+            metavar='X',
+            help='Only apply inferred fence languages with at least this '
+                 f'confidence, 0-1 (default: {DEFAULT_MIN_CONFIDENCE})')
+
+        # Batch command
+        subparsers.add_parser(
+            'batch',
+            help='Answer show/search/sections/validate requests read from '
+                 'stdin, one JSON line each')
+
+        # Serve command
+        serve_parser = subparsers.add_parser(
+            'serve', help='Serve the collection over HTTP (read-only JSON)')
+        serve_parser.add_argument(
+            '--http', required=True, metavar='HOST:PORT',
+            help='Address to listen on, e.g. 127.0.0.1:8765')
+        serve_parser.add_argument(
+            '--workers', type=int, default=DEFAULT_HTTP_WORKERS, metavar='N',
+            help=f'Request handler threads (default: {DEFAULT_HTTP_WORKERS})')
+
+        # Plan command
+        plan_parser = subparsers.add_parser(
+            'plan', help='Show the skills to apply, in order, for one skill',
+            parents=[output_parent])
+        plan_parser.add_argument('entry', help='Skill slug')
+
+        # Dupes command
+        dupes_parser = subparsers.add_parser(
+            'dupes', help='Report identical and near-identical code blocks',
+            parents=[output_parent])
+        dupes_parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_THRESHOLD, metavar='X',
+            help='Shingle similarity, 0-1, for near-identical blocks '
+                 f'(default: {DEFAULT_THRESHOLD})')
+        dupes_parser.add_argument(
+            '--min-tokens', type=int, default=DEFAULT_MIN_TOKENS, metavar='N',
+            help='Ignore blocks shorter than N tokens '
+                 f'(default: {DEFAULT_MIN_TOKENS})')
+
+        # History command
+        history_parser = subparsers.add_parser(
+            'history', help='Show executed blocks from the execution journal',
+            parents=[output_parent])
+        history_parser.add_argument(
+            'entry', nargs='?', help='Only runs of this skill slug')
+        history_parser.add_argument(
+            '--section', help='Only runs of this section')
+        history_parser.add_argument(
+            '--host', help='Only runs on this host')
+        history_parser.add_argument(
+            '--since', metavar='WHEN',
+            help='Only runs started since WHEN (7d, 12h, 2024-05-01)')
+        history_parser.add_argument(
+            '--failed', action='store_true',
+            help='Only runs that exited non-zero or timed out')
+        history_parser.add_argument(
+            '--limit', type=int, metavar='N',
+            help='Only the N most recent runs')
+        history_parser.add_argument(
+            '--stats', action='store_true',
+            help='Runs, failure rate and mean duration per block instead')
+
         # Version command
         subparsers.add_parser('version', help='Show version information')
 
@@ -169,6 +590,10 @@ def main():
             'config', help='Configure TIL repository location')
         config_parser.add_argument(
             'path', nargs='?', help='Path to TIL repository')
+        config_parser.add_argument(
+            '--add', action='store_true',
+            help='Add PATH as an extra repository (lower precedence) '
+                 'instead of replacing the configured one')
 
         # Update command
         subparsers.add_parser(
@@ -181,6 +606,11 @@ def main():
 
         # Add global repo-path argument
         parser.add_argument('--repo-path', help='Path to TIL repository')
+        parser.add_argument(
+            '--ref', metavar='REF',
+            help='Read skills from this git revision (e.g. HEAD, a tag or '
+                 'branch) instead of the working tree; works on bare '
+                 'mirrors')
 
         # Parse args
         args = parser.parse_args()
@@ -189,15 +619,21 @@ def main():
             parser.print_help()
             return 0
 
-        # Get repository path
-        if hasattr(args, 'repo_path') and args.repo_path:
-            root_dir = Path(args.repo_path)
+        # Get repository paths (several with ``a:b`` or multi-line config;
+        # the first one wins on slug conflicts).
+        if getattr(args, 'repo_path', None) is not None:
+            root_dirs = [Path(p) for p in args.repo_path.split(os.pathsep)
+                         if p]
+            if not root_dirs:
+                logger.error(f"No repository path in --repo-path "
+                             f"'{args.repo_path}'")
+                return 1
         else:
-            root_dir = get_til_repo_path()
+            root_dirs = get_til_repo_paths()
+        root_dir = root_dirs[0]
 
         # Handle config command (This must be handled before initializing the collection)
         if args.command == 'config':
-            config_path = Path.home() / '.tilconfig'
             if args.path:
                 repo_path = Path(args.path).resolve()
 
@@ -205,45 +641,216 @@ def main():
                     logger.error(f"Error: Not a valid directory: {repo_path}")
                     return 1
 
-                config_path.write_text(str(repo_path))
-                print(f"TIL repository path set to: {repo_path}")
+                write_repo_path(repo_path, append=args.add)
+                if args.add:
+                    print(f"TIL repository added: {repo_path}")
+                else:
+                    print(f"TIL repository path set to: {repo_path}")
                 return 0
 
-            elif config_path.exists():
-                repo_path = Path(config_path.read_text().strip())
-                print(f"TIL repository path: {repo_path}")
+            elif read_config()[0]:
+                for repo_path in read_config()[0]:
+                    print(f"TIL repository path: {repo_path}")
                 return 0
 
+        # The journal is per machine, not per repository.
+        if args.command == 'history':
+            return _history(args)
+
         # NOTE: ``args.command == '_complete'`` is unreachable here because
         # ``_handle_complete`` runs at the top of ``main()`` and the
         # subparser is no longer registered. No special-case needed.
 
-        # Automatically update repository if needed
-        auto_update_repository(root_dir, args.command)
+        # Automatically update repositories if needed
+        for repo in root_dirs:
+            auto_update_repository(repo, args.command)
+
+        # Frontmatter-only and single-skill reads never load the whole
+        # collection.
+        if args.command == 'catalog':
+            try:
+                records = load_catalog(root_dirs, ref=args.ref)
+            except GitStoreError as e:
+                logger.error(f"Error: {e}")
+                return 1
+            if args.output:
+                _emit_records(records, args.output)
+            else:
+                for record in records:
+                    description = record['frontmatter'].get('description', '')
+                    print(f"{record['slug']}: {description}")
+            return 0
+
+        if args.command == 'body':
+            try:
+                entry = load_body(root_dirs, args.entry, ref=args.ref)
+                if entry is None:
+                    # Not a slug: fall back to the full lookup cascade.
+                    entry = load_collection(
+                        root_dirs, ref=args.ref).get_entry(args.entry)
+            except GitStoreError as e:
+                logger.error(f"Error: {e}")
+                return 1
+            if not entry:
+                logger.error(f"Entry not found: {args.entry}")
+                return 1
+            if args.output:
+                _emit_records([{'slug': entry.slug, 'path': str(entry.path),
+                                'body': body_text(entry)}], args.output)
+            else:
+                sys.stdout.write(body_text(entry))
+            return 0
+
+        if args.command == 'fix':
+            if args.ref:
+                logger.error("Error: til fix rewrites files; it cannot be "
+                             "used with --ref")
+                return 1
+            try:
+                paths = skill_paths(root_dirs, args.entries)
+                results = fix_files(paths, write=not (args.check or args.diff),
+                                    jobs=args.jobs,
+                                    min_confidence=args.min_confidence)
+            except OSError as e:
+                logger.error(f"Error: {e}")
+                return 1
+            changed = [result for result in results if result.changed]
+            if changed and not (args.check or args.diff):
+                write_completion_cache(load_collection(root_dirs),
+                                       selection_spec(args.repo_path))
+            if args.check or args.diff:
+                for result in changed:
+                    sys.stdout.write(result.diff())
+                return 1 if args.check and changed else 0
+            print(f"Updated {len(changed)} files; "
+                  f"{sum(r.blocks_tagged for r in changed)} fences tagged, "
+                  f"{sum(r.h1_promoted for r in changed)} H1 headings "
+                  f"promoted.")
+            for result in results:
+                if result.changed or result.blocks_skipped:
+                    print(result)
+            skipped = sum(r.blocks_skipped for r in results)
+            if skipped:
+                print(f"{skipped} fences left untagged: no language guess "
+                      f"reached confidence {args.min_confidence}.")
+            return 0
+
+        if args.command == 'serve':
+            try:
+                address = parse_address(args.http)
+                service = SkillService(root_dirs, ref=args.ref)
+                server = PooledHTTPServer(address, service, args.workers)
+            except (ValueError, OSError, GitStoreError) as e:
+                logger.error(f"Error: {e}")
+                return 1
+            host, port = server.server_address[:2]
+            print(f"Serving {len(service.collection.entries)} skills on "
+                  f"http://{host}:{port}/", flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+            return 0
 
         # Initialize TIL collection
-        collection = TILCollection(root_dir)
+        try:
+            collection = load_collection(root_dirs, ref=args.ref)
+        except GitStoreError as e:
+            logger.error(f"Error: {e}")
+            return 1
+        write_completion_cache(collection, selection_spec(args.repo_path))
 
         # Execute command
         if args.command == 'list':
             entries = collection.entries
 
-            for entry in sorted(entries, key=lambda e: e.title):
-                print(entry)
+            entries = sorted(entries, key=lambda e: e.title)
+            if args.output:
+                _emit_records((_entry_record(collection, entry)
+                               for entry in entries), args.output)
+            else:
+                for entry in entries:
+                    print(_describe(collection, entry))
 
         elif args.command == 'search':
-            results = collection.search(args.term)
-            if results:
+            term = ' '.join(args.term)
+            if args.regex:
+                try:
+                    hits = regex_search(collection.entries, term,
+                                        limit=args.limit, workers=args.jobs)
+                except re.error as e:
+                    logger.error(f"Invalid regular expression: {e}")
+                    return 1
+                if args.output:
+                    _emit_records((hit.to_dict() for hit in hits),
+                                  args.output)
+                elif hits:
+                    print(f"Found {len(hits)} matching lines:")
+                    for hit in hits:
+                        print(hit)
+                else:
+                    print("No matching entries found")
+                return 0
+
+            if backend_name() != 'linear':
+                # Ranked full-text search through the configured engine
+                # (``TIL_SEARCH_BACKEND``) instead of the query language.
+                try:
+                    hits = collection.search_backend.search(
+                        term, limit=args.limit)
+                except (ValueError, sqlite3.Error) as e:
+                    logger.error(f"Search backend error: {e}")
+                    return 1
+                if args.output:
+                    _emit_records((dict(_entry_record(collection, hit.entry),
+                                        score=hit.score,
+                                        snippet=hit.snippet())
+                                   for hit in hits), args.output)
+                elif hits:
+                    highlight = _highlighter()
+                    print(f"Found {len(hits)} matching entries:")
+                    for hit in hits:
+                        print(_describe(collection, hit.entry))
+                        print(f"    {hit.snippet(highlight=highlight)}")
+                else:
+                    print("No matching entries found")
+                return 0
+
+            try:
+                node = parse_query(term)
+                results = collection.query(term)
+            except QuerySyntaxError as e:
+                logger.error(f"Invalid search query: {e}")
+                return 1
+            if args.limit is not None:
+                results = results[:max(args.limit, 0)]
+            if args.output:
+                _emit_records((
+                    dict(_entry_record(collection, entry),
+                         matches=[m.to_dict()
+                                  for m in find_matches(entry, node)])
+                    for entry in results
+                ), args.output)
+            elif results:
+                highlight = _highlighter()
                 print(f"Found {len(results)} matching entries:")
                 for entry in results:
-                    print(entry)
+                    print(_describe(collection, entry))
+                    for match in find_matches(entry, node):
+                        print(f"    {match.field}: "
+                              f"{match.snippet(highlight=highlight)}")
             else:
                 print("No matching entries found")
 
         elif args.command == 'show':
             entry = collection.get_entry(args.entry)
-            if entry:
-                render_markdown(entry.path.read_text(), plain=args.plain)
+            if entry and args.output:
+                _emit_records([dict(_entry_record(collection, entry),
+                                    content=entry.content)], args.output)
+            elif entry:
+                render_markdown(entry.content, plain=args.plain)
             else:
                 logger.error(f"Entry not found: {args.entry}")
                 return 1
@@ -259,16 +866,40 @@ def main():
                     f"Section '{args.section}' is not marked as executable")
                 return 1
 
-            blocks = entry.get_executable_blocks(args.section)
+            blocks = entry.executable_blocks(args.section)
             if not blocks:
                 logger.error(
                     f"No executable code blocks found in section '{args.section}'")
                 return 1
 
-            for language, code in blocks:
-                result = execute_code_block(language, code)
-                if result != 0:
-                    return result
+            if args.hosts:
+                return _execute_on_hosts(entry, args, blocks)
+
+            try:
+                timeouts = [parse_timeout(block.options.get('timeout'))
+                            for block in blocks]
+                default_timeout = parse_timeout(args.timeout)
+                limits = Limits.parse(*(
+                    getattr(args, name) if getattr(args, name) is not None
+                    else get_setting(f'execute_{name}')
+                    for name in _LIMIT_OPTIONS))
+            except ValueError as e:
+                logger.error(str(e))
+                return 1
+
+            with BlockRunner(default_timeout, timestamps=args.timestamps,
+                             prefix=args.prefix,
+                             log=Path(args.log) if args.log else None,
+                             limits=limits) as runner:
+                for i, (block, timeout) in enumerate(zip(blocks, timeouts), 1):
+                    label = f"{entry.slug}:{args.section}#{i}"
+                    result = execute_code_block(
+                        block.language, block.code, runner=runner,
+                        label=label, timeout=timeout,
+                        journal={'slug': entry.slug,
+                                 'section': args.section, 'block': i})
+                    if result != 0:
+                        return result
 
         elif args.command == 'validate':
             if args.entry:
@@ -282,54 +913,107 @@ def main():
                 entries = collection.entries
 
             all_valid = True
+            if args.output:
+                def records():
+                    nonlocal all_valid
+                    for entry in entries:
+                        errors = collection.validate(entry)
+                        all_valid = all_valid and not errors
+                        yield {'slug': entry.slug, 'path': str(entry.path),
+                               'valid': not errors, 'errors': errors,
+                               'suggestions': [
+                                   {'line': line, 'language': guess.language,
+                                    'confidence': guess.confidence}
+                                   for line, guess in suggest_tags(entry)]}
+                _emit_records(records(), args.output)
+                return 0 if all_valid else 1
+
             for entry in entries:
-                errors = validate_entry(entry)
+                errors = collection.validate(entry)
                 if errors:
                     all_valid = False
                     print(f"Validation errors in {entry.path}:")
                     for error in errors:
                         print(f"  - {error}")
+                    for line, guess in suggest_tags(entry):
+                        print(f"  suggestion: line {line}: "
+                              f"```{guess.language} "
+                              f"(confidence {guess.confidence:.2f})")
 
             if all_valid:
                 print("All entries valid!")
             else:
                 return 1
 
-        elif args.command == 'update':
-            repo_path = root_dir
-            print(f"Updating TIL repository at: {repo_path}")
+        elif args.command == 'plan':
+            entry = collection.get_entry(args.entry)
+            if not entry:
+                logger.error(f"Entry not found: {args.entry}")
+                return 1
             try:
-                # Check if it's a git repository
-                git_dir = repo_path / '.git'
-                if not git_dir.is_dir():
-                    logger.error(f"Error: Not a git repository: {repo_path}")
-                    return 1
+                steps = collection.dependency_graph.plan(entry.slug)
+            except DependencyError as e:
+                logger.error(str(e))
+                return 1
+            if args.output:
+                _emit_records([{'step': number, 'skills': skills,
+                                'parallel': len(skills) > 1}
+                               for number, skills in enumerate(steps, 1)],
+                              args.output)
+                return 0
+            for number, skills in enumerate(steps, 1):
+                note = '  (parallel)' if len(skills) > 1 else ''
+                print(f"{number}. {', '.join(skills)}{note}")
 
-                # Run git pull
-                result = subprocess.run(
-                    ['git', 'pull'],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True
-                )
-
-                if result.returncode == 0:
-                    print(f"Successfully updated:\n{result.stdout}")
-                    return 0
-                else:
-                    logger.error(
-                        f"Error updating repository:\n{result.stderr}")
-                    return 1
-            except Exception as e:
-                logger.error(f"Error updating repository: {e}")
+        elif args.command == 'dupes':
+            if not 0 < args.threshold <= 1:
+                logger.error("--threshold must be between 0 and 1")
                 return 1
+            dupes = find_duplicates(collection.entries, args.threshold,
+                                    args.min_tokens)
+            if args.output:
+                found = dupes.to_dict()
+                _emit_records(
+                    [dict(kind=kind, **item) for kind, key in (
+                        ('identical', 'identical'), ('near', 'near'),
+                        ('skills', 'skills')) for item in found[key]],
+                    args.output)
+                return 0
+            _print_dupes(dupes, args.threshold)
+
+        elif args.command == 'export':
+            output = Path(args.output or f"til-export.{args.format}")
+            try:
+                stats = export_collection(collection, output, args.format)
+            except ExportError as e:
+                logger.error(str(e))
+                return 1
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Error exporting to {output}: {e}")
+                return 1
+            print(f"Exported {stats} to {output}")
+
+        elif args.command == 'batch':
+            def write(line):
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            return 1 if run_batch(collection, sys.stdin, write) else 0
+
+        elif args.command == 'update':
+            status = 0
+            for repo_path in root_dirs:
+                status = _pull_repository(repo_path) or status
+            write_completion_cache(load_collection(root_dirs),
+                                   selection_spec(args.repo_path))
+            return status
 
         elif args.command == 'version':
             from til_cli import __version__
             print(f"TIL CLI Tool v{__version__}")
             print(f"Python: {sys.version.split()[0]}")
             print(f"Platform: {sys_platform.system()}")
-            print(f"Repository path: {root_dir}")
+            for repo in root_dirs:
+                print(f"Repository path: {repo}")
 
         else:
             parser.print_help()
@@ -339,6 +1023,12 @@ def main():
     except KeyboardInterrupt:
         logger.error("\nOperation cancelled by user")
         return 130
+    except BrokenPipeError:
+        # Reader went away (``til list --ndjson | head``). Point stdout at
+        # /dev/null so the interpreter's final flush doesn't raise again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         if os.environ.get("TIL_DEBUG"):
@@ -0,0 +1,193 @@
+"""asyncio API for embedding the TIL library in async services.
+
+Everything here is safe to call from a running event loop:
+
+* ``await AsyncTILCollection.load(root)`` loads and parses the skills in
+  a worker thread once; afterwards lookups and searches are served from
+  memory without blocking.
+* ``await collection.execute(slug, section, confirm=..., on_output=...)``
+  runs executable blocks with ``asyncio.create_subprocess_exec`` and
+  streams their output line by line, so any number of executions can be
+  in flight on one loop.
+* ``await check_for_updates(repo)`` runs the git update check off the
+  loop.
+
+Confirmation is pluggable: ``confirm(language, code)`` may be a plain or
+an ``async`` callable returning ``True`` to run the block. Unlike the
+CLI, nothing prompts on stdin.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import inspect
+import os
+import signal
+import sys
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Union
+
+from .til import (
+    TILCollection,
+    TILEntry,
+    _script_for,
+    check_for_repo_updates,
+)
+
+# ``confirm(language, code)`` -> bool, optionally async.
+ConfirmCallback = Callable[[str, str], Union[bool, Awaitable[bool]]]
+# ``on_output(stream, line)`` where ``stream`` is ``'stdout'`` or ``'stderr'``.
+OutputCallback = Callable[[str, str], Union[None, Awaitable[None]]]
+
+# Bytes read per chunk; also the longest piece of a line passed to
+# ``on_output`` (longer lines arrive in several calls).
+READ_SIZE = 64 * 1024
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def _default_output(stream: str, line: str) -> None:
+    target = sys.stderr if stream == 'stderr' else sys.stdout
+    target.write(line)
+    target.flush()
+
+
+async def _pump(reader: asyncio.StreamReader, stream: str,
+                on_output: OutputCallback) -> None:
+    """Forward ``reader`` to ``on_output`` line by line.
+
+    Reads fixed-size chunks rather than ``readline()``, whose buffer
+    limit turns one overlong line (minified JSON, a progress bar) into
+    an exception.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = b''
+    while True:
+        chunk = await reader.read(READ_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            await _maybe_await(on_output(stream, decoder.decode(line + b'\n')))
+        if len(pending) >= READ_SIZE:
+            await _maybe_await(on_output(stream, decoder.decode(pending)))
+            pending = b''
+    text = decoder.decode(pending, final=True)
+    if text:
+        await _maybe_await(on_output(stream, text))
+
+
+def _write_script(script_file: Path, code: str) -> None:
+    script_file.write_text(code)
+    script_file.chmod(0o755)
+
+
+async def execute_code_block(language: str, code: str, *,
+                             confirm: Optional[ConfirmCallback] = None,
+                             on_output: Optional[OutputCallback] = None) -> int:
+    """Run one code block without blocking the event loop.
+
+    Returns the exit code; ``0`` without running when ``confirm`` declines
+    (matching the CLI's "Execution cancelled"), ``1`` for unsupported
+    languages. ``confirm=None`` runs the block unconditionally.
+    """
+    script = _script_for(language)
+    if script is None:
+        print(f"Unsupported language: {language}", file=sys.stderr)
+        return 1
+    if confirm is not None and not await _maybe_await(confirm(language, code)):
+        return 0
+    on_output = on_output or _default_output
+    script_file, interpreter = script
+    try:
+        await asyncio.to_thread(_write_script, script_file, code)
+        proc = await asyncio.create_subprocess_exec(
+            interpreter, str(script_file),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # Own session (and so process group), so a kill reaches the
+            # block's children. Unlike ``preexec_fn`` this is safe with
+            # the threads an async service runs.
+            start_new_session=True,
+        )
+        try:
+            await asyncio.gather(
+                _pump(proc.stdout, 'stdout', on_output),
+                _pump(proc.stderr, 'stderr', on_output),
+            )
+            return await proc.wait()
+        except BaseException:
+            # Cancellation or a failing ``on_output``: never leave the
+            # block running unattended.
+            if proc.returncode is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+            raise
+    finally:
+        if script_file.exists():
+            script_file.unlink()
+
+
+async def check_for_updates(repo_path: Path, force: bool = False) -> bool:
+    """``check_for_repo_updates`` run in a worker thread."""
+    return await asyncio.to_thread(check_for_repo_updates, repo_path, force)
+
+
+class AsyncTILCollection:
+    """Async facade over a loaded ``TILCollection``."""
+
+    def __init__(self, collection: TILCollection):
+        self.collection = collection
+
+    @classmethod
+    async def load(cls, root_dir: Path,
+                   workers: Optional[str] = None) -> 'AsyncTILCollection':
+        """Load ``root_dir`` off the event loop (see ``TILCollection``)."""
+        collection = await asyncio.to_thread(
+            TILCollection, Path(root_dir), workers)
+        # Build the search index now so the first search doesn't stall.
+        await asyncio.to_thread(lambda: collection.index)
+        return cls(collection)
+
+    @property
+    def entries(self) -> List[TILEntry]:
+        return self.collection.entries
+
+    def get_entry(self, path_or_name: str) -> Optional[TILEntry]:
+        return self.collection.get_entry(path_or_name)
+
+    async def search(self, expression: str) -> List[TILEntry]:
+        """Evaluate a query against the in-memory index."""
+        return self.collection.query(expression)
+
+    async def execute(self, entry: Union[str, TILEntry], section: str, *,
+                      confirm: Optional[ConfirmCallback] = None,
+                      on_output: Optional[OutputCallback] = None) -> int:
+        """Run every block of ``section`` in order, stopping on failure.
+
+        Raises ``KeyError`` when the entry or executable section does not
+        exist.
+        """
+        if isinstance(entry, str):
+            found = self.get_entry(entry)
+            if found is None:
+                raise KeyError(f"Entry not found: {entry}")
+            entry = found
+        if section not in entry.executable_sections:
+            raise KeyError(f"Section '{section}' is not marked as executable")
+        for language, code in entry.get_executable_blocks(section):
+            result = await execute_code_block(
+                language, code, confirm=confirm, on_output=on_output)
+            if result != 0:
+                return result
+        return 0
@@ -0,0 +1,240 @@
+"""Pluggable full-text search engines behind ``TILCollection.search``.
+
+Two backends are available, selected with ``search_backend`` in
+``~/.tilconfig`` or ``TIL_SEARCH_BACKEND``:
+
+* ``linear`` (default): case-insensitive substring scan over every
+  entry's title, metadata, sections and slug. No setup cost; fine for a
+  few thousand skills.
+* ``fts``: a SQLite FTS5 index in the cache directory (see
+  ``til_cli.config``). Query words are token prefixes, results are ranked
+  with bm25 (slug and title weigh more than body text) and come with a
+  snippet. The index is synced when the backend is created: entries
+  whose file mtime/size (or blob id, for ``--ref`` loads) changed are
+  re-indexed, removed ones are deleted, everything else is untouched.
+
+Both return ``SearchHit`` lists, best first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import cache_dir, get_setting
+from .query import tokenize_text
+from .search import make_snippet
+
+DEFAULT_BACKEND = 'linear'
+
+# Snippet highlight markers; replaced by ``SearchHit.snippet``.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# bm25 column weights for (slug, title, description, body).
+_BM25_WEIGHTS = (4.0, 3.0, 2.0, 1.0)
+
+_FTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id    INTEGER PRIMARY KEY,
+    path  TEXT NOT NULL UNIQUE,
+    stamp TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    slug, title, description, body,
+    tokenize = 'unicode61'
+);
+"""
+
+
+class SearchHit:
+    """One result: the entry, its rank score and a marked-up excerpt."""
+
+    def __init__(self, entry, score: float = 0.0, excerpt: str = ''):
+        self.entry = entry
+        self.score = score
+        self.excerpt = excerpt
+
+    def snippet(self, highlight: Optional[Callable[[str], str]] = None) -> str:
+        def mark(text: str) -> str:
+            return highlight(text) if highlight else text
+        out, rest = [], self.excerpt
+        while _MARK_START in rest:
+            before, _, rest = rest.partition(_MARK_START)
+            match, _, rest = rest.partition(_MARK_END)
+            out += [before, mark(match)]
+        out.append(rest)
+        return ' '.join(''.join(out).split())
+
+    def to_dict(self) -> dict:
+        return {'slug': self.entry.slug, 'score': self.score,
+                'snippet': self.snippet()}
+
+
+class SearchBackend(ABC):
+    """Interface: ``search(term, limit)`` -> ``SearchHit`` list, best first."""
+
+    name = ''
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @abstractmethod
+    def search(self, term: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """Entries matching ``term``, at most ``limit``, best first."""
+
+
+class LinearBackend(SearchBackend):
+    """Substring scan over the loaded entries, in collection order."""
+
+    name = 'linear'
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[SearchHit]:
+        hits = []
+        for entry in self.collection.entries:
+            if limit is not None and len(hits) >= limit:
+                break
+            if entry.matches_search(term):
+                hits.append(SearchHit(entry, 0.0, self._excerpt(entry, term)))
+        return hits
+
+    @staticmethod
+    def _excerpt(entry, term: str) -> str:
+        needle = term.lower()
+        fields = [entry.title, entry.frontmatter.get('description', ''),
+                  *entry.sections.values(), entry.slug]
+        for text in fields:
+            start = str(text).lower().find(needle)
+            if start >= 0:
+                return make_snippet(
+                    str(text), start, start + len(needle),
+                    highlight=lambda m: _MARK_START + m + _MARK_END)
+        return ''
+
+
+def _stamp(entry) -> str:
+    """Cheap change marker: blob id, else file mtime and size."""
+    if entry.blob_sha:
+        return entry.blob_sha
+    try:
+        st = entry.path.stat()
+    except OSError:
+        return 'missing'
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def fts_query(term: str) -> Optional[str]:
+    """FTS5 MATCH expression: every word of ``term`` as a token prefix."""
+    words = tokenize_text(term)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class FTSBackend(SearchBackend):
+    """SQLite FTS5 index kept next to the other caches."""
+
+    name = 'fts'
+
+    def __init__(self, collection, db_path: Optional[Path] = None):
+        super().__init__(collection)
+        self.db_path = db_path or self.default_path(collection)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=10,
+                                    check_same_thread=False)
+        self.conn.executescript(_FTS_SCHEMA)
+        self._by_path: Dict[str, object] = {
+            str(entry.path): entry for entry in collection.entries}
+        self.sync()
+
+    @staticmethod
+    def default_path(collection) -> Path:
+        roots = getattr(collection, 'root_dirs', [collection.root_dir])
+        key = '\n'.join([str(Path(r).resolve()) for r in roots]
+                        + [collection.ref or ''])
+        directory = cache_dir() / 'search'
+        directory.mkdir(exist_ok=True)
+        return directory / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.sqlite"
+
+    def sync(self) -> int:
+        """Bring the index in line with the entries; returns rows written.
+
+        The write lock is taken before ``docs`` is read, so concurrent
+        ``til`` processes syncing the same index run one after the other
+        instead of inserting the same paths twice.
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        written = 0
+        with self.conn:
+            stored = {path: (doc_id, stamp) for doc_id, path, stamp
+                      in self.conn.execute('SELECT id, path, stamp FROM docs')}
+            for path, entry in self._by_path.items():
+                stamp = _stamp(entry)
+                old = stored.pop(path, None)
+                if old and old[1] == stamp:
+                    continue
+                if old:
+                    self._delete(old[0])
+                doc_id = self.conn.execute(
+                    'INSERT INTO docs (path, stamp) VALUES (?, ?)',
+                    (path, stamp)).lastrowid
+                body = '\n'.join(f"{name}\n{text}"
+                                 for name, text in entry.sections.items())
+                self.conn.execute(
+                    'INSERT INTO docs_fts (rowid, slug, title, description, '
+                    'body) VALUES (?, ?, ?, ?, ?)',
+                    (doc_id, entry.slug, entry.title,
+                     entry.frontmatter.get('description', ''), body))
+                written += 1
+            for doc_id, _stamp_value in stored.values():
+                self._delete(doc_id)
+        return written
+
+    def _delete(self, doc_id: int) -> None:
+        self.conn.execute('DELETE FROM docs_fts WHERE rowid = ?', (doc_id,))
+        self.conn.execute('DELETE FROM docs WHERE id = ?', (doc_id,))
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[SearchHit]:
+        match = fts_query(term)
+        if match is None:
+            return []
+        rows = self.conn.execute(
+            'SELECT d.path, bm25(docs_fts, ?, ?, ?, ?) AS rank, '
+            "snippet(docs_fts, -1, ?, ?, '…', 12) "
+            'FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid '
+            'WHERE docs_fts MATCH ? ORDER BY rank LIMIT ?',
+            (*_BM25_WEIGHTS, _MARK_START, _MARK_END, match,
+             -1 if limit is None else limit))
+        hits = []
+        for path, rank, excerpt in rows:
+            entry = self._by_path.get(path)
+            if entry is not None:
+                # bm25() is lower-is-better; report higher-is-better.
+                hits.append(SearchHit(entry, -rank, excerpt))
+        return hits
+
+
+BACKENDS = {backend.name: backend for backend in (LinearBackend, FTSBackend)}
+
+
+def backend_name() -> str:
+    """Configured backend name (``search_backend`` / ``TIL_SEARCH_BACKEND``)."""
+    return (get_setting('search_backend', DEFAULT_BACKEND)
+            or DEFAULT_BACKEND).strip().lower()
+
+
+def create_backend(collection, name: Optional[str] = None) -> SearchBackend:
+    """Instantiate backend ``name`` (default: configured) for ``collection``.
+
+    Raises ``ValueError`` for unknown names.
+    """
+    name = name or backend_name()
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown search backend '{name}' "
+            f"(choose from: {', '.join(sorted(BACKENDS))})") from None
+    return backend(collection)
@@ -0,0 +1,101 @@
+"""Answer many lookups with one loaded collection (``til batch``).
+
+Each input line is one request, ``COMMAND ARGUMENT``:
+
+* ``show ENTRY`` — the entry record plus its raw ``content``
+* ``search QUERY`` — query-language results with their matches
+* ``sections ENTRY`` — section names, heading lines and executability
+* ``validate [ENTRY]`` — validation results (all entries without one)
+
+Blank lines and ``#`` comments are skipped. Every request gets exactly
+one response line, a JSON object flushed as soon as it is written::
+
+    {"id": 1, "command": "show", "arg": "tmux-copy", "ok": true, "result": {...}}
+    {"id": 2, "command": "show", "arg": "nope", "ok": false, "error": "Entry not found: nope"}
+
+``id`` is the 1-based number of the request (not the input line), so
+responses can be paired with requests without parsing them back.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Callable, Iterable
+
+from .query import QuerySyntaxError, parse_query
+from .search import find_matches
+
+COMMANDS = ('show', 'search', 'sections', 'validate')
+
+
+class BatchError(Exception):
+    """A request that cannot be answered; reported in its response."""
+
+
+def _record(collection, entry) -> dict:
+    return dict(entry.to_dict(), repo=str(collection.root_for(entry)))
+
+
+def _lookup(collection, name: str):
+    if not name:
+        raise BatchError("Missing entry argument")
+    entry = collection.get_entry(name)
+    if entry is None:
+        raise BatchError(f"Entry not found: {name}")
+    return entry
+
+
+def _validation(collection, entry) -> dict:
+    errors = collection.validate(entry)
+    return {'slug': entry.slug, 'path': str(entry.path),
+            'valid': not errors, 'errors': errors}
+
+
+def answer(collection, command: str, arg: str):
+    """Result for one request; raises ``BatchError`` on failure."""
+    if command == 'show':
+        entry = _lookup(collection, arg)
+        return dict(_record(collection, entry), content=entry.content)
+    if command == 'search':
+        try:
+            node = parse_query(arg)
+            hits = collection.query(arg)
+        except QuerySyntaxError as e:
+            raise BatchError(f"Invalid search query: {e}") from None
+        return [dict(_record(collection, entry),
+                     matches=[m.to_dict() for m in find_matches(entry, node)])
+                for entry in hits]
+    if command == 'sections':
+        entry = _lookup(collection, arg)
+        return [{'name': name, 'line': entry.section_lines.get(name),
+                 'executable': name in entry.executable_sections}
+                for name in entry.sections]
+    if command == 'validate':
+        if arg:
+            return _validation(collection, _lookup(collection, arg))
+        return [_validation(collection, entry)
+                for entry in collection.entries]
+    raise BatchError(f"Unknown command '{command}' "
+                     f"(expected one of: {', '.join(COMMANDS)})")
+
+
+def run_batch(collection, lines: Iterable[str],
+              write: Callable[[str], None]) -> int:
+    """Answer every request in ``lines``; returns the number that failed."""
+    failed = 0
+    request_id = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        request_id += 1
+        command, _, arg = line.partition(' ')
+        response = {'id': request_id, 'command': command, 'arg': arg.strip()}
+        try:
+            result = answer(collection, command, arg.strip())
+            response.update(ok=True, result=result)
+        except BatchError as e:
+            response.update(ok=False, error=str(e))
+            failed += 1
+        write(json.dumps(response) + '\n')
+    return failed
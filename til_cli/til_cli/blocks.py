@@ -0,0 +1,202 @@
+"""Content-addressed code blocks and duplicate detection (``til dupes``).
+
+Every fenced block has an id: 16 hex digits of the SHA-256 of its code
+with line endings and trailing whitespace normalised (``block_id``).
+``TILEntry.block_ids`` gives the ids of an entry's blocks, the export
+stores each distinct block once under its id, and the execution journal
+records the same id.
+
+``find_duplicates`` reports blocks that are identical (same id) and
+blocks that are near-identical: each block becomes a set of hashed
+``SHINGLE_SIZE``-token shingles, summarised by a ``NUM_HASHES``-value
+MinHash signature, and the signatures are split into ``BANDS`` bands
+for locality-sensitive hashing. Only blocks that share a band bucket
+are compared (by the exact Jaccard similarity of their shingles), so
+the work grows with the number of similar pairs rather than with the
+square of the number of blocks.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+SHINGLE_SIZE = 3
+NUM_HASHES = 64
+BANDS = 16  # of NUM_HASHES // BANDS rows: candidates from ~0.5 similarity
+DEFAULT_THRESHOLD = 0.7
+# Blocks with fewer tokens than this (``cd ~``, ``source ~/.zshrc``) are
+# too generic to flag.
+DEFAULT_MIN_TOKENS = 4
+
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]+')
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are comparable across runs.
+_rng = random.Random(0x7111)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME))
+                 for _ in range(NUM_HASHES)]
+
+
+def normalize(code: str) -> str:
+    """``code`` with ``\\n`` line endings, no trailing whitespace or
+    leading/trailing blank lines."""
+    lines = code.replace('\r\n', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+
+def block_id(code: str) -> str:
+    """Content id of a block's code."""
+    return hashlib.sha256(normalize(code).encode()).hexdigest()[:16]
+
+
+class BlockRef(NamedTuple):
+    """One occurrence of a block: skill, 1-based position, section."""
+
+    slug: str
+    position: int
+    section: str
+    language: str
+    id: str
+
+    def label(self) -> str:
+        section = f" ({self.section})" if self.section else ''
+        return f"{self.slug}#{self.position}{section}"
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+class BlockStore:
+    """Distinct blocks by id and where each of them occurs."""
+
+    def __init__(self, entries: Iterable = ()):
+        self.code: Dict[str, str] = {}
+        self.refs: Dict[str, List[BlockRef]] = defaultdict(list)
+        for entry in entries:
+            self.add_entry(entry)
+
+    def add_entry(self, entry) -> None:
+        for position, ((section, language, code), bid) in enumerate(
+                zip(entry.code_blocks, entry.block_ids), 1):
+            self.code.setdefault(bid, normalize(code))
+            self.refs[bid].append(
+                BlockRef(entry.slug, position, section or '', language, bid))
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+
+def shingles(code: str, size: int = SHINGLE_SIZE) -> frozenset:
+    """Hashed ``size``-token shingles of ``code`` (one for short blocks)."""
+    tokens = _TOKEN_RE.findall(code)
+    if len(tokens) <= size:
+        grams = [' '.join(tokens)]
+    else:
+        grams = [' '.join(tokens[i:i + size])
+                 for i in range(len(tokens) - size + 1)]
+    return frozenset(int.from_bytes(
+        hashlib.blake2b(gram.encode(), digest_size=8).digest(), 'big')
+        for gram in grams)
+
+
+def minhash(shingle_set: frozenset) -> Tuple[int, ...]:
+    return tuple(min((a * h + b) % _PRIME for h in shingle_set)
+                 for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDuplicate(NamedTuple):
+    """Two distinct blocks whose shingles overlap by ``similarity``."""
+
+    similarity: float
+    a: str  # block ids
+    b: str
+
+
+class Duplicates:
+    """``find_duplicates`` result."""
+
+    def __init__(self, store: BlockStore, identical: List[str],
+                 near: List[NearDuplicate]):
+        self.store = store
+        # Ids of blocks that occur more than once.
+        self.identical = identical
+        self.near = near
+
+    def skill_pairs(self) -> List[dict]:
+        """Pairs of skills sharing blocks, most shared first."""
+        pairs: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+            lambda: {'identical': 0, 'similar': 0})
+
+        def count(refs_a, refs_b, kind):
+            for slug_a, slug_b in {tuple(sorted((x.slug, y.slug)))
+                                   for x in refs_a for y in refs_b
+                                   if x.slug != y.slug}:
+                pairs[slug_a, slug_b][kind] += 1
+
+        for bid in self.identical:
+            refs = self.store.refs[bid]
+            count(refs, refs, 'identical')
+        for pair in self.near:
+            count(self.store.refs[pair.a], self.store.refs[pair.b], 'similar')
+        rows = [dict(skills=list(key), **counts)
+                for key, counts in pairs.items()]
+        rows.sort(key=lambda r: (-r['identical'], -r['similar'],
+                                 r['skills']))
+        return rows
+
+    def to_dict(self) -> dict:
+        refs = self.store.refs
+        return {
+            'identical': [
+                {'id': bid, 'code': self.store.code[bid],
+                 'occurrences': [r.to_dict() for r in refs[bid]]}
+                for bid in self.identical],
+            'near': [
+                {'similarity': pair.similarity,
+                 'a': [r.to_dict() for r in refs[pair.a]],
+                 'b': [r.to_dict() for r in refs[pair.b]]}
+                for pair in self.near],
+            'skills': self.skill_pairs(),
+        }
+
+
+def find_duplicates(entries: Sequence, threshold: float = DEFAULT_THRESHOLD,
+                    min_tokens: int = DEFAULT_MIN_TOKENS) -> Duplicates:
+    """Identical and near-identical blocks across ``entries``."""
+    store = BlockStore(entries)
+    candidates = [bid for bid, code in store.code.items()
+                  if len(_TOKEN_RE.findall(code)) >= min_tokens]
+    identical = sorted((bid for bid in candidates if len(store.refs[bid]) > 1),
+                       key=lambda bid: (-len(store.refs[bid]),
+                                        store.refs[bid][0]))
+
+    sets = {bid: shingles(store.code[bid]) for bid in candidates}
+    rows = NUM_HASHES // BANDS
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+    for bid in candidates:
+        signature = minhash(sets[bid])
+        for band in range(BANDS):
+            buckets[band, signature[band * rows:(band + 1) * rows]].append(bid)
+
+    seen = set()
+    near = []
+    for members in buckets.values():
+        for a, b in combinations(members, 2):
+            key = (a, b) if a < b else (b, a)
+            if key in seen:
+                continue
+            seen.add(key)
+            similarity = jaccard(sets[a], sets[b])
+            if similarity >= threshold:
+                near.append(NearDuplicate(round(similarity, 3), *key))
+    near.sort(key=lambda pair: (-pair.similarity,
+                                store.refs[pair.a][0], store.refs[pair.b][0]))
+    return Duplicates(store, identical, near)
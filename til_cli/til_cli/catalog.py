@@ -0,0 +1,187 @@
+"""Frontmatter-only catalog of the skills, and on-demand body loading.
+
+An agent starting up needs ``name`` and ``description`` for every skill
+but the body of only a few. ``load_catalog`` therefore reads each
+``skills/<slug>/SKILL.md`` line by line and stops at the closing ``---``
+of its frontmatter; nothing after it is read or parsed.
+
+Results are cached per repository under ``<cache_dir>/catalog/`` (see
+``til_cli.config``), keyed by each file's mtime and size, so a warm
+catalog costs one ``stat`` per skill. With ``--ref`` the blobs come from
+``git cat-file`` whole, but again only their frontmatter is decoded and
+parsed, once per blob id. ``load_body`` then parses a single
+skill, found by its directory name, without touching the others.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .config import cache_dir, repo_key
+from .til import TILEntry
+
+CACHE_VERSION = 1
+
+# Give up on a frontmatter block that hasn't closed after this many lines.
+MAX_FRONTMATTER_LINES = 200
+
+# Blob id -> frontmatter, for ``--ref`` catalogs.
+_BLOB_FRONTMATTER: Dict[str, dict] = {}
+
+
+def read_frontmatter(path: Path) -> dict:
+    """Parse the frontmatter of ``path``, reading no further than its end.
+
+    Returns ``{}`` when the file has no (closed) frontmatter block.
+    """
+    with open(path, 'rb') as fh:
+        return _frontmatter(fh.readline)
+
+
+def blob_frontmatter(data: bytes) -> dict:
+    """``read_frontmatter`` for a file's bytes (a git blob)."""
+    return _frontmatter(io.BytesIO(data).readline)
+
+
+def _frontmatter(readline: Callable[[], bytes]) -> dict:
+    first = readline()
+    if first.rstrip(b'\r\n') != b'---':
+        return {}
+    lines = [first]
+    for _ in range(MAX_FRONTMATTER_LINES):
+        line = readline()
+        if not line:
+            return {}
+        lines.append(line)
+        if line.rstrip(b'\r\n') == b'---':
+            break
+    else:
+        return {}
+    text = b''.join(lines).decode(errors='replace')
+    if not text.endswith('\n'):
+        text += '\n'
+    return TILEntry._split_frontmatter(text)[0]
+
+
+def _cache_file(root: Path) -> Path:
+    directory = cache_dir() / 'catalog'
+    directory.mkdir(exist_ok=True)
+    return directory / f"{repo_key(root)}.json"
+
+
+def _load_cache(root: Path) -> Dict[str, list]:
+    try:
+        data = json.loads(_cache_file(root).read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    return data.get('files', {})
+
+
+def _save_cache(root: Path, files: Dict[str, list]) -> None:
+    path = _cache_file(root)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        tmp.write_text(json.dumps({'version': CACHE_VERSION, 'files': files}))
+        tmp.replace(path)
+    except OSError:
+        # The cache is an optimisation; a read-only cache dir is fine.
+        pass
+
+
+def _record(slug: str, path: Path, root: Path, frontmatter: dict) -> dict:
+    return {'slug': slug, 'path': str(path), 'repo': str(root),
+            'frontmatter': frontmatter}
+
+
+def _repo_catalog(root: Path) -> List[dict]:
+    cached = _load_cache(root)
+    files: Dict[str, list] = {}
+    records = []
+    for path in sorted(root.glob('skills/*/SKILL.md')):
+        rel = str(path.relative_to(root))
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        stamp = [st.st_mtime_ns, st.st_size]
+        hit = cached.get(rel)
+        if hit and hit[:2] == stamp:
+            frontmatter = hit[2]
+        else:
+            try:
+                frontmatter = read_frontmatter(path)
+            except OSError:
+                continue
+        files[rel] = [*stamp, frontmatter]
+        records.append(_record(path.parent.name, path, root, frontmatter))
+    if files != cached:
+        _save_cache(root, files)
+    return records
+
+
+def _ref_catalog(root: Path, ref: str) -> List[dict]:
+    from .gitstore import list_skill_blobs, read_blobs
+    blobs = list_skill_blobs(root, ref)
+    contents = read_blobs(root, sorted(
+        {sha for _, sha in blobs} - _BLOB_FRONTMATTER.keys()))
+    records = []
+    for path, sha in blobs:
+        frontmatter = _BLOB_FRONTMATTER.get(sha)
+        if frontmatter is None:
+            if sha not in contents:
+                continue
+            frontmatter = _BLOB_FRONTMATTER[sha] = blob_frontmatter(
+                contents[sha])
+        records.append(_record(Path(path).parent.name, root / path, root,
+                               frontmatter))
+    return records
+
+
+def load_catalog(root_dirs: Sequence[Path],
+                 ref: Optional[str] = None) -> List[dict]:
+    """``{slug, path, repo, frontmatter}`` for every skill, sorted by slug.
+
+    With several repositories the earlier one wins on slug conflicts,
+    as in ``FederatedCollection``. With ``ref`` the skills come from the
+    git object store (see ``til_cli.gitstore``) instead.
+    """
+    merged: Dict[str, dict] = {}
+    for root in root_dirs:
+        root = Path(root)
+        if ref:
+            records = _ref_catalog(root, ref)
+        else:
+            records = _repo_catalog(root)
+        for record in records:
+            merged.setdefault(record['slug'], record)
+    return [merged[slug] for slug in sorted(merged)]
+
+
+def load_body(root_dirs: Sequence[Path], slug: str,
+              ref: Optional[str] = None) -> Optional[TILEntry]:
+    """Parse only ``skills/<slug>/SKILL.md``; ``None`` if no repo has it."""
+    if not slug or '/' in slug or os.sep in slug or slug in ('.', '..'):
+        return None
+    for root in root_dirs:
+        root = Path(root)
+        if ref:
+            from .gitstore import load_entries
+            for entry in load_entries(root, ref):
+                if entry.slug == slug:
+                    return entry
+            continue
+        path = root / 'skills' / slug / 'SKILL.md'
+        if path.is_file():
+            return TILEntry(path)
+    return None
+
+
+def body_text(entry: TILEntry) -> str:
+    """The entry's Markdown without its frontmatter block."""
+    return TILEntry._split_frontmatter(entry.content)[1].lstrip('\n')
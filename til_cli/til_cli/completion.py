@@ -0,0 +1,96 @@
+"""Plain-text cache read by the shell completion scripts.
+
+``completions/til.bash`` and ``completions/_til`` read this file with
+shell builtins, so pressing Tab doesn't start Python. They fall back to
+``til _complete`` only when it is missing or stale. The cache is
+rewritten whenever ``til`` loads the collection (which includes after
+automatic updates), after ``til update`` and ``til fix``, and by
+``til _complete`` itself.
+
+Location: ``<cache_dir>/completion/<key>`` (see ``til_cli.config``),
+where ``key`` is ``repo-`` plus the ``--repo-path`` / ``TIL_REPO_PATH``
+value with every ``/`` replaced by ``%``, or ``default`` for the
+repositories in ``~/.tilconfig``. The development launcher (``./til``)
+sets ``TIL_REPO_PATH`` itself, so it keeps the shell's own value (empty
+when unset) in ``TIL_SHELL_REPO_PATH`` and the key still matches the
+one the shell computes. Format, tab-separated::
+
+    #til-completion 1<TAB><repo>[<TAB><repo>...]
+    <slug><TAB><path to SKILL.md>[<TAB><executable section>...]
+
+The shell treats the file as stale when any ``<repo>/skills`` directory
+(or, for section completion, the skill's file) is newer than it.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from .config import cache_dir, read_config
+
+HEADER = '#til-completion 1'
+
+
+def cache_key(spec: Optional[str]) -> str:
+    """File name for a repository selection (``None``: the configured one)."""
+    return 'repo-' + spec.replace('/', '%') if spec else 'default'
+
+
+def selection_spec(repo_path_arg: Optional[str]) -> Optional[str]:
+    """The repository selection as the shell sees it, or ``None``."""
+    if repo_path_arg:
+        return repo_path_arg
+    shell = os.environ.get('TIL_SHELL_REPO_PATH')
+    if shell is not None:
+        return shell or None
+    return os.environ.get('TIL_REPO_PATH') or None
+
+
+def cache_path(spec: Optional[str]) -> Path:
+    directory = cache_dir() / 'completion'
+    directory.mkdir(exist_ok=True)
+    return directory / cache_key(spec)
+
+
+def render(collection) -> str:
+    roots = getattr(collection, 'root_dirs', [collection.root_dir])
+    lines = ['\t'.join([HEADER, *(str(Path(r).resolve()) for r in roots)])]
+    for entry in sorted(collection.entries, key=lambda e: e.slug):
+        sections = [name for name in entry.sections
+                    if name in entry.executable_sections]
+        lines.append('\t'.join(
+            [entry.slug, str(entry.path.resolve()), *sections]))
+    return '\n'.join(lines) + '\n'
+
+
+def write_cache(collection, spec: Optional[str]) -> None:
+    """Refresh the cache for ``spec`` from ``collection``.
+
+    Only working-tree loads are cached, and ``spec=None`` only when the
+    repositories come from ``~/.tilconfig`` or the launcher's
+    ``TIL_REPO_PATH`` (not the current-directory fallback). Errors are
+    ignored: completion falls back to ``til _complete``.
+    """
+    if getattr(collection, 'ref', None):
+        return
+    if (spec is None and not read_config()[0]
+            and not os.environ.get('TIL_REPO_PATH')):
+        return
+    try:
+        path = cache_path(spec)
+        text = render(collection)
+        try:
+            unchanged = path.read_text() == text
+        except OSError:
+            unchanged = False
+        if unchanged:
+            # Same content: just mark it fresh for the shell's -nt check.
+            os.utime(path)
+            return
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text)
+        tmp.replace(path)
+    except OSError:
+        pass
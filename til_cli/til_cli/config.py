@@ -0,0 +1,137 @@
+"""User configuration and the locations of state and cache files.
+
+``~/.tilconfig`` historically held a single line: the repository path.
+It may now also carry ``key = value`` settings, one per line::
+
+    /home/me/til
+    update_interval = 3600
+
+Lines that are not settings (or ``#`` comments) are repository paths;
+with several, all are loaded and earlier ones win on slug conflicts.
+Every setting can be overridden by a ``TIL_<KEY>`` environment variable
+(``TIL_UPDATE_INTERVAL`` for ``update_interval``).
+
+State and cache directories follow the XDG base directory spec and can
+be overridden per process, which the tests rely on:
+
+* state (update history, ...): ``$TIL_STATE_DIR``, else
+  ``$XDG_STATE_HOME/til``, else ``~/.local/state/til``
+* cache (rebuildable data): ``$TIL_CACHE_DIR``, else
+  ``$XDG_CACHE_HOME/til``, else ``~/.cache/til``
+
+Directories are created on first use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CONFIG_FILE_NAME = '.tilconfig'
+
+_SETTING_RE = re.compile(r'^([a-z][a-z0-9_]*)\s*=\s*(.*)$')
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*$', re.I)
+_SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def config_path() -> Path:
+    return Path.home() / CONFIG_FILE_NAME
+
+
+def read_config() -> Tuple[List[str], Dict[str, str]]:
+    """Return ``(repo_paths, settings)`` from ``~/.tilconfig``."""
+    repos: List[str] = []
+    settings: Dict[str, str] = {}
+    try:
+        text = config_path().read_text()
+    except OSError:
+        return repos, settings
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        m = _SETTING_RE.match(line)
+        if m:
+            settings[m.group(1)] = m.group(2).strip()
+        else:
+            repos.append(line)
+    return repos, settings
+
+
+def write_repo_path(repo_path: Path, append: bool = False) -> None:
+    """Make ``repo_path`` the configured repository, keeping settings.
+
+    With ``append`` it is added after the existing repositories (lowest
+    precedence) instead of replacing them.
+    """
+    try:
+        lines = config_path().read_text().splitlines()
+    except OSError:
+        lines = []
+    repos = [str(repo_path)]
+    if append:
+        repos = [r for r in read_config()[0] if r != str(repo_path)] + repos
+    kept = [line for line in lines
+            if line.strip().startswith('#')
+            or _SETTING_RE.match(line.strip())]
+    config_path().write_text('\n'.join([*repos, *kept]) + '\n')
+
+
+def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
+    """``TIL_<KEY>`` from the environment, else ``key`` from the config."""
+    env_value = os.environ.get('TIL_' + key.upper())
+    if env_value is not None and env_value != '':
+        return env_value
+    return read_config()[1].get(key, default)
+
+
+def get_int_setting(key: str, default: int) -> int:
+    """Integer setting; unparsable values fall back to ``default``."""
+    try:
+        return int(get_setting(key, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_size(value) -> Optional[int]:
+    """Bytes from ``512M`` / ``2GiB`` / ``1048576``; ``None`` / ``0``: none."""
+    if value is None or value == '':
+        return None
+    m = _SIZE_RE.match(str(value))
+    if not m:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).lower()]) or None
+
+
+def repo_key(repo_path: Path) -> str:
+    """File-name-safe key for a repository: ``<dirname>-<path hash>``.
+
+    Names per-repository state and cache files.
+    """
+    resolved = str(Path(repo_path).resolve())
+    digest = hashlib.sha1(resolved.encode()).hexdigest()[:12]
+    return f"{Path(resolved).name or 'root'}-{digest}"
+
+
+def _resolve_dir(override: str, xdg_var: str, fallback: str) -> Path:
+    if os.environ.get(override):
+        path = Path(os.environ[override])
+    elif os.environ.get(xdg_var):
+        path = Path(os.environ[xdg_var]) / 'til'
+    else:
+        path = Path.home() / fallback / 'til'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def state_dir() -> Path:
+    """Directory for persistent, non-rebuildable state."""
+    return _resolve_dir('TIL_STATE_DIR', 'XDG_STATE_HOME', '.local/state')
+
+
+def cache_dir() -> Path:
+    """Directory for caches that can be deleted at any time."""
+    return _resolve_dir('TIL_CACHE_DIR', 'XDG_CACHE_HOME', '.cache')
@@ -0,0 +1,162 @@
+"""Dependency graph over the ``requires:`` frontmatter of skills.
+
+A skill lists the skills that must be applied before it::
+
+    ---
+    name: tmux-dracula-cpu-temp
+    requires: tmux-tpm-install
+    ---
+
+(``requires: [a, b]`` and ``- a`` lines work too.) ``DependencyGraph``
+is built once per loaded collection (``TILCollection.dependency_graph``).
+It finds cycles with Tarjan's algorithm and gives every skill a
+*depth*: 0 without requirements, else one more than its deepest
+requirement, computed once for the whole graph. ``plan(slug)`` groups
+the skill and everything it needs, directly or not, by depth. Each
+step only needs the steps before it, so the skills within a step can be
+applied in parallel.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+from .til import TILEntry
+
+
+class DependencyError(ValueError):
+    """A plan that cannot be made: unknown skill, requirement or a cycle."""
+
+
+class DependencyGraph:
+    """Skills and their ``requires:`` edges, with cycles and depths."""
+
+    def __init__(self, entries: Sequence[TILEntry]):
+        self.requires: Dict[str, List[str]] = {
+            entry.slug: entry.requires for entry in entries}
+        # Requirements naming no loaded skill, per skill.
+        self.missing: Dict[str, List[str]] = {}
+        for slug, needs in self.requires.items():
+            unknown = [need for need in needs if need not in self.requires]
+            if unknown:
+                self.missing[slug] = unknown
+        self.cycles = self._find_cycles()
+        self._cycle_of = {slug: cycle for cycle in self.cycles
+                          for slug in cycle}
+        self._depth: Optional[Dict[str, int]] = None
+
+    def _find_cycles(self) -> List[List[str]]:
+        """Strongly connected components that form cycles (Tarjan)."""
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack = set()
+        cycles = []
+        for root in self.requires:
+            if root in index:
+                continue
+            # Iterative DFS: (node, iterator over its requirements).
+            work = [(root, iter(self.requires[root]))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, needs = work[-1]
+                for need in needs:
+                    if need not in self.requires:
+                        continue
+                    if need not in index:
+                        index[need] = low[need] = len(index)
+                        stack.append(need)
+                        on_stack.add(need)
+                        work.append((need, iter(self.requires[need])))
+                        break
+                    if need in on_stack:
+                        low[node] = min(low[node], index[need])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if (len(component) > 1
+                                or node in self.requires[node]):
+                            cycles.append(sorted(component))
+        return sorted(cycles)
+
+    @property
+    def depth(self) -> Dict[str, int]:
+        """Depth of every skill outside a cycle, computed on first use."""
+        if self._depth is None:
+            depth: Dict[str, int] = {}
+            for root in self.requires:
+                if root in depth or root in self._cycle_of:
+                    continue
+                work = [root]
+                while work:
+                    node = work[-1]
+                    pending = [need for need in self.requires[node]
+                               if need in self.requires and need not in depth
+                               and need not in self._cycle_of]
+                    if pending:
+                        work.extend(pending)
+                        continue
+                    work.pop()
+                    if node not in depth:
+                        depth[node] = 1 + max(
+                            (depth.get(need, -1) for need in
+                             self.requires[node]), default=-1)
+            self._depth = depth
+        return self._depth
+
+    def closure(self, slug: str) -> List[str]:
+        """``slug`` and every skill it needs, directly or not."""
+        seen = {slug}
+        work = [slug]
+        while work:
+            for need in self.requires.get(work.pop(), []):
+                if need not in seen:
+                    seen.add(need)
+                    work.append(need)
+        return sorted(seen)
+
+    def errors_for(self, slug: str) -> List[str]:
+        """Validation errors about ``slug``'s requirements."""
+        errors = [f"Unknown required skill: {need}"
+                  for need in self.missing.get(slug, [])]
+        cycle = self._cycle_of.get(slug)
+        if cycle:
+            errors.append(f"Dependency cycle: {', '.join(cycle)}")
+        return errors
+
+    def plan(self, slug: str) -> List[List[str]]:
+        """Steps to apply ``slug``: lists of skills, dependencies first.
+
+        Raises ``DependencyError`` if ``slug`` or something it needs is
+        unknown, or if they form a cycle.
+        """
+        if slug not in self.requires:
+            raise DependencyError(f"Entry not found: {slug}")
+        skills = self.closure(slug)
+        for skill in skills:
+            if skill not in self.requires:
+                needed_by = sorted(s for s in skills
+                                   if skill in self.requires.get(s, []))
+                raise DependencyError(
+                    f"Unknown required skill: {skill} "
+                    f"(required by {', '.join(needed_by)})")
+            if skill in self._cycle_of:
+                cycle = self._cycle_of[skill]
+                raise DependencyError(
+                    f"Dependency cycle: {', '.join(cycle)}")
+        steps: Dict[int, List[str]] = {}
+        for skill in skills:
+            steps.setdefault(self.depth[skill], []).append(skill)
+        return [steps[level] for level in sorted(steps)]
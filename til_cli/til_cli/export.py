@@ -0,0 +1,330 @@
+"""Export the parsed collection to a single SQLite or JSON file.
+
+Downstream tools open one file instead of walking ``skills/``. Each skill
+row carries its frontmatter, sections, code blocks (with languages) and
+validation result; the SQLite export also maintains an FTS5 table
+(``skills_fts``) for full-text search.
+
+Code blocks are stored once per distinct content, under their id
+(``blocks.block_id``): the SQLite ``blocks`` table and the JSON
+document's top-level ``blocks`` map hold the code, and each skill's
+blocks refer to it by id. The ``code_blocks`` view joins the two back
+together.
+
+Exports are incremental: every skill row remembers the source file's
+mtime, the SHA-256 of its content and its ``requires:`` errors (from
+the collection's dependency graph), and only skills where any of them
+changed are re-validated and rewritten. Skills that disappeared from the
+collection are deleted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .blocks import normalize
+from .til import TILEntry
+
+SCHEMA_VERSION = 3
+FORMATS = ('sqlite', 'json')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS skills (
+    id          INTEGER PRIMARY KEY,
+    slug        TEXT NOT NULL UNIQUE,
+    title       TEXT NOT NULL,
+    description TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    repo        TEXT,
+    frontmatter TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    mtime       REAL,
+    sha256      TEXT NOT NULL,
+    valid       INTEGER NOT NULL,
+    errors      TEXT NOT NULL,
+    graph_errors TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    skill_id   INTEGER NOT NULL REFERENCES skills(id) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    name       TEXT NOT NULL,
+    executable INTEGER NOT NULL,
+    body       TEXT NOT NULL,
+    PRIMARY KEY (skill_id, position)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id   TEXT PRIMARY KEY,
+    code TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS block_refs (
+    skill_id INTEGER NOT NULL REFERENCES skills(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    section  TEXT,
+    language TEXT NOT NULL,
+    block_id TEXT NOT NULL REFERENCES blocks(id),
+    PRIMARY KEY (skill_id, position)
+);
+CREATE INDEX IF NOT EXISTS block_refs_block ON block_refs(block_id);
+CREATE VIEW IF NOT EXISTS code_blocks AS
+    SELECT r.skill_id, r.position, r.section, r.language, r.block_id, b.code
+    FROM block_refs r JOIN blocks b ON b.id = r.block_id;
+CREATE VIRTUAL TABLE IF NOT EXISTS skills_fts USING fts5(
+    slug, title, description, body,
+    tokenize = 'unicode61'
+);
+"""
+
+
+class ExportError(ValueError):
+    """The output file exists but is not a til export."""
+
+
+class ExportStats:
+    """What an export run did."""
+
+    def __init__(self):
+        self.total = 0
+        self.written = 0
+        self.removed = 0
+
+    def __str__(self) -> str:
+        return (f"{self.total} skills ({self.written} written, "
+                f"{self.removed} removed, "
+                f"{self.total - self.written} unchanged)")
+
+
+def content_hash(entry: TILEntry) -> str:
+    return hashlib.sha256(entry.content.encode()).hexdigest()
+
+
+def source_mtime(entry: TILEntry) -> Optional[float]:
+    """Source file mtime, or ``None`` for entries not backed by a file."""
+    if entry.blob_sha:
+        return None
+    try:
+        return entry.path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def entry_record(collection, entry: TILEntry) -> dict:
+    """Everything the export stores about one entry of ``collection``."""
+    errors = collection.validate(entry)
+    repo = collection.root_for(entry)
+    record = dict(entry.to_dict(),
+                  repo=str(repo) if repo else None,
+                  description=entry.frontmatter.get('description', ''),
+                  content=entry.content,
+                  mtime=source_mtime(entry),
+                  sha256=content_hash(entry),
+                  valid=not errors,
+                  errors=errors,
+                  graph_errors=collection.dependency_graph.errors_for(
+                      entry.slug))
+    record['sections'] = [
+        {'name': name, 'executable': name in entry.executable_sections,
+         'body': body}
+        for name, body in entry.sections.items()]
+    record['code_blocks'] = [
+        {'section': section, 'language': language, 'block': bid,
+         'code': normalize(code)}
+        for (section, language, code), bid in zip(entry.code_blocks,
+                                                  entry.block_ids)]
+    return record
+
+
+def _unchanged(collection, entry: TILEntry, mtime: Optional[float],
+               sha256: str, graph_errors: List[str]) -> bool:
+    """True if a stored row for ``entry`` is still current.
+
+    ``graph_errors`` covers the rest of the collection: a required skill
+    that was added or removed changes the entry's validity, not its file.
+    """
+    return (mtime == source_mtime(entry) and sha256 == content_hash(entry)
+            and graph_errors == collection.dependency_graph.errors_for(
+                entry.slug))
+
+
+def export_sqlite(collection, output: Path) -> ExportStats:
+    """Write/refresh ``output`` as a SQLite database."""
+    stats = ExportStats()
+    conn = sqlite3.connect(str(output))
+    try:
+        conn.execute('PRAGMA foreign_keys = ON')
+        _drop_outdated(conn, output)
+        conn.executescript(_SCHEMA)
+        existing = {slug: (skill_id, mtime, sha, json.loads(graph))
+                    for skill_id, slug, mtime, sha, graph in conn.execute(
+                        'SELECT id, slug, mtime, sha256, graph_errors '
+                        'FROM skills')}
+        with conn:
+            for entry in collection.entries:
+                stats.total += 1
+                old = existing.pop(entry.slug, None)
+                if old and _unchanged(collection, entry, *old[1:]):
+                    continue
+                if old:
+                    _delete_skill(conn, old[0])
+                _insert_skill(conn, entry_record(collection, entry))
+                stats.written += 1
+            for skill_id, *_ in existing.values():
+                _delete_skill(conn, skill_id)
+                stats.removed += 1
+            if stats.written or stats.removed:
+                conn.execute('DELETE FROM blocks WHERE id NOT IN '
+                             '(SELECT block_id FROM block_refs)')
+            conn.execute(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?), (?, ?)',
+                ('schema_version', str(SCHEMA_VERSION),
+                 'exported_at', str(time.time())))
+    finally:
+        conn.close()
+    return stats
+
+
+def _drop_outdated(conn: sqlite3.Connection, output: Path) -> None:
+    """Drop an export written with another schema; it is rebuilt.
+
+    Raises ``ExportError`` for a database that is not a til export, so
+    ``-o`` never destroys someone else's tables.
+    """
+    tables = {name: kind for name, kind in conn.execute(
+        "SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view')")}
+    if not tables:
+        return
+    version = None
+    if tables.get('meta') == 'table':
+        try:
+            row = conn.execute("SELECT value FROM meta "
+                               "WHERE key = 'schema_version'").fetchone()
+        except sqlite3.Error:
+            row = None
+        version = row[0] if row else None
+    if version is None:
+        raise ExportError(f"{output} is an SQLite database but not a til "
+                          "export; refusing to overwrite it")
+    if version == str(SCHEMA_VERSION):
+        return
+    for name in ('skills_fts', 'code_blocks', 'block_refs', 'blocks',
+                 'sections', 'skills', 'meta'):
+        if name in tables:
+            conn.execute(f'DROP {tables[name].upper()} {name}')
+    conn.commit()
+
+
+def _delete_skill(conn: sqlite3.Connection, skill_id: int) -> None:
+    conn.execute('DELETE FROM skills_fts WHERE rowid = ?', (skill_id,))
+    conn.execute('DELETE FROM skills WHERE id = ?', (skill_id,))
+
+
+def _insert_skill(conn: sqlite3.Connection, record: dict) -> None:
+    cur = conn.execute(
+        'INSERT INTO skills (slug, title, description, path, repo, '
+        'frontmatter, content, mtime, sha256, valid, errors, graph_errors) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (record['slug'], record['title'], record['description'],
+         record['path'], record['repo'], json.dumps(record['frontmatter']),
+         record['content'], record['mtime'], record['sha256'],
+         int(record['valid']), json.dumps(record['errors']),
+         json.dumps(record['graph_errors'])))
+    skill_id = cur.lastrowid
+    conn.executemany(
+        'INSERT INTO sections VALUES (?, ?, ?, ?, ?)',
+        [(skill_id, i, s['name'], int(s['executable']), s['body'])
+         for i, s in enumerate(record['sections'])])
+    conn.executemany(
+        'INSERT OR IGNORE INTO blocks VALUES (?, ?)',
+        [(b['block'], b['code']) for b in record['code_blocks']])
+    conn.executemany(
+        'INSERT INTO block_refs VALUES (?, ?, ?, ?, ?)',
+        [(skill_id, i, b['section'], b['language'], b['block'])
+         for i, b in enumerate(record['code_blocks'])])
+    body = '\n'.join(f"{s['name']}\n{s['body']}" for s in record['sections'])
+    conn.execute(
+        'INSERT INTO skills_fts (rowid, slug, title, description, body) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (skill_id, record['slug'], record['title'], record['description'],
+         body))
+
+
+def export_json(collection, output: Path) -> ExportStats:
+    """Write/refresh ``output`` as one JSON document.
+
+    Unchanged skills are copied from the previous export without being
+    re-validated; the file is only rewritten when something changed.
+    Skill records name their code blocks by id; the code is in the
+    top-level ``blocks`` map. Raises ``ExportError`` if ``output`` holds
+    anything but a til export.
+    """
+    stats = ExportStats()
+    previous: Dict[str, dict] = {}
+    old_blocks: Dict[str, str] = {}
+    try:
+        text = output.read_text()
+    except FileNotFoundError:
+        text = ''
+    if text.strip():
+        try:
+            document = json.loads(text)
+        except ValueError:
+            document = None
+        if not isinstance(document, dict) or 'schema_version' not in document:
+            raise ExportError(f"{output} is not a til export; "
+                              "refusing to overwrite it")
+        if document['schema_version'] == SCHEMA_VERSION:
+            previous = {r['slug']: r for r in document.get('skills', [])}
+            old_blocks = document.get('blocks', {})
+
+    records: List[dict] = []
+    blocks: Dict[str, str] = {}
+    for entry in collection.entries:
+        stats.total += 1
+        old = previous.pop(entry.slug, None)
+        if (old and _unchanged(collection, entry, old.get('mtime'),
+                               old.get('sha256'), old.get('graph_errors'))
+                and all(b['block'] in old_blocks
+                        for b in old['code_blocks'])):
+            for b in old['code_blocks']:
+                blocks[b['block']] = old_blocks[b['block']]
+            records.append(old)
+            continue
+        record = entry_record(collection, entry)
+        for b in record['code_blocks']:
+            blocks[b['block']] = b.pop('code')
+        records.append(record)
+        stats.written += 1
+    stats.removed = len(previous)
+
+    if stats.written or stats.removed or not output.exists():
+        _atomic_write(output, json.dumps({
+            'schema_version': SCHEMA_VERSION,
+            'exported_at': time.time(),
+            'skills': records,
+            'blocks': dict(sorted(blocks.items())),
+        }, indent=2))
+    return stats
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+def export_collection(collection, output: Path, fmt: str) -> ExportStats:
+    """Export ``collection`` to ``output`` as ``sqlite`` or ``json``."""
+    if fmt == 'sqlite':
+        return export_sqlite(collection, output)
+    if fmt == 'json':
+        return export_json(collection, output)
+    raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,186 @@
+"""Automatic fixes for common validation errors (``til fix``).
+
+Two fixes are applied to ``skills/<slug>/SKILL.md`` files:
+
+* untagged code fences get a language inferred from the block (see
+  ``til_cli.langinfer``) when the guess is at least ``min_confidence``;
+* a leading ``## `` heading is promoted to ``# `` when the body has no
+  level-1 heading.
+
+Fences are found with the same line-based rules ``validate_entry`` and
+the ``TILEntry`` parser use (``til._FENCE_RE``), and each file is
+rewritten in one pass over its lines, so the cost is linear in the file
+size however many fences it has. The frontmatter is never touched.
+
+Files are written atomically (temp file + rename) and only when their
+text changed; ``--check`` / ``--diff`` report unified diffs instead of
+writing. ``--jobs N`` fixes files in N worker processes.
+"""
+
+from __future__ import annotations
+
+import difflib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from .langinfer import infer
+from .til import _FENCE_RE, TILEntry
+
+# Guesses below this are reported but not applied.
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+_H1_RE = re.compile(r'^# .+', re.MULTILINE)
+_H2_RE = re.compile(r'^## ', re.MULTILINE)
+
+
+def infer_language(code: str, file_slug: str) -> str:
+    """Best guess for a block's language, whatever its confidence."""
+    return infer(code, file_slug).language
+
+
+class FixResult:
+    """Outcome for one file: the old and new text and what changed."""
+
+    def __init__(self, path: Path, old: str, new: str,
+                 blocks_tagged: int, h1_promoted: bool,
+                 blocks_skipped: int = 0):
+        self.path = path
+        self.old = old
+        self.new = new
+        self.blocks_tagged = blocks_tagged
+        self.h1_promoted = h1_promoted
+        # Untagged fences left alone because the guess was too weak.
+        self.blocks_skipped = blocks_skipped
+
+    @property
+    def changed(self) -> bool:
+        return self.old != self.new
+
+    def diff(self) -> str:
+        name = str(self.path)
+        old_name, new_name = ((name, name) if self.path.is_absolute()
+                              else (f"a/{name}", f"b/{name}"))
+        return ''.join(difflib.unified_diff(
+            self.old.splitlines(keepends=True),
+            self.new.splitlines(keepends=True),
+            fromfile=old_name, tofile=new_name))
+
+    def __str__(self) -> str:
+        text = (f"  {self.path}  blocks={self.blocks_tagged} "
+                f"h1={int(self.h1_promoted)}")
+        if self.blocks_skipped:
+            text += f" skipped={self.blocks_skipped}"
+        return text
+
+
+def fix_text(text: str, slug: str,
+             min_confidence: float = DEFAULT_MIN_CONFIDENCE
+             ) -> Tuple[str, int, bool, int]:
+    """Return ``(new_text, blocks_tagged, h1_promoted, blocks_skipped)``."""
+    _, body = TILEntry._split_frontmatter(text)
+    head = text[:len(text) - len(body)]
+
+    # Promote a leading ``## `` to ``# `` when no top-level heading exists.
+    h1_promoted = False
+    if not _H1_RE.search(body):
+        body, n = _H2_RE.subn('# ', body, count=1)
+        h1_promoted = bool(n)
+
+    # One pass over the lines: remember where the open fence went in the
+    # output and tag it once its closing fence (and thus its code) is
+    # known. An unclosed trailing fence is left alone.
+    lines = body.split('\n')
+    out: List[str] = []
+    open_at = -1
+    code: List[str] = []
+    blocks_tagged = blocks_skipped = 0
+    for line in lines:
+        fence = _FENCE_RE.match(line)
+        if fence and open_at < 0:
+            open_at = len(out)
+            code = []
+        elif fence:
+            opening = out[open_at]
+            opening_match = _FENCE_RE.match(opening)
+            if not opening_match.group(1):
+                guess = infer('\n'.join(code), slug)
+                if guess.confidence >= min_confidence:
+                    info = opening_match.group(2)
+                    info = f" {info}" if info else ''
+                    ending = '\r' if opening.endswith('\r') else ''
+                    out[open_at] = f"```{guess.language}{info}{ending}"
+                    blocks_tagged += 1
+                else:
+                    blocks_skipped += 1
+            open_at = -1
+        elif open_at >= 0:
+            code.append(line)
+        out.append(line)
+    return head + '\n'.join(out), blocks_tagged, h1_promoted, blocks_skipped
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """Replace ``path`` with ``text`` via a temp file in the same directory."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(text)
+        os.chmod(tmp, path.stat().st_mode & 0o7777)
+        tmp.replace(path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def fix_file(path: Path, write: bool = True,
+             min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> FixResult:
+    """Fix one file; with ``write`` save it if (and only if) it changed."""
+    old = path.read_text()
+    result = FixResult(path, old, *fix_text(old, path.parent.name,
+                                            min_confidence))
+    if write and result.changed:
+        atomic_write(path, result.new)
+    return result
+
+
+def _fix_file_task(args: Tuple[Path, bool, float]) -> FixResult:
+    return fix_file(*args)
+
+
+def fix_files(paths: Sequence[Path], write: bool = True, jobs: int = 1,
+              min_confidence: float = DEFAULT_MIN_CONFIDENCE
+              ) -> List[FixResult]:
+    """Fix ``paths`` (in N processes with ``jobs``); results in input order."""
+    if jobs <= 1 or len(paths) < 2:
+        return [fix_file(path, write, min_confidence) for path in paths]
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_fix_file_task,
+                             [(path, write, min_confidence) for path in paths],
+                             chunksize=chunksize))
+
+
+def skill_paths(root_dirs: Sequence[Path], names: Sequence[str] = ()) -> List[Path]:
+    """Files to fix: every skill, or the given slugs / file paths.
+
+    Raises ``FileNotFoundError`` for a name that matches nothing.
+    """
+    if not names:
+        return [path for root in root_dirs
+                for path in sorted(Path(root).glob('skills/*/SKILL.md'))]
+    paths = []
+    for name in names:
+        candidate = Path(name)
+        if candidate.is_file():
+            paths.append(candidate)
+            continue
+        for root in root_dirs:
+            skill = Path(root) / 'skills' / name / 'SKILL.md'
+            if skill.is_file():
+                paths.append(skill)
+                break
+        else:
+            raise FileNotFoundError(f"Entry not found: {name}")
+    return paths
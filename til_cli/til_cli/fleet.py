@@ -0,0 +1,197 @@
+"""Run one executable section on many hosts (``til execute --hosts``).
+
+Every host gets the section's blocks in order, each piped to a
+*transport* command on its stdin; hosts run concurrently on a pool of
+``parallel`` threads. Transports:
+
+* ``ssh`` (default) — ``ssh -o BatchMode=yes HOST bash -s -- HOST``
+  (``python3 - HOST`` for Python blocks);
+* ``local`` — the same interpreters on this machine, for tests and dry
+  runs.
+
+Either way the block gets the host name as its first argument. With a
+timeout, the ssh transport also runs the remote interpreter under
+``timeout(1)`` (GNU coreutils on the host), because killing the local
+``ssh`` process does not stop the remote command. Each
+host's output is streamed with a ``[HOST]`` prefix and also written to
+``<log_dir>/<host>.log``. A host stops at its first failing block;
+with ``fail_fast`` no further hosts are started once any host failed,
+and hosts already running stop before their next block.
+
+The hosts file has one host per line (``user@host`` works for ssh);
+blank lines and ``#`` comments are skipped.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .journal import append as journal_append, record as journal_record
+from .runner import KILL_GRACE, BlockRunner, parse_timeout
+from .til import ExecutableBlock
+
+DEFAULT_PARALLEL = 8
+# Host names that can't be mistaken for ssh options or escape the log dir.
+_HOST_RE = re.compile(r'^[A-Za-z0-9_.@%:\[\]-]+$')
+
+
+def read_hosts(path: Path) -> List[str]:
+    """Hosts listed in ``path``; ``ValueError`` for an invalid name."""
+    hosts = []
+    for line in Path(path).read_text().splitlines():
+        host = line.split('#', 1)[0].strip()
+        if not host:
+            continue
+        if host.startswith('-') or not _HOST_RE.match(host):
+            raise ValueError(f"Invalid host in {path}: {host!r}")
+        if host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+class Transport(ABC):
+    """Interface: ``argv(host, language, timeout)`` reads the block on stdin."""
+
+    name = ''
+    # language -> interpreter argv that reads the script from stdin.
+    interpreters = {'bash': ['bash', '-s', '--'], 'sh': ['bash', '-s', '--'],
+                    'python': ['python3', '-']}
+
+    @abstractmethod
+    def argv(self, host: str, language: str,
+             timeout: Optional[float] = None) -> List[str]:
+        """Command running a ``language`` block for ``host``; ``timeout``
+        is enforced locally as well, so transports may ignore it."""
+
+
+class SSHTransport(Transport):
+    name = 'ssh'
+
+    def argv(self, host: str, language: str,
+             timeout: Optional[float] = None) -> List[str]:
+        remote = list(self.interpreters[language])
+        if timeout:
+            # Killing the local ssh leaves the remote command running.
+            remote = ['timeout', '-k', f"{KILL_GRACE:g}", f"{timeout:g}",
+                      *remote]
+        return ['ssh', '-o', 'BatchMode=yes', host, *remote, host]
+
+
+class LocalTransport(Transport):
+    name = 'local'
+
+    def argv(self, host: str, language: str,
+             timeout: Optional[float] = None) -> List[str]:
+        argv = list(self.interpreters[language])
+        if language == 'python':
+            argv[0] = sys.executable
+        return [*argv, host]
+
+
+TRANSPORTS = {t.name: t for t in (SSHTransport, LocalTransport)}
+
+
+def create_transport(name: str) -> Transport:
+    """Instantiate transport ``name``; ``ValueError`` for unknown names."""
+    try:
+        return TRANSPORTS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown transport '{name}' "
+            f"(choose from: {', '.join(sorted(TRANSPORTS))})") from None
+
+
+class HostResult:
+    """How one host's run ended: exit status, per-block usage, log."""
+
+    def __init__(self, host: str, log: Path):
+        self.host = host
+        self.log = log
+        # ``None`` until the host ran; stays ``None`` if it was skipped.
+        self.returncode: Optional[int] = None
+        # Set when ``fail_fast`` stopped the host before its last block.
+        self.stopped = False
+        self.blocks = []  # ``runner.Usage`` of each block that ran
+        self.wall = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.stopped
+
+    @property
+    def status(self) -> str:
+        if self.returncode is None:
+            return 'skipped'
+        if self.stopped:
+            return 'stopped'
+        if self.blocks and self.blocks[-1].timed_out:
+            return 'timed out'
+        return 'ok' if self.ok else f"exit {self.returncode}"
+
+    def to_dict(self) -> dict:
+        return {'host': self.host, 'status': self.status, 'ok': self.ok,
+                'returncode': self.returncode, 'wall': self.wall,
+                'log': str(self.log),
+                'blocks': [usage._asdict() for usage in self.blocks]}
+
+
+def run_fleet(hosts: Sequence[str], blocks: Sequence[ExecutableBlock],
+              log_dir: Path, transport: Optional[Transport] = None,
+              parallel: int = DEFAULT_PARALLEL, fail_fast: bool = False,
+              timeout: Optional[float] = None, timestamps: bool = False,
+              journal: Optional[dict] = None) -> List[HostResult]:
+    """Run ``blocks`` on every host; results in ``hosts`` order.
+
+    Block timeouts (``timeout=N`` fence options, else ``timeout``) are
+    parsed up front and raise ``ValueError``. With ``journal`` (``slug``
+    and ``section``) every block run is recorded under its host.
+    """
+    transport = transport or SSHTransport()
+    for block in blocks:
+        if block.language not in transport.interpreters:
+            raise ValueError(f"Unsupported language: {block.language}")
+    timeouts = [parse_timeout(block.options.get('timeout')) for block in blocks]
+    log_dir.mkdir(parents=True, exist_ok=True)
+    results = [HostResult(host, log_dir / f"{host}.log") for host in hosts]
+    failed = threading.Event()
+
+    def run_host(result: HostResult) -> None:
+        if fail_fast and failed.is_set():
+            return
+        started = time.monotonic()
+        result.returncode = 0
+        with BlockRunner(timeout, timestamps=timestamps, prefix=True,
+                         log=result.log) as runner:
+            for number, (block, block_timeout) in enumerate(
+                    zip(blocks, timeouts), 1):
+                if fail_fast and failed.is_set():
+                    result.stopped = True
+                    break
+                start = time.time()
+                result.returncode = runner.run(
+                    transport.argv(result.host, block.language,
+                                   block_timeout or timeout),
+                    label=result.host, timeout=block_timeout,
+                    input=block.code.encode() + b'\n')
+                result.blocks.append(runner.last)
+                if journal is not None:
+                    journal_append(journal_record(
+                        block=number, language=block.language,
+                        code=block.code, usage=runner.last, start=start,
+                        host=result.host, **journal))
+                if result.returncode != 0:
+                    failed.set()
+                    break
+        result.wall = time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel),
+                            thread_name_prefix='til-fleet') as pool:
+        list(pool.map(run_host, results))
+    return results
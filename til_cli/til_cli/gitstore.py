@@ -0,0 +1,102 @@
+"""Load skills straight from the git object store.
+
+``load_entries(repo, ref)`` enumerates ``skills/<slug>/SKILL.md`` in the
+tree of ``ref`` with a single ``git ls-tree -r`` and reads every blob
+through one ``git cat-file --batch`` stream, so a bare mirror or any
+revision can be served without a checkout.
+
+Blob SHAs identify file content exactly, so parsed entries are cached
+per ``(blob_sha, path)`` for the life of the process: reloading a ref
+(or another ref sharing most blobs) only parses what changed.
+"""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Sequence, Tuple
+
+from .til import TILEntry
+
+# (blob_sha, entry path) -> parsed entry.
+_ENTRY_CACHE: Dict[Tuple[str, str], TILEntry] = {}
+
+
+class GitStoreError(RuntimeError):
+    """Raised when git cannot list or read the requested tree."""
+
+
+def _git(repo: Path, *args: str, input: bytes = None) -> bytes:
+    try:
+        proc = subprocess.run(
+            ['git', '-C', str(repo), *args],
+            input=input, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise GitStoreError("git is not installed") from e
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode(errors='replace').strip()
+        raise GitStoreError(f"git {args[0]} failed: {message}") from e
+    return proc.stdout
+
+
+def list_skill_blobs(repo: Path, ref: str = 'HEAD') -> List[Tuple[str, str]]:
+    """``(path, blob_sha)`` for every ``skills/<slug>/SKILL.md`` at ``ref``."""
+    out = _git(repo, 'ls-tree', '-r', '-z', ref, '--', 'skills')
+    blobs = []
+    for record in out.split(b'\0'):
+        if not record:
+            continue
+        meta, _, path = record.decode().partition('\t')
+        _mode, obj_type, sha = meta.split()
+        parts = PurePosixPath(path).parts
+        if (obj_type == 'blob' and len(parts) == 3
+                and parts[0] == 'skills' and parts[2] == 'SKILL.md'):
+            blobs.append((path, sha))
+    return sorted(blobs)
+
+
+def read_blobs(repo: Path, shas: Sequence[str]) -> Dict[str, bytes]:
+    """Read ``shas`` through one ``git cat-file --batch`` process."""
+    if not shas:
+        return {}
+    out = _git(repo, 'cat-file', '--batch',
+               input=''.join(f'{sha}\n' for sha in shas).encode())
+    blobs: Dict[str, bytes] = {}
+    pos = 0
+    for _ in shas:
+        eol = out.index(b'\n', pos)
+        header = out[pos:eol].decode().split()
+        pos = eol + 1
+        if len(header) != 3:
+            # ``<sha> missing``: nothing else follows for this object.
+            continue
+        sha, _type, size = header
+        blobs[sha] = out[pos:pos + int(size)]
+        pos += int(size) + 1
+    return blobs
+
+
+def load_entries(repo: Path, ref: str = 'HEAD') -> List[TILEntry]:
+    """Parse every skill at ``ref``; unchanged blobs come from the cache.
+
+    Entry paths are ``repo / <path in tree>`` and need not exist on disk;
+    each entry carries its ``blob_sha``.
+    """
+    repo = Path(repo)
+    blobs = list_skill_blobs(repo, ref)
+    missing = [sha for path, sha in blobs
+               if (sha, str(repo / path)) not in _ENTRY_CACHE]
+    contents = read_blobs(repo, sorted(set(missing)))
+    entries = []
+    for path, sha in blobs:
+        key = (sha, str(repo / path))
+        entry = _ENTRY_CACHE.get(key)
+        if entry is None:
+            data = contents.get(sha)
+            if data is None:
+                continue
+            entry = TILEntry(repo / path, data.decode(errors='replace'))
+            entry.blob_sha = sha
+            _ENTRY_CACHE[key] = entry
+        entries.append(entry)
+    return entries
@@ -0,0 +1,162 @@
+"""Append-only journal of executed blocks (``til history``).
+
+Every block ``til execute`` runs (locally or with ``--hosts``) appends
+one JSON line to ``<state_dir>/journal.ndjson``::
+
+    {"start": 1760000000.1, "end": 1760000012.4, "host": "pi-01",
+     "slug": "tmux-tpm-install", "section": "Install", "block": 1,
+     "hash": "3f2a...", "language": "bash", "returncode": 0,
+     "timed_out": false, "wall": 12.3, "user_cpu": 1.2,
+     "system_cpu": 0.4, "max_rss": 26214400}
+
+``hash`` identifies the block's code, so edits to a block start a new
+row in the statistics. Each record is a single ``O_APPEND`` write made
+after the block has finished, so concurrent ``til`` processes never
+interleave lines and nothing is added to a block's run time. Set
+``journal = off`` (``TIL_JOURNAL=off``) to stop recording.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import socket
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .blocks import block_id
+from .config import get_setting, state_dir
+
+logger = logging.getLogger("til")
+
+_SINCE_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$')
+_SINCE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def journal_path() -> Path:
+    return state_dir() / 'journal.ndjson'
+
+
+def enabled() -> bool:
+    return (get_setting('journal', 'on') or 'on').strip().lower() not in (
+        'off', '0', 'false', 'no')
+
+
+def block_hash(code: str) -> str:
+    """Content id of a block's code (``blocks.block_id``)."""
+    return block_id(code)
+
+
+def record(slug: str, section: str, block: int, language: str, code: str,
+           usage, start: float, host: Optional[str] = None) -> dict:
+    """Journal record for one finished block (``usage``: ``runner.Usage``)."""
+    return {'start': round(start, 3), 'end': round(start + usage.wall, 3),
+            'host': host or socket.gethostname(), 'slug': slug,
+            'section': section, 'block': block, 'hash': block_hash(code),
+            'language': language, 'returncode': usage.returncode,
+            'timed_out': usage.timed_out, 'wall': round(usage.wall, 3),
+            'user_cpu': round(usage.user_cpu, 3),
+            'system_cpu': round(usage.system_cpu, 3),
+            'max_rss': usage.max_rss}
+
+
+def append(entry: dict, path: Optional[Path] = None) -> None:
+    """Append ``entry`` as one line; failures are logged, never raised."""
+    if not enabled():
+        return
+    line = (json.dumps(entry, separators=(',', ':')) + '\n').encode()
+    try:
+        fd = os.open(path or journal_path(),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.warning(f"Could not write the execution journal: {e}")
+
+
+def read_journal(path: Optional[Path] = None) -> Iterator[dict]:
+    """Records in the order they were written; bad lines are skipped."""
+    try:
+        fh = open(path or journal_path(), 'rb')
+    except FileNotFoundError:
+        return
+    with fh:
+        for raw in fh:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                yield entry
+
+
+def parse_since(value: str, now: Optional[float] = None) -> float:
+    """Epoch seconds from ``7d`` / ``12h`` / ``30m`` or an ISO date/time."""
+    m = _SINCE_RE.match(value.strip())
+    if m:
+        return (now or time.time()) - float(m.group(1)) * _SINCE_UNITS[m.group(2)]
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid --since value: {value!r} "
+                         "(expected e.g. 7d, 12h or 2024-05-01)") from None
+
+
+def filter_records(records: Iterable[dict], slug: Optional[str] = None,
+                   section: Optional[str] = None, host: Optional[str] = None,
+                   since: Optional[float] = None,
+                   failed: bool = False) -> Iterator[dict]:
+    for entry in records:
+        if slug and entry.get('slug') != slug:
+            continue
+        if section and entry.get('section') != section:
+            continue
+        if host and entry.get('host') != host:
+            continue
+        if since is not None and entry.get('start', 0) < since:
+            continue
+        if failed and entry.get('returncode') == 0:
+            continue
+        yield entry
+
+
+def block_stats(records: Iterable[dict]) -> List[dict]:
+    """Runs, failure rate and mean/max duration per block version.
+
+    Rows are keyed by ``(slug, section, block, hash)`` and sorted by slug,
+    section and block, the latest version of a block first.
+    """
+    rows: Dict[tuple, dict] = {}
+    for entry in records:
+        key = (entry.get('slug'), entry.get('section'), entry.get('block'),
+               entry.get('hash'))
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                'slug': key[0], 'section': key[1], 'block': key[2],
+                'hash': key[3], 'runs': 0, 'failures': 0, 'total_wall': 0.0,
+                'max_wall': 0.0, 'last_run': 0.0, 'hosts': set()}
+        wall = entry.get('wall', 0.0)
+        row['runs'] += 1
+        row['failures'] += entry.get('returncode') != 0
+        row['total_wall'] += wall
+        row['max_wall'] = max(row['max_wall'], wall)
+        row['last_run'] = max(row['last_run'], entry.get('start', 0.0))
+        row['hosts'].add(entry.get('host'))
+    stats = []
+    for row in rows.values():
+        total = row.pop('total_wall')
+        row['mean_wall'] = round(total / row['runs'], 3)
+        row['failure_rate'] = round(row['failures'] / row['runs'], 3)
+        row['hosts'] = len(row['hosts'])
+        stats.append(row)
+    stats.sort(key=lambda r: -r['last_run'])
+    stats.sort(key=lambda r: (r['slug'] or '', r['section'] or '',
+                              r['block'] or 0))
+    return stats
@@ -0,0 +1,127 @@
+"""Infer the language of an untagged code fence.
+
+``infer(code, slug)`` returns a ``Guess`` with the language, a
+confidence between 0 and 1 and the name of the rule that decided it.
+``til validate`` shows guesses as suggestions and ``til fix`` only
+applies those at or above its ``--min-confidence``.
+
+Rules are tried in priority order (shebang, vim, app config, tmux,
+helix, boot config, shell command, ...) against a table of signals
+built once at import. Each block is lowercased once (never split and
+re-joined) and the signals are found with ``str``'s C substring search;
+the shell command prefixes are a single ``str.startswith(tuple)`` on the
+first non-blank line. (A case-insensitive alternation regex over the
+same signals measured several times slower in CPython; see
+``benchmarks/bench_langinfer.py``.)
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Tuple
+
+from .til import _FENCE_RE, TILEntry
+
+# Lowercase substrings looked for anywhere in the block, by the group
+# that decides the rule they feed.
+SIGNALS = {
+    'vim': ("vimruntime", "syntax enable", "filetype", "setfiletype"),
+    # ghostty / helix style ``key = value`` config.
+    'app_config': (
+        "keybind =", "theme =", "macos-option-as-alt", "background =",
+        "foreground =", "font-family", "macos-titlebar",
+    ),
+    # Linux device-tree style boot config.
+    'boot_config': ("dtparam", "dtoverlay"),
+}
+
+# First-line prefixes of shell commands (case-sensitive).
+SHELL_COMMAND_STARTS = (
+    "ssh ", "sudo ", "git ", "brew ", "apt ", "pipx ", "pip ", "pip3 ",
+    "bun ", "ffmpeg ", "ls ", "cat ", "echo ", "date ", "go ", "gs ",
+    "lsof ", "jupyter ", "tldr ", "tmux ", "infocmp", "tic ",
+    "mkdir ", "cd ", "python3 ", "python ", "rm ", "mv ", "cp ",
+    "xattr ", "OUT=", "ghostty ", "direnv", "if [", "pv ", "$ ",
+    "source ", "export ", "nvim", "vim", "llm ",
+)
+
+_FIRST_LINE_RE = re.compile(r'\S[^\r\n]*')
+_TMUX_DIRECTIVE_RE = re.compile(r'^\s*(set|bind|setw|run)\b', re.MULTILINE)
+_SHEBANG_INTERPRETERS = (('bash', 'bash'), ('python', 'python'),
+                         ('node', 'javascript'))
+
+
+class Guess(NamedTuple):
+    language: str
+    confidence: float
+    rule: str
+
+
+def infer(code: str, file_slug: str = '') -> Guess:
+    """Guess the language of ``code`` from its content and the skill slug."""
+    m = _FIRST_LINE_RE.search(code)
+    if not m:
+        return Guess('text', 0.6, 'empty')
+    first = m.group(0)
+
+    # Shebangs win outright.
+    if first.startswith('#!'):
+        if first.startswith(('#!/bin/sh', '#!/usr/bin/env sh')):
+            return Guess('sh', 0.99, 'shebang')
+        for needle, language in _SHEBANG_INTERPRETERS:
+            if needle in first:
+                return Guess(language, 0.99, 'shebang')
+        return Guess('sh', 0.7, 'shebang')
+
+    lowered = code.lower()
+
+    def has(group: str) -> bool:
+        return any(signal in lowered for signal in SIGNALS[group])
+
+    # vimrc style (a vim comment ``"`` plus a vim keyword).
+    if first.startswith('"') and has('vim'):
+        return Guess('vim', 0.9, 'vim')
+    if has('app_config'):
+        return Guess('conf', 0.85, 'app-config')
+    if file_slug.startswith('tmux-'):
+        if _TMUX_DIRECTIVE_RE.search(code):
+            return Guess('tmux', 0.85, 'tmux-directive')
+        if first.startswith('#'):
+            return Guess('tmux', 0.6, 'tmux-comment')
+    if file_slug.startswith('hx-') and '=' in first:
+        return Guess('toml', 0.7, 'helix-config')
+    if has('boot_config'):
+        return Guess('conf', 0.85, 'boot-config')
+    if first.startswith(SHELL_COMMAND_STARTS):
+        return Guess('bash', 0.9, 'shell-command')
+    if 'plugins=' in first or '@plugin' in first:
+        return Guess('bash', 0.6, 'plugin-list')
+    # ``<prefix>:list-keys`` style snippets are tmux key sequences, not
+    # shell.
+    if first.startswith('<prefix>'):
+        return Guess('text', 0.7, 'tmux-keys')
+    # Conservative fallback; too weak for ``til fix`` by default.
+    return Guess('bash', 0.3, 'fallback')
+
+
+def untagged_fences(entry: TILEntry) -> List[Tuple[int, str]]:
+    """``(line, code)`` of each closed, untagged fence; 1-based file lines."""
+    fences = []
+    open_line, open_lang, code = 0, None, []
+    for line_no, line in enumerate(entry.content.split('\n'), 1):
+        m = _FENCE_RE.match(line)
+        if m and open_lang is None:
+            open_line, open_lang, code = line_no, m.group(1), []
+        elif m:
+            if not open_lang:
+                fences.append((open_line, '\n'.join(code)))
+            open_lang = None
+        elif open_lang is not None:
+            code.append(line)
+    return fences
+
+
+def suggest_tags(entry: TILEntry) -> List[Tuple[int, Guess]]:
+    """A ``Guess`` for every untagged fence of ``entry``, by file line."""
+    return [(line, infer(code, entry.slug))
+            for line, code in untagged_fences(entry)]
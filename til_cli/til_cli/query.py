@@ -0,0 +1,390 @@
+"""Field-aware query language for ``til search``.
+
+Queries are evaluated against a :class:`SearchIndex` of per-field
+postings built once from the parsed entries, so a query touches only the
+postings of the terms it names instead of rescanning every file.
+
+Syntax::
+
+    tmux plugin                 # implicit AND of two words
+    "shift enter"               # phrase: adjacent words, in order
+    name:tmux-*                 # keyword field, ``*``/``?`` wildcards
+    title:ghostty OR title:tmux
+    section:Install lang:bash executable:true
+    led NOT name:linux-rpi-*    # ``-term`` is shorthand for ``NOT term``
+    (ffmpeg OR gs) AND NOT lang:python
+
+Fields:
+
+* ``title``, ``description``, ``section`` (section headings) and bare
+  words (all text: title, description, metadata, section headings and
+  bodies, slug) are text fields. Each word matches, case-insensitively,
+  every token containing it (``mux`` finds ``tmux``, like the plain
+  substring search this replaced); quoted phrases require adjacent
+  tokens.
+* ``name`` (slug / frontmatter name), ``lang`` (code fence languages)
+  and ``executable`` (``true``/``false``) are exact keyword fields.
+
+``AND``, ``OR`` and ``NOT`` are only operators when upper-case; ``AND``
+binds tighter than ``OR``.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import (
+    Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple)
+
+# Text fields are tokenised; keyword fields store whole lower-cased values.
+TEXT_FIELDS = ('text', 'title', 'description', 'section')
+KEYWORD_FIELDS = ('name', 'lang', 'executable')
+
+# Position gap inserted between separate values of one field (two section
+# headings, title vs. body, ...) so phrases never match across them.
+_VALUE_GAP = 1000
+
+_WORD_RE = re.compile(r'[^\W_]+')
+# Characters that make a keyword query word a shell-style pattern.
+_WILDCARDS = '*?['
+_TOKEN_RE = re.compile(
+    r'\s*(?:(?P<paren>[()])'
+    r'|(?:(?P<field>[A-Za-z]+):)?(?:"(?P<phrase>[^"]*)"?|(?P<word>[^\s()"]+))'
+    r')')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a search expression cannot be parsed."""
+
+
+def tokenize_text(text: str) -> List[str]:
+    """Split ``text`` into lower-case word tokens."""
+    return _WORD_RE.findall(text.lower())
+
+
+def keyword_matcher(word: str) -> Callable[[str], object]:
+    """Test for the keyword values query ``word`` matches.
+
+    ``*``, ``?`` and ``[...]`` are shell-style wildcards; any other word
+    must equal the value.
+    """
+    if any(c in word for c in _WILDCARDS):
+        return re.compile(fnmatch.translate(word)).match
+    return word.__eq__
+
+
+class SearchIndex:
+    """Per-field inverted index over a list of entries.
+
+    ``postings[field][token]`` maps entry ids (positions in ``entries``)
+    to the token's positions within that field, which is what phrase
+    queries need. Sorted vocabularies for substring lookups are built
+    lazily per field, and each word's expansion is kept.
+    """
+
+    def __init__(self, entries: Sequence):
+        self.entries = list(entries)
+        self.postings: Dict[str, Dict[str, Dict[int, List[int]]]] = {
+            field: {} for field in TEXT_FIELDS + KEYWORD_FIELDS}
+        self._vocab: Dict[str, List[str]] = {}
+        self._expanded: Dict[Tuple[str, str], List[str]] = {}
+        for doc_id, entry in enumerate(self.entries):
+            self._add(doc_id, entry)
+
+    def _add(self, doc_id: int, entry) -> None:
+        description = entry.frontmatter.get('description', '')
+        section_names = list(entry.sections)
+        self._add_text(doc_id, 'title', [entry.title])
+        self._add_text(doc_id, 'description', [description])
+        self._add_text(doc_id, 'section', section_names)
+        self._add_text(doc_id, 'text', [
+            entry.title, description, entry.slug,
+            *(str(v) for v in entry.metadata.values()),
+            *(f"{name}\n{body}" for name, body in entry.sections.items()),
+        ])
+
+        names = {entry.slug.lower()}
+        if entry.frontmatter.get('name'):
+            names.add(entry.frontmatter['name'].lower())
+        self._add_keywords(doc_id, 'name', names)
+        self._add_keywords(
+            doc_id, 'lang', {lang.lower() for lang in entry.fence_languages})
+        self._add_keywords(
+            doc_id, 'executable',
+            {'true' if entry.executable_sections else 'false'})
+
+    def _add_text(self, doc_id: int, field: str, values: Iterable[str]) -> None:
+        postings = self.postings[field]
+        pos = 0
+        for value in values:
+            for token in tokenize_text(value):
+                postings.setdefault(token, {}).setdefault(doc_id, []).append(pos)
+                pos += 1
+            pos += _VALUE_GAP
+
+    def _add_keywords(self, doc_id: int, field: str, values: Set[str]) -> None:
+        postings = self.postings[field]
+        for value in values:
+            postings.setdefault(value, {})[doc_id] = [0]
+
+    def vocabulary(self, field: str) -> List[str]:
+        """Sorted tokens of ``field`` (built on first use)."""
+        vocab = self._vocab.get(field)
+        if vocab is None:
+            vocab = self._vocab[field] = sorted(self.postings[field])
+        return vocab
+
+    def expand(self, field: str, word: str) -> List[str]:
+        """Index tokens of ``field`` matched by query ``word``."""
+        postings = self.postings[field]
+        if field in KEYWORD_FIELDS:
+            if any(c in word for c in _WILDCARDS):
+                return list(filter(keyword_matcher(word),
+                                   self.vocabulary(field)))
+            return [word] if word in postings else []
+        tokens = self._expanded.get((field, word))
+        if tokens is None:
+            tokens = self._expanded[field, word] = [
+                token for token in self.vocabulary(field) if word in token]
+        return tokens
+
+    def positions(self, field: str, word: str) -> Dict[int, Set[int]]:
+        """Merged ``doc -> positions`` for every token ``word`` expands to."""
+        tokens = self.expand(field, word)
+        if len(tokens) == 1:
+            return {doc: set(pos)
+                    for doc, pos in self.postings[field][tokens[0]].items()}
+        merged: Dict[int, Set[int]] = {}
+        for token in tokens:
+            for doc, pos in self.postings[field][token].items():
+                merged.setdefault(doc, set()).update(pos)
+        return merged
+
+    def search(self, expression: str) -> List:
+        """Evaluate ``expression`` and return matching entries in order."""
+        node = parse_query(expression)
+        return [self.entries[i] for i in sorted(node.evaluate(self))]
+
+
+# --------------------------------------------------------------------------
+# Query AST
+# --------------------------------------------------------------------------
+
+class Term:
+    """``field:value`` (or a bare word / phrase against ``text``)."""
+
+    def __init__(self, field: str, value: str, phrase: bool = False):
+        self.field = field
+        self.value = value
+        self.phrase = phrase
+
+    def evaluate(self, index: SearchIndex) -> Set[int]:
+        if self.field in KEYWORD_FIELDS:
+            docs: Set[int] = set()
+            for token in index.expand(self.field, self.value.lower()):
+                docs.update(index.postings[self.field][token])
+            return docs
+
+        words = tokenize_text(self.value)
+        if not words:
+            return set()
+        if len(words) == 1 and not self.phrase:
+            return set(index.positions(self.field, words[0]))
+
+        # Phrase (explicit, or implied by punctuation inside one word such
+        # as ``dtoverlay=gpio-led``): intersect smallest postings first,
+        # then check adjacency only for the surviving entries.
+        per_word = [index.positions(self.field, w) for w in words]
+        candidates = set(min(per_word, key=len))
+        for postings in sorted(per_word, key=len):
+            candidates.intersection_update(postings)
+            if not candidates:
+                return set()
+        return {doc for doc in candidates
+                if _adjacent([p[doc] for p in per_word])}
+
+    def __repr__(self) -> str:
+        return f"Term({self.field!r}, {self.value!r})"
+
+
+def _adjacent(positions: List[Set[int]]) -> bool:
+    """True if some ``p`` has ``p + i`` in ``positions[i]`` for every ``i``."""
+    return any(all(start + i in positions[i] for i in range(1, len(positions)))
+               for start in positions[0])
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def evaluate(self, index: SearchIndex) -> Set[int]:
+        return set(range(len(index.entries))) - self.child.evaluate(index)
+
+
+class And:
+    def __init__(self, children: List):
+        self.children = children
+
+    def evaluate(self, index: SearchIndex) -> Set[int]:
+        positives = [c for c in self.children if not isinstance(c, Not)]
+        negatives = [c.child for c in self.children if isinstance(c, Not)]
+        if positives:
+            sets = sorted((c.evaluate(index) for c in positives), key=len)
+            result = sets[0]
+            for other in sets[1:]:
+                if not result:
+                    break
+                result = result & other
+        else:
+            result = set(range(len(index.entries)))
+        for child in negatives:
+            if not result:
+                break
+            result = result - child.evaluate(index)
+        return result
+
+
+class Or:
+    def __init__(self, children: List):
+        self.children = children
+
+    def evaluate(self, index: SearchIndex) -> Set[int]:
+        result: Set[int] = set()
+        for child in self.children:
+            result |= child.evaluate(index)
+        return result
+
+
+# --------------------------------------------------------------------------
+# Parser
+# --------------------------------------------------------------------------
+
+_FIELD_ALIASES = {
+    'name': 'name', 'slug': 'name',
+    'title': 'title',
+    'description': 'description', 'desc': 'description',
+    'section': 'section',
+    'lang': 'lang', 'language': 'lang',
+    'executable': 'executable', 'exec': 'executable',
+}
+
+
+def _lex(expression: str) -> List[tuple]:
+    tokens: List[tuple] = []
+    pos = 0
+    while pos < len(expression):
+        stripped = expression[pos:].lstrip()
+        if not stripped:
+            break
+        pos = len(expression) - len(stripped)
+        # ``-term`` / ``-field:value`` is shorthand for ``NOT ...``.
+        if stripped[0] == '-' and len(stripped) > 1 and not stripped[1].isspace():
+            tokens.append(('op', 'NOT'))
+            pos += 1
+            continue
+        m = _TOKEN_RE.match(expression, pos)
+        if not m or m.end() == pos:
+            raise QuerySyntaxError(
+                f"Unexpected character at position {pos}: "
+                f"{expression[pos:pos + 10]!r}")
+        pos = m.end()
+        if m.group('paren'):
+            tokens.append(('paren', m.group('paren')))
+            continue
+        field = m.group('field')
+        if field is not None:
+            canonical = _FIELD_ALIASES.get(field.lower())
+            if canonical is None:
+                # Not a field we know (``http://...``, ``key:value`` in a
+                # config snippet): search for the literal text instead.
+                tokens.append(('term', Term('text', m.group(0).strip())))
+                continue
+            field = canonical
+        if m.group('phrase') is not None:
+            tokens.append(('term', Term(field or 'text', m.group('phrase'),
+                                        phrase=True)))
+            continue
+        word = m.group('word')
+        if field is None and word in ('AND', 'OR', 'NOT'):
+            tokens.append(('op', word))
+        else:
+            tokens.append(('term', Term(field or 'text', word)))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ('op', 'OR'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while True:
+            tok = self.peek()
+            if tok is None or tok == ('op', 'OR') or tok == ('paren', ')'):
+                break
+            if tok == ('op', 'AND'):
+                self.take()
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary(self):
+        tok = self.peek()
+        if tok == ('op', 'NOT'):
+            self.take()
+            return Not(self.parse_unary())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        tok = self.peek()
+        if tok is None:
+            raise QuerySyntaxError("Unexpected end of query")
+        self.take()
+        if tok == ('paren', '('):
+            node = self.parse_or()
+            if self.peek() != ('paren', ')'):
+                raise QuerySyntaxError("Missing closing parenthesis")
+            self.take()
+            return node
+        if tok[0] == 'term':
+            return tok[1]
+        raise QuerySyntaxError(f"Unexpected {tok[1]!r}")
+
+
+def parse_query(expression: str):
+    """Parse ``expression`` into an AST with an ``evaluate(index)`` method."""
+    tokens = _lex(expression)
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise QuerySyntaxError(f"Unexpected {parser.peek()[1]!r}")
+    return node
+
+
+def positive_terms(node) -> List[Term]:
+    """Terms that can contribute to a match (everything not under ``NOT``)."""
+    if isinstance(node, Term):
+        return [node]
+    if isinstance(node, Not):
+        return []
+    terms: List[Term] = []
+    for child in node.children:
+        terms.extend(positive_terms(child))
+    return terms
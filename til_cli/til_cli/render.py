@@ -5,21 +5,46 @@ shells out to it when stdout is a TTY and the user hasn't opted out.
 Falls back to plain text in every "this would be unsafe to colorise"
 condition (non-TTY, ``NO_COLOR``, ``--plain``, ``TIL_RENDERER=plain``,
 missing renderer).
+
+Rendered output is cached under ``<cache_dir>/render/`` (see
+``til_cli.config``), keyed by the SHA-256 of the content, the renderer
+argv (which carries the terminal width), the theme variables in
+``THEME_ENV``, the renderer binary's path, mtime and size, and for
+``bat`` the contents of its config files (``bat_config_files``). A
+repeated ``til show`` copies the cached bytes to stdout without starting
+the renderer; editing the skill, the bat config or upgrading the
+renderer changes the key.
+The cache is kept under ``render_cache_size`` bytes (default
+``DEFAULT_CACHE_SIZE``; ``0`` disables it) by deleting the least
+recently used files — a hit refreshes its file's mtime.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import sys
+from pathlib import Path
 from typing import List, Optional, Sequence
 
+from .config import cache_dir, get_setting, parse_size
+
 # Order in which we try to auto-pick a renderer when ``TIL_RENDERER`` is
 # unset or ``auto``. ``glow`` first because it formats Markdown; ``bat``
 # is a syntax highlighter for the raw source, which is still pleasant.
 _AUTO_ORDER: Sequence[str] = ("bat", "glow")
 
+CACHE_VERSION = 2
+DEFAULT_CACHE_SIZE = "32M"
+# Environment that changes what the renderers draw; part of the cache key.
+THEME_ENV: Sequence[str] = (
+    "BAT_THEME", "BAT_STYLE", "BAT_CONFIG_PATH", "GLAMOUR_STYLE",
+    "COLORTERM", "TERM",
+)
+
 
 def _renderer_argv(name: str) -> Optional[List[str]]:
     """Return the argv for ``name`` if the binary is on PATH."""
@@ -72,21 +97,192 @@ def pick_renderer(
     return _renderer_argv(choice)
 
 
-def render(content: str, *, plain: bool = False) -> int:
-    """Render ``content`` to stdout. Returns a shell-style exit code."""
+def color_enabled(
+    *,
+    tty: Optional[bool] = None,
+    env: Optional[dict] = None,
+) -> bool:
+    """True if ANSI highlighting is appropriate for stdout."""
+    env = env if env is not None else os.environ
+    if tty is None:
+        tty = sys.stdout.isatty()
+    return bool(tty) and not env.get("NO_COLOR")
+
+
+def bat_config_files(env: Optional[dict] = None) -> List[str]:
+    """The config files ``bat`` reads, system-wide first.
+
+    Follows bat's own lookup (``$BAT_CONFIG_PATH``, else ``config`` in
+    ``$BAT_CONFIG_DIR``, ``$XDG_CONFIG_HOME/bat`` or ``~/.config/bat``)
+    instead of asking ``bat --config-file``, which would start a process
+    on every cache hit.
+    """
+    env = env if env is not None else os.environ
+    user = env.get("BAT_CONFIG_PATH")
+    if not user:
+        config_dir = env.get("BAT_CONFIG_DIR") or os.path.join(
+            env.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+            "bat")
+        user = os.path.join(config_dir, "config")
+    return ["/etc/bat/config", user]
+
+
+def _file_digest(path: str) -> str:
+    """SHA-256 of the file at ``path``, or ``""`` when it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def with_width(argv: List[str], width: int) -> List[str]:
+    """``argv`` told to wrap at ``width`` columns.
+
+    Output is captured for the cache, so the renderer can no longer ask
+    the terminal for its size.
+    """
+    name = os.path.basename(argv[0])
+    if name == "bat":
+        return argv + [f"--terminal-width={width}"]
+    if name == "glow":
+        return argv[:-1] + ["-w", str(width)] + argv[-1:]
+    return argv
+
+
+class RenderCache:
+    """Rendered output on disk, one file per key, LRU-bounded in size."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default(cls) -> Optional["RenderCache"]:
+        """The cache configured by ``render_cache_size``, or ``None``."""
+        try:
+            max_bytes = parse_size(
+                get_setting("render_cache_size", DEFAULT_CACHE_SIZE))
+        except ValueError:
+            max_bytes = parse_size(DEFAULT_CACHE_SIZE)
+        if not max_bytes:
+            return None
+        return cls(cache_dir() / "render", max_bytes)
+
+    @staticmethod
+    def key(content: str, argv: Sequence[str],
+            env: Optional[dict] = None) -> Optional[str]:
+        """Cache key, or ``None`` when the renderer binary can't be stat'ed."""
+        env = env if env is not None else os.environ
+        try:
+            binary = os.path.realpath(argv[0])
+            st = os.stat(binary)
+        except OSError:
+            return None
+        configs = []
+        if os.path.basename(binary) == "bat":
+            configs = [[path, _file_digest(path)]
+                       for path in bat_config_files(env)]
+        material = json.dumps([
+            CACHE_VERSION,
+            hashlib.sha256(content.encode()).hexdigest(),
+            list(argv),
+            [binary, st.st_mtime_ns, st.st_size],
+            [env.get(name, "") for name in THEME_ENV],
+            configs,
+        ])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.directory / key
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self.directory / key
+        tmp = self.directory / f".{key}.{os.getpid()}.tmp"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            tmp.replace(path)
+            self.evict()
+        except OSError:
+            # The cache is an optimisation; a read-only cache dir is fine.
+            pass
+
+    def evict(self) -> None:
+        """Delete least recently used files until under ``max_bytes``."""
+        files = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.startswith("."):
+                    continue
+                try:
+                    st = item.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime_ns, st.st_size, item.path))
+                total += st.st_size
+        files.sort()
+        for _mtime, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def _write_plain(content: str) -> int:
+    sys.stdout.write(content)
+    if not content.endswith("\n"):
+        sys.stdout.write("\n")
+    return 0
+
+
+def _write_bytes(data: bytes) -> None:
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+
+def render(content: str, *, plain: bool = False,
+           cache: Optional[RenderCache] = None) -> int:
+    """Render ``content`` to stdout. Returns a shell-style exit code.
+
+    ``cache`` defaults to ``RenderCache.default()``.
+    """
     argv = pick_renderer(plain=plain)
     if argv is None:
-        sys.stdout.write(content)
-        if not content.endswith("\n"):
-            sys.stdout.write("\n")
-        return 0
+        return _write_plain(content)
+    argv = with_width(argv, shutil.get_terminal_size().columns)
+    if cache is None:
+        cache = RenderCache.default()
+    key = cache.key(content, argv) if cache else None
+    if key:
+        data = cache.get(key)
+        if data is not None:
+            _write_bytes(data)
+            return 0
+    # Colour is forced because stdout is now a pipe (glow/termenv honour
+    # CLICOLOR_FORCE; bat is already run with --color=always).
+    env = dict(os.environ, CLICOLOR_FORCE="1")
     try:
-        proc = subprocess.run(argv, input=content, text=True)
-        return proc.returncode
+        proc = subprocess.run(argv, input=content.encode(),
+                              stdout=subprocess.PIPE, env=env)
     except (OSError, subprocess.SubprocessError):
         # Renderer launch failure: fall back to plain text rather than
         # crashing on the user.
-        sys.stdout.write(content)
-        if not content.endswith("\n"):
-            sys.stdout.write("\n")
-        return 0
+        return _write_plain(content)
+    _write_bytes(proc.stdout)
+    if proc.returncode == 0 and key:
+        cache.put(key, proc.stdout)
+    return proc.returncode
@@ -0,0 +1,493 @@
+"""Run executable code blocks with timeouts, limits and streamed output.
+
+``til execute`` runs each block through a ``BlockRunner``:
+
+* ``timeout`` — seconds before the block is killed. The block runs in
+  its own process group, and on timeout the whole group gets
+  ``SIGTERM`` and then (once the block exits, or ``KILL_GRACE`` seconds
+  later) ``SIGKILL``, so children such as a hung ``curl`` go with it.
+  The run then returns ``TIMEOUT_EXIT`` (124, as ``timeout(1)``).
+  The block keeps the controlling terminal: when ``til`` owns the
+  terminal, the block's group is made the foreground group while it
+  runs (as a shell does for a job), so ``sudo`` and other ``/dev/tty``
+  prompts work. Ctrl-C then reaches only the block; it exits non-zero
+  and ``til execute`` stops there. Without a terminal, Ctrl-C reaches
+  ``til``, which kills the block's group. Blocks started while other
+  threads run (``til execute --hosts``) never get the terminal: they
+  start in a new session instead.
+* ``timestamps`` / ``prefix`` / ``log`` — stdout and stderr are read
+  through pipes and written line by line (flushed per line) to the
+  matching stream, optionally stamped with the wall-clock time and
+  prefixed with the block label; ``log`` appends the same lines to a
+  file.
+
+With none of the output options set the block inherits the terminal,
+as before, so interactive commands keep working.
+
+``Limits`` bound what a block may use: ``RLIMIT_AS`` / ``RLIMIT_CPU``
+and a ``nice`` increment applied in the child before it starts, an
+``ionice`` level (via ``ionice(1)`` where installed), and a cap on how
+many blocks all ``til`` processes on the machine run at once — one
+``fcntl`` lock file per slot under ``<state_dir>/execute/``. Each block
+is reaped with ``os.wait4`` and its wall time, CPU time and peak RSS are
+reported (``Usage``; the last one is kept in ``BlockRunner.last``). On
+Linux the peak RSS carries over the ``exec``, so it never reads below
+the size of the ``til`` process that forked the block.
+
+Setting up the child (process group, terminal, limits) in a
+``preexec_fn`` is only safe while the calling process has one thread:
+the child of a threaded ``fork`` can deadlock before ``exec``. With
+other threads running the block gets ``start_new_session`` and its
+limits from ``nice(1)`` and ``ulimit`` in ``sh`` (``Limits.wrap``).
+
+A block's fence info string can override the timeout::
+
+    ```bash timeout=30
+    curl -fsSL https://example.com/install.sh | sh
+    ```
+"""
+
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import logging
+import math
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, Iterator, List, NamedTuple, Optional, Sequence
+
+from .config import parse_size, state_dir
+
+logger = logging.getLogger("til")
+
+# Exit status reported for a block killed by its timeout.
+TIMEOUT_EXIT = 124
+# Seconds between SIGTERM and SIGKILL for a timed-out process group.
+KILL_GRACE = 2.0
+# Seconds between tries for a free execution slot.
+SLOT_POLL = 0.25
+# ``ru_maxrss`` is in bytes on macOS and KiB elsewhere.
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def parse_timeout(value) -> Optional[float]:
+    """Seconds from a setting, flag or fence option; ``None`` / ``0``: none.
+
+    Raises ``ValueError`` for anything else that isn't a non-negative
+    number.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = -1.0
+    if not 0 <= seconds < float('inf'):
+        raise ValueError(f"Invalid timeout: {value!r}")
+    return seconds or None
+
+
+def parse_ionice(value) -> Optional[str]:
+    """``idle`` or a best-effort level ``0``-``7``; ``None`` when unset."""
+    if value is None or value == '':
+        return None
+    text = str(value).strip().lower()
+    if text == 'idle' or (text.isdigit() and int(text) <= 7):
+        return text
+    raise ValueError(f"Invalid ionice level: {value!r} (expected 0-7 or idle)")
+
+
+class Limits(NamedTuple):
+    """Resource limits for each block; ``None`` leaves one unbounded."""
+
+    memory: Optional[int] = None  # bytes of address space (RLIMIT_AS)
+    cpu: Optional[float] = None  # seconds of CPU time (RLIMIT_CPU)
+    nice: Optional[int] = None  # increment added to the block's niceness
+    ionice: Optional[str] = None  # ``idle`` or best-effort level 0-7
+    max_concurrent: Optional[int] = None  # blocks at once, machine-wide
+
+    @classmethod
+    def parse(cls, memory=None, cpu=None, nice=None, ionice=None,
+              max_concurrent=None) -> 'Limits':
+        """Limits from setting / flag strings; ``ValueError`` if invalid."""
+        def count(name, value):
+            if value is None or value == '':
+                return None
+            try:
+                number = int(value)
+            except ValueError:
+                number = -1
+            if number < 0:
+                raise ValueError(f"Invalid {name}: {value!r}")
+            return number or None
+
+        nice = None if nice is None or nice == '' else str(nice)
+        if nice is not None and not nice.lstrip('+-').isdigit():
+            raise ValueError(f"Invalid nice level: {nice!r}")
+        return cls(memory=parse_size(memory), cpu=parse_timeout(cpu),
+                   nice=int(nice) if nice else None,
+                   ionice=parse_ionice(ionice),
+                   max_concurrent=count('concurrency limit', max_concurrent))
+
+    def preexec(self):
+        """``preexec_fn`` applying the limits in the child, or ``None``."""
+        if not (self.memory or self.cpu or self.nice):
+            return None
+
+        def apply():
+            if self.memory:
+                resource.setrlimit(resource.RLIMIT_AS,
+                                   (self.memory, self.memory))
+            if self.cpu:
+                # SIGXCPU at the soft limit, SIGKILL a second later.
+                seconds = math.ceil(self.cpu)
+                resource.setrlimit(resource.RLIMIT_CPU,
+                                   (seconds, seconds + 1))
+            if self.nice:
+                os.nice(self.nice)
+        return apply
+
+    def wrap(self, argv: List[str], rlimits: bool = False) -> List[str]:
+        """``argv`` behind ``ionice(1)`` when an I/O level is set.
+
+        With ``rlimits`` the memory, CPU and nice limits are applied by
+        wrappers too, instead of by ``preexec``.
+        """
+        if rlimits:
+            argv = self._rlimit_argv(argv)
+        if self.ionice is None:
+            return argv
+        if not shutil.which('ionice'):
+            logger.warning("ionice not found; running without an I/O priority")
+            return argv
+        if self.ionice == 'idle':
+            return ['ionice', '-c', '3', *argv]
+        return ['ionice', '-c', '2', '-n', self.ionice, *argv]
+
+
+    def _rlimit_argv(self, argv: List[str]) -> List[str]:
+        commands = []
+        if self.memory:
+            commands.append(f'ulimit -v {max(1, self.memory // 1024)}')
+        if self.cpu:
+            # As ``preexec``: soft limit first, the hard one a second later.
+            seconds = math.ceil(self.cpu)
+            commands += [f'ulimit -S -t {seconds}',
+                         f'ulimit -H -t {seconds + 1}']
+        if commands:
+            argv = ['sh', '-c', '; '.join([*commands, 'exec "$@"']), 'sh',
+                    *argv]
+        if self.nice:
+            argv = ['nice', '-n', str(self.nice), *argv]
+        return argv
+
+
+@contextlib.contextmanager
+def execution_slot(max_concurrent: Optional[int]) -> Iterator[None]:
+    """Hold one of ``max_concurrent`` machine-wide slots (waits for one)."""
+    if not max_concurrent:
+        yield
+        return
+    directory = state_dir() / 'execute'
+    directory.mkdir(exist_ok=True)
+    waiting = False
+    while True:
+        for slot in range(max_concurrent):
+            fh = open(directory / f'slot-{slot}.lock', 'a')
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                continue
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+                fh.close()
+            return
+        if not waiting:
+            logger.info(f"Waiting for a free execution slot "
+                        f"({max_concurrent} in use)")
+            waiting = True
+        time.sleep(SLOT_POLL)
+
+
+class Usage(NamedTuple):
+    """How one block ended and what it used, from ``os.wait4``."""
+
+    returncode: int
+    wall: float  # seconds
+    user_cpu: float  # seconds
+    system_cpu: float  # seconds
+    max_rss: int  # bytes
+    timed_out: bool = False
+
+    @property
+    def cpu(self) -> float:
+        return self.user_cpu + self.system_cpu
+
+    def __str__(self) -> str:
+        if self.timed_out:
+            status = 'timed out'
+        elif self.returncode < 0:
+            try:
+                name = signal.Signals(-self.returncode).name
+            except ValueError:  # e.g. realtime signals
+                name = f"signal {-self.returncode}"
+            status = f"killed by {name}"
+        else:
+            status = f"exit {self.returncode}"
+        return (f"{status} in {self.wall:.2f}s, cpu {self.cpu:.2f}s, "
+                f"peak RSS {self.max_rss / (1 << 20):.1f} MiB")
+
+
+def _wait(proc: subprocess.Popen, timeout: Optional[float] = None):
+    """Reap ``proc`` with ``os.wait4``; returns its ``rusage``.
+
+    Raises ``subprocess.TimeoutExpired`` like ``Popen.wait`` (polling
+    with the same capped backoff).
+    """
+    if timeout is None:
+        _, status, rusage = os.wait4(proc.pid, 0)
+    else:
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            delay = min(delay * 2, remaining, 0.05)
+            time.sleep(delay)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def _foreground_tty() -> Optional[int]:
+    """Descriptor of our controlling terminal if we are its foreground
+    group (and on the main thread), else ``None``."""
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    for fd in (0, 1, 2):
+        try:
+            if os.isatty(fd) and os.tcgetpgrp(fd) == os.getpgrp():
+                return fd
+        except OSError:
+            continue
+    return None
+
+
+def _give_terminal(fd: int, pgrp: int) -> None:
+    """Make ``pgrp`` the terminal's foreground group.
+
+    ``SIGTTOU`` is blocked around the call, which a background process
+    would otherwise receive.
+    """
+    blocked = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTTOU})
+    try:
+        os.tcsetpgrp(fd, pgrp)
+    except OSError:
+        pass
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+
+
+def _feed(pipe: IO[bytes], data: bytes) -> None:
+    try:
+        with pipe:
+            pipe.write(data)
+    except (BrokenPipeError, ValueError):
+        pass
+
+
+class BlockRunner:
+    """Runs one block's ``argv`` with the configured output and timeout."""
+
+    def __init__(self, timeout: Optional[float] = None,
+                 timestamps: bool = False, prefix: bool = False,
+                 log: Optional[Path] = None, limits: Limits = Limits()):
+        self.timeout = timeout
+        self.timestamps = timestamps
+        self.prefix = prefix
+        self.log = log
+        self.limits = limits
+        # ``Usage`` of the most recent run.
+        self.last: Optional[Usage] = None
+        self._log_file: Optional[IO[str]] = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def capture(self) -> bool:
+        """Whether output goes through pipes rather than the terminal."""
+        return bool(self.timestamps or self.prefix or self.log)
+
+    def close(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def __enter__(self) -> 'BlockRunner':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _format(self, label: str, line: str) -> str:
+        parts = []
+        if self.timestamps:
+            now = time.time()
+            parts.append(time.strftime('%H:%M:%S', time.localtime(now))
+                         + f".{int(now % 1 * 1000):03d}")
+        if self.prefix and label:
+            parts.append(f"[{label}]")
+        parts.append(line)
+        return ' '.join(parts)
+
+    def _emit(self, target: IO[str], label: str, line: str) -> None:
+        text = self._format(label, line)
+        if not text.endswith('\n'):
+            text += '\n'
+        with self._write_lock:
+            target.write(text)
+            target.flush()
+            if self.log is not None:
+                if self._log_file is None:
+                    self._log_file = open(self.log, 'a', buffering=1)
+                self._log_file.write(text)
+
+    def _pump(self, pipe: IO[bytes], target: IO[str], label: str) -> None:
+        with pipe:
+            for raw in iter(pipe.readline, b''):
+                self._emit(target, label, raw.decode(errors='replace'))
+
+    def _popen_kwargs(self, timeout: Optional[float],
+                      stdin_pipe: bool = False,
+                      tty: Optional[int] = None,
+                      preexec: bool = True) -> dict:
+        kwargs: dict = {}
+        if stdin_pipe:
+            kwargs['stdin'] = subprocess.PIPE
+        if self.capture:
+            kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          env=dict(os.environ, PYTHONUNBUFFERED='1'))
+        if not preexec:
+            # Own process group without a ``preexec_fn``; the limits come
+            # from ``Limits.wrap``.
+            if timeout:
+                kwargs['start_new_session'] = True
+            return kwargs
+        limits = self.limits.preexec()
+        kwargs['preexec_fn'] = limits
+        if timeout:
+            # Own process group, so a timeout can kill every descendant;
+            # not a new session, which would drop the terminal.
+            def preexec():
+                os.setpgid(0, 0)
+                if tty is not None:
+                    _give_terminal(tty, os.getpgrp())
+                if limits:
+                    limits()
+            kwargs['preexec_fn'] = preexec
+        return kwargs
+
+    def _kill_group(self, proc: subprocess.Popen):
+        """``SIGTERM`` the group, then ``SIGKILL`` whatever is left.
+
+        Returns the block's ``rusage``.
+        """
+        rusage = None
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+            rusage = _wait(proc, KILL_GRACE)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            pass
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        return rusage or _wait(proc)
+
+    def run(self, argv: Sequence[str], label: str = '',
+            timeout: Optional[float] = None,
+            input: Optional[bytes] = None) -> int:
+        """Run ``argv``; ``timeout`` (if given) overrides the runner's.
+
+        ``input`` is written to the block's stdin (which is then closed).
+        """
+        with execution_slot(self.limits.max_concurrent):
+            self.last = self._run(list(argv), label or argv[0],
+                                  timeout or self.timeout, input)
+        logger.info(f"{label or argv[0]}: {self.last}")
+        return self.last.returncode
+
+    def _run(self, argv: List[str], label: str,
+             timeout: Optional[float], input: Optional[bytes]) -> Usage:
+        started = time.monotonic()
+        single_threaded = threading.active_count() == 1
+        tty = (_foreground_tty() if single_threaded and timeout
+               and input is None else None)
+        proc = subprocess.Popen(
+            self.limits.wrap(argv, rlimits=not single_threaded),
+            **self._popen_kwargs(timeout, stdin_pipe=input is not None,
+                                 tty=tty, preexec=single_threaded))
+        if tty is not None:
+            # Also from this side, in case the block reads the terminal
+            # before its own preexec hand-over is visible here.
+            try:
+                os.setpgid(proc.pid, proc.pid)
+            except OSError:
+                pass
+            _give_terminal(tty, proc.pid)
+        pumps: List[threading.Thread] = []
+        if self.capture:
+            pumps = [
+                threading.Thread(target=self._pump, daemon=True,
+                                 args=(proc.stdout, sys.stdout, label)),
+                threading.Thread(target=self._pump, daemon=True,
+                                 args=(proc.stderr, sys.stderr, label)),
+            ]
+        if input is not None:
+            # From a thread: a block that never reads stdin must not hold
+            # us past its timeout once the pipe buffer is full.
+            pumps.append(threading.Thread(target=_feed, daemon=True,
+                                          args=(proc.stdin, input)))
+        for pump in pumps:
+            pump.start()
+        timed_out = False
+        try:
+            try:
+                rusage = _wait(proc, timeout)
+            except subprocess.TimeoutExpired:
+                rusage = self._kill_group(proc)
+                logger.error(f"{label}: timed out after "
+                             f"{timeout:g}s; killed its process group")
+                timed_out = True
+        except BaseException:
+            # Ctrl-C reaches only our group when the block has its own.
+            if proc.returncode is None:
+                if timeout:
+                    self._kill_group(proc)
+                else:
+                    proc.kill()
+                    _wait(proc)
+            raise
+        finally:
+            if tty is not None:
+                _give_terminal(tty, os.getpgrp())
+            for pump in pumps:
+                # Descendants that left the group may hold the pipes open.
+                pump.join(timeout=1.0)
+        return Usage(TIMEOUT_EXIT if timed_out else proc.returncode,
+                     time.monotonic() - started,
+                     rusage.ru_utime, rusage.ru_stime,
+                     rusage.ru_maxrss * _RSS_UNIT, timed_out)
@@ -0,0 +1,276 @@
+"""Search hits: regex line scans and match locations for query results.
+
+``til search --regex`` compiles the pattern once and scans each entry
+line by line, reporting the file line number and the ``## `` section the
+match falls in. The scan stops as soon as ``limit`` hits are collected.
+
+With ``workers > 1`` the entries are split into chunks and scanned in a
+process pool. Workers get the text each parsed entry already holds (the
+pool is for CPU, not I/O), so they see exactly what a serial scan sees,
+even for files changed since loading or entries loaded from git objects
+with ``--ref``. Chunks are consumed in submission order, which keeps the
+output identical to a serial scan, and chunks not yet started are
+cancelled once the limit is reached.
+
+``find_matches`` locates *where* a query matched an entry — the field
+(``title``, ``description``, ``sections.<Name>``, ...) and the character
+offset within it — using the text already held by the parsed entry, and
+``make_snippet`` turns that into a short context line.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from .query import (
+    KEYWORD_FIELDS, keyword_matcher, positive_terms, tokenize_text)
+from .til import _FENCE_RE
+
+# Characters of context on each side of a match in a snippet.
+SNIPPET_CONTEXT = 40
+# Matches reported per entry; enough to show why it matched.
+MAX_MATCHES_PER_ENTRY = 3
+
+# Files per work item handed to a pool worker.
+DEFAULT_CHUNK_SIZE = 32
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern: str, flags: int = 0) -> Pattern:
+    """``re.compile`` with a cache shared by every scan in this process."""
+    return re.compile(pattern, flags)
+
+
+class RegexHit:
+    """One matching line: where it is and what matched."""
+
+    def __init__(self, entry, line: int, text: str, span: Tuple[int, int]):
+        self.entry = entry
+        self.line = line
+        self.text = text
+        self.span = span
+
+    @property
+    def section(self) -> Optional[str]:
+        return self.entry.section_at(self.line)
+
+    def __str__(self) -> str:
+        section = f" [{self.section}]" if self.section else ""
+        return f"{self.entry.slug}:{self.line}{section}: {self.text}"
+
+    def to_dict(self) -> dict:
+        return {
+            'slug': self.entry.slug,
+            'path': str(self.entry.path),
+            'line': self.line,
+            'section': self.section,
+            'text': self.text,
+            'offset': self.span[0],
+            'length': self.span[1] - self.span[0],
+        }
+
+
+class Match:
+    """Where a query term matched inside one field of an entry."""
+
+    def __init__(self, field: str, text: str, start: int, end: int):
+        self.field = field
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def snippet(self, highlight: Optional[Callable[[str], str]] = None) -> str:
+        return make_snippet(self.text, self.start, self.end,
+                            highlight=highlight)
+
+    def to_dict(self) -> dict:
+        return {
+            'field': self.field,
+            'offset': self.start,
+            'length': self.end - self.start,
+            'snippet': self.snippet(),
+        }
+
+
+def make_snippet(text: str, start: int, end: int, *,
+                 context: int = SNIPPET_CONTEXT,
+                 highlight: Optional[Callable[[str], str]] = None) -> str:
+    """One-line excerpt of ``text`` around ``[start, end)``."""
+    lo = max(0, start - context)
+    hi = min(len(text), end + context)
+    match = text[start:end]
+    if highlight:
+        match = highlight(match)
+    excerpt = text[lo:start] + match + text[end:hi]
+    return ('…' if lo > 0 else '') + ' '.join(excerpt.split()) + (
+        '…' if hi < len(text) else '')
+
+
+def _term_regex(term) -> Optional[Pattern]:
+    """Regex locating a text ``Term`` the way the index matched it."""
+    words = tokenize_text(term.value)
+    if not words:
+        return None
+    # Each query word is part of a token; phrase words are separated by
+    # the rest of their tokens and the non-word runs the tokenizer drops.
+    body = r'[^\W_]*[\W_]+[^\W_]*'.join(re.escape(w) for w in words)
+    return compile_pattern(body, re.IGNORECASE)
+
+
+def _text_fields(entry, field: str) -> Iterable[Tuple[str, str]]:
+    description = entry.frontmatter.get('description', '')
+    if field in ('title', 'text'):
+        yield 'title', entry.title
+    if field in ('description', 'text'):
+        yield 'description', description
+    if field in ('section', 'text'):
+        for name in entry.sections:
+            yield 'section', name
+    if field == 'text':
+        for key, value in entry.metadata.items():
+            yield f'metadata.{key}', str(value)
+        for name, body in entry.sections.items():
+            yield f'sections.{name}', body
+        yield 'name', entry.slug
+
+
+def _opening_fences(text: str) -> Iterable[Tuple[int, str, str]]:
+    """``(offset, line, language)`` of each code fence opened in ``text``."""
+    offset = 0
+    inside = False
+    for line in text.split('\n'):
+        fence = _FENCE_RE.match(line)
+        if fence:
+            if not inside:
+                yield offset, line.rstrip(), fence.group(1)
+            inside = not inside
+        offset += len(line) + 1
+
+
+def _keyword_matches(entry, term) -> Iterable[Match]:
+    if term.field == 'name':
+        yield Match('name', entry.slug, 0, len(entry.slug))
+    elif term.field == 'lang':
+        # The same fences and wildcards the index matched the term with.
+        wanted = keyword_matcher(term.value.lower())
+        for name, body in entry.sections.items():
+            for offset, line, language in _opening_fences(body):
+                if language and wanted(language.lower()):
+                    yield Match(f'sections.{name}', body,
+                                offset, offset + len(line))
+                    break
+    elif term.field == 'executable':
+        for name in entry.sections:
+            if name in entry.executable_sections:
+                yield Match('section', name, 0, len(name))
+
+
+def find_matches(entry, node,
+                 limit: int = MAX_MATCHES_PER_ENTRY) -> List[Match]:
+    """Locate the positive terms of query ``node`` inside ``entry``.
+
+    Works purely on the parsed fields; the file is not read again.
+    """
+    matches: List[Match] = []
+    for term in positive_terms(node):
+        if term.field in KEYWORD_FIELDS:
+            found = next(_keyword_matches(entry, term), None)
+        else:
+            found = None
+            regex = _term_regex(term)
+            if regex is not None:
+                for field, text in _text_fields(entry, term.field):
+                    m = regex.search(text)
+                    if m:
+                        found = Match(field, text, m.start(), m.end())
+                        break
+        if found:
+            matches.append(found)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def _scan_lines(text: str, regex: Pattern,
+                limit: Optional[int]) -> List[Tuple[int, str, Tuple[int, int]]]:
+    hits = []
+    # ``split('\n')`` as the parser numbers lines (``splitlines`` would
+    # also break at form feeds, ``\x85``, ``\u2028``, ...).
+    for line_no, line in enumerate(text.split('\n'), 1):
+        m = regex.search(line)
+        if m:
+            hits.append((line_no, line, m.span()))
+            if limit is not None and len(hits) >= limit:
+                break
+    return hits
+
+
+def _scan_texts(texts: Sequence[str], pattern: str, flags: int,
+                limit: Optional[int]
+                ) -> List[Tuple[int, int, str, Tuple[int, int]]]:
+    """Pool worker: scan ``texts``, return ``(i, line, text, span)`` hits."""
+    regex = compile_pattern(pattern, flags)
+    hits = []
+    for i, text in enumerate(texts):
+        remaining = None if limit is None else limit - len(hits)
+        for line_no, line, span in _scan_lines(text, regex, remaining):
+            hits.append((i, line_no, line, span))
+        if limit is not None and len(hits) >= limit:
+            break
+    return hits
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def regex_search(entries: Sequence, pattern: str, *,
+                 ignore_case: bool = False,
+                 limit: Optional[int] = None,
+                 workers: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[RegexHit]:
+    """Return up to ``limit`` line hits for ``pattern`` across ``entries``.
+
+    Raises ``re.error`` for an invalid pattern before any scanning starts.
+    """
+    flags = re.IGNORECASE if ignore_case else 0
+    regex = compile_pattern(pattern, flags)
+    if limit is not None and limit <= 0:
+        return []
+
+    results: List[RegexHit] = []
+
+    def remaining() -> Optional[int]:
+        return None if limit is None else limit - len(results)
+
+    if workers <= 1 or len(entries) <= chunk_size:
+        # Serial: scan the text already held by each parsed entry.
+        for entry in entries:
+            for line_no, line, span in _scan_lines(
+                    entry.content, regex, remaining()):
+                results.append(RegexHit(entry, line_no, line, span))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    chunks = list(_chunks(list(entries), chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_scan_texts, [e.content for e in chunk],
+                        pattern, flags, limit)
+            for chunk in chunks
+        ]
+        try:
+            for chunk, future in zip(chunks, futures):
+                for i, line_no, line, span in future.result():
+                    results.append(RegexHit(chunk[i], line_no, line, span))
+                    if limit is not None and len(results) >= limit:
+                        return results[:limit]
+        finally:
+            for future in futures:
+                future.cancel()
+    return results
@@ -0,0 +1,303 @@
+"""Read-only HTTP API over one in-memory collection (``til serve``).
+
+Endpoints (all ``GET``, JSON responses):
+
+* ``/skills`` — every entry's record (as ``til list --json``)
+* ``/skills/<slug>`` — one record plus its raw ``content``
+* ``/search?q=QUERY[&limit=N]`` — query-language results with matches
+* ``/validate[?slug=SLUG]`` — validation results
+
+The collection and its search index are built once and shared by all
+requests. Every ``RECHECK_INTERVAL`` seconds at most, a request stats
+the skill files (or, for ``--ref`` loads, uses the blob ids); if anything
+changed the collection is reloaded. A load produces a ``Snapshot`` —
+collection, file stamps, version and validation cache together — that
+replaces the previous one in a single assignment; each request takes
+the snapshot once and uses nothing else, so a reload never mixes old
+and new data in one response.
+
+Responses carry an ``ETag`` derived from those mtimes/blob ids, so a
+client polling with ``If-None-Match`` gets a bodyless ``304`` until
+something changes — computed before any response body is built.
+Bodies are gzip-compressed for clients that accept it; their ETags end
+in ``-gzip`` so the two encodings never share one. Requests are
+handled by a fixed-size thread pool rather than a thread per
+connection.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .query import QuerySyntaxError, parse_query
+from .search import find_matches
+from .til import load_collection
+
+logger = logging.getLogger("til")
+
+DEFAULT_WORKERS = 8
+# Seconds between checks of the skill files for changes.
+RECHECK_INTERVAL = 2.0
+# Bodies smaller than this aren't worth compressing.
+GZIP_MIN_BYTES = 512
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """``HOST:PORT`` (or just ``PORT``) -> ``(host, port)``."""
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise ValueError(f"Invalid address '{value}': expected HOST:PORT")
+
+
+def accepts_gzip(header: str) -> bool:
+    """True if an ``Accept-Encoding`` value allows gzip (``q=0`` refuses)."""
+    weights = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.lower()] = q
+    if 'gzip' in weights:
+        return weights['gzip'] > 0
+    return weights.get('*', 0) > 0
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """True if an ``If-None-Match`` value lists ``etag`` (or is ``*``).
+
+    Uses the weak comparison the header calls for: ``W/`` is ignored.
+    """
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+class Snapshot:
+    """One load of the collection and everything derived from it.
+
+    Never changed after a reload: ``SkillService.load`` builds a new one.
+    The validation cache only ever holds results for this collection.
+    """
+
+    def __init__(self, collection, stamps: Dict[str, str]):
+        self.collection = collection
+        self.stamps = stamps
+        self.version = hashlib.sha1(json.dumps(
+            sorted(stamps.items())).encode()).hexdigest()
+        self._validation: Dict[str, List[str]] = {}
+
+    def entry_version(self, entry) -> str:
+        return self.stamps.get(str(entry.path), self.version)
+
+    def validate(self, entry) -> List[str]:
+        key = str(entry.path)
+        errors = self._validation.get(key)
+        if errors is None:
+            errors = self._validation[key] = self.collection.validate(entry)
+        return errors
+
+
+class SkillService:
+    """The current ``Snapshot``, reloaded when the skill files change."""
+
+    def __init__(self, root_dirs: Sequence[Path], ref: Optional[str] = None,
+                 recheck: float = RECHECK_INTERVAL):
+        self.root_dirs = [Path(root) for root in root_dirs]
+        self.ref = ref
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.load()
+
+    @property
+    def collection(self):
+        return self.snapshot.collection
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    def _current_stamps(self, collection) -> Dict[str, str]:
+        if self.ref:
+            return {str(e.path): e.blob_sha for e in collection.entries}
+        stamps = {}
+        for root in self.root_dirs:
+            for path in root.glob('skills/*/SKILL.md'):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                stamps[str(path)] = f"{st.st_mtime_ns}:{st.st_size}"
+        return stamps
+
+    def load(self) -> None:
+        collection = load_collection(self.root_dirs, ref=self.ref)
+        # Build the index up front so the first search doesn't stall.
+        collection.index
+        self.snapshot = Snapshot(collection, self._current_stamps(collection))
+        self._checked_at = time.monotonic()
+
+    def refresh(self) -> Snapshot:
+        """Reload if the files changed since the last check; return the
+        snapshot to serve the request from."""
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.recheck:
+                snapshot = self.snapshot
+                if (self._current_stamps(snapshot.collection)
+                        != snapshot.stamps):
+                    logger.info("Skills changed on disk; reloading")
+                    self.load()
+                else:
+                    self._checked_at = time.monotonic()
+            return self.snapshot
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'til'
+
+    @property
+    def service(self) -> SkillService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        # Everything below comes from this one snapshot.
+        snapshot = self.service.refresh()
+        collection = snapshot.collection
+
+        if parts == ['skills']:
+            self._respond(snapshot.version, lambda: [
+                dict(e.to_dict(), repo=str(collection.root_for(e)))
+                for e in sorted(collection.entries, key=lambda e: e.title)])
+        elif len(parts) == 2 and parts[0] == 'skills':
+            entry = collection.get_entry(parts[1])
+            if entry is None:
+                return self._error(404, f"Entry not found: {parts[1]}")
+            self._respond(snapshot.entry_version(entry), lambda: dict(
+                entry.to_dict(), repo=str(collection.root_for(entry)),
+                content=entry.content))
+        elif parts == ['search']:
+            query = params.get('q', '')
+            try:
+                limit = int(params['limit']) if 'limit' in params else None
+                node = parse_query(query)
+            except (ValueError, QuerySyntaxError) as e:
+                return self._error(400, f"Invalid search query: {e}")
+
+            def results():
+                hits = collection.query(query)
+                if limit is not None:
+                    hits = hits[:max(limit, 0)]
+                return [dict(e.to_dict(), repo=str(collection.root_for(e)),
+                             matches=[m.to_dict()
+                                      for m in find_matches(e, node)])
+                        for e in hits]
+            self._respond(snapshot.version, results)
+        elif parts == ['validate']:
+            if 'slug' in params:
+                entry = collection.get_entry(params['slug'])
+                if entry is None:
+                    return self._error(
+                        404, f"Entry not found: {params['slug']}")
+                entries = [entry]
+            else:
+                entries = collection.entries
+            # Errors depend on other skills too (``requires:``), so even a
+            # single entry's result is versioned by the whole snapshot.
+            self._respond(snapshot.version, lambda: [
+                {'slug': e.slug, 'path': str(e.path),
+                 'valid': not snapshot.validate(e),
+                 'errors': snapshot.validate(e)} for e in entries])
+        else:
+            self._error(404, f"No such endpoint: {url.path}")
+
+    def _respond(self, version: str, build) -> None:
+        """Send ``build()`` as JSON, or ``304`` if the client is current.
+
+        The ETag covers the data version and the full request target, so
+        each URL (query string included) validates independently, and
+        the encoding the client accepts.
+        """
+        gzipped = accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = '"{}{}"'.format(hashlib.sha1(
+            f"{version}\0{self.path}".encode()).hexdigest()[:20],
+            '-gzip' if gzipped else '')
+        if etag_matches(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._send(200, build(), etag)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {'error': message})
+
+    def _send(self, status: int, payload, etag: Optional[str] = None) -> None:
+        body = json.dumps(payload).encode()
+        compress = (len(body) >= GZIP_MIN_BYTES and accepts_gzip(
+            self.headers.get('Accept-Encoding', '')))
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PooledHTTPServer(HTTPServer):
+    """``HTTPServer`` that hands each connection to a bounded thread pool."""
+
+    def __init__(self, address: Tuple[str, int], service: SkillService,
+                 workers: int = DEFAULT_WORKERS):
+        super().__init__(address, _Handler)
+        self.service = service
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers),
+                                        thread_name_prefix='til-http')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
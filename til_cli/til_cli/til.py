@@ -10,7 +10,14 @@ import sys
 import subprocess
 import time
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .blocks import block_id
+from .config import read_config
+from .journal import append as journal_append, record as journal_record
+from .query import SearchIndex
+from .runner import parse_timeout
+from .update import check_for_repo_updates  # noqa: F401  (re-exported)
 
 # Configure logging
 logging.basicConfig(
@@ -20,18 +27,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger("til")
 
+# Opening/closing code fence on its own line, with an optional language tag
+# and, after it, an info string of ``key=value`` options.
+_FENCE_RE = re.compile(r'^```([A-Za-z0-9_-]*)(?:[ \t]+([^`\s][^`]*?))?\s*$')
+# A fenced block inside an executable section: language, info, code.
+_EXEC_BLOCK_RE = re.compile(r'```(\w+)([^\n`]*)\n(.*?)```', re.DOTALL)
+
+
+def fence_options(info: Optional[str]) -> Dict[str, str]:
+    """``key=value`` words of a fence info string (``timeout=30``)."""
+    options = {}
+    for word in (info or '').split():
+        key, sep, value = word.partition('=')
+        if sep:
+            options[key] = value
+    return options
+
+
+# Frontmatter keys whose value is a list (see ``_split_frontmatter``).
+_LIST_KEYS = ('requires',)
+
+
+def _unquote(value: str) -> str:
+    """Drop surrounding matching quotes."""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
+class ExecutableBlock(NamedTuple):
+    language: str
+    code: str
+    options: Dict[str, str]
+
 
 class TILEntry:
     """Class representing a TIL entry with metadata and executable sections"""
 
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, content: Optional[str] = None):
+        """Parse ``path``; pass ``content`` when the text is already read."""
         self.path = path
         self.title = ""
         self.metadata = {}
         self.frontmatter = {}
         self.sections = {}
         self.executable_sections = set()
-        self._parse()
+        # Fenced code blocks in document order: ``(section, language, code)``.
+        # ``section`` is ``None`` for blocks before the first ``## `` heading
+        # and ``language`` is ``''`` for untagged fences.
+        self.code_blocks: List[Tuple[Optional[str], str, str]] = []
+        # Content id of each block in ``code_blocks`` (``blocks.block_id``).
+        self.block_ids: List[str] = []
+        # Raw file text, kept so search and validation never re-read it.
+        self.content = ""
+        # 1-based file line number of each ``## `` section heading.
+        self.section_lines = {}
+        # ``(line, name)`` of every heading in file order, repeated names
+        # included (``section_lines`` keeps one line per name).
+        self.section_headings: List[Tuple[int, str]] = []
+        # Git blob id when loaded from the object store (see gitstore).
+        self.blob_sha: Optional[str] = None
+        self._parse(content)
 
     @staticmethod
     def _split_frontmatter(content: str) -> Tuple[dict, str]:
@@ -39,7 +95,9 @@ class TILEntry:
 
         Returns ``(frontmatter_dict, remaining_body)``. Only ``key: value``
         pairs on single lines are recognised — enough for SKILL.md, no
-        dependency on PyYAML.
+        dependency on PyYAML. List keys (``requires``) also accept
+        ``[a, b]``, ``a, b`` or ``- item`` lines below the key, and are
+        returned as lists.
         """
         if not content.startswith('---\n') and not content.startswith('---\r\n'):
             return {}, content
@@ -50,24 +108,35 @@ class TILEntry:
         raw = fm_match.group(1)
         body = content[fm_match.end():]
         fm: dict = {}
+        list_key = None
         for line in raw.splitlines():
+            item = re.match(r'^\s*-\s+(.+)$', line)
+            if item and list_key:
+                fm[list_key].append(_unquote(item.group(1).strip()))
+                continue
+            list_key = None
             kv = re.match(r'^([A-Za-z_][\w-]*):\s*(.*)$', line)
             if not kv:
                 continue
             key, value = kv.group(1), kv.group(2).strip()
-            # Drop surrounding matching quotes.
-            if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
-                value = value[1:-1]
-            fm[key] = value
+            if key in _LIST_KEYS:
+                fm[key] = [_unquote(part.strip()) for part
+                           in value.strip('[]').split(',') if part.strip()]
+                list_key = key
+                continue
+            fm[key] = _unquote(value)
         return fm, body
 
-    def _parse(self):
+    def _parse(self, content: Optional[str] = None):
         """Parse the TIL entry file to extract metadata and sections"""
         try:
-            content = self.path.read_text()
+            if content is None:
+                content = self.path.read_text()
+            self.content = content
 
             # Frontmatter (skill format).
             self.frontmatter, body = self._split_frontmatter(content)
+            body_line = content[:len(content) - len(body)].count('\n') + 1
 
             # Title cascade: first H1 in body, else description lead phrase,
             # else slug. Skills with valid frontmatter but no H1 still get a
@@ -95,14 +164,34 @@ class TILEntry:
             section_pattern = r'^## (.+?)( \(executable\))?$'
             current_section = None
             section_content: List[str] = []
+            fence_lang: Optional[str] = None
+            fence_lines: List[str] = []
+
+            for line_no, line in enumerate(body.split('\n'), body_line):
+                # Track fenced code blocks with the same line-based rules
+                # ``validate_entry`` uses, so both agree on block boundaries.
+                fence = _FENCE_RE.match(line)
+                if fence:
+                    if fence_lang is None:
+                        fence_lang = fence.group(1)
+                        fence_lines = []
+                    else:
+                        code = '\n'.join(fence_lines)
+                        self.code_blocks.append(
+                            (current_section, fence_lang, code))
+                        self.block_ids.append(block_id(code))
+                        fence_lang = None
+                elif fence_lang is not None:
+                    fence_lines.append(line)
 
-            for line in body.split('\n'):
                 match = re.match(section_pattern, line)
                 if match:
                     if current_section:
                         self.sections[current_section] = '\n'.join(
                             section_content)
                     current_section = match.group(1).strip()
+                    self.section_lines[current_section] = line_no
+                    self.section_headings.append((line_no, current_section))
                     section_content = []
                     if match.group(2):
                         self.executable_sections.add(current_section)
@@ -117,19 +206,19 @@ class TILEntry:
 
     def get_executable_blocks(self, section_name: str) -> List[Tuple[str, str]]:
         """Extract executable code blocks from a section"""
+        return [(block.language, block.code)
+                for block in self.executable_blocks(section_name)]
+
+    def executable_blocks(self, section_name: str) -> List[ExecutableBlock]:
+        """Executable code blocks of a section, with their fence options."""
         if section_name not in self.executable_sections:
             return []
 
         content = self.sections.get(section_name, "")
-        blocks = []
-
         # Find code blocks with language specifier
-        pattern = r'```(\w+)\n(.*?)```'
-        for match in re.finditer(pattern, content, re.DOTALL):
-            language, code = match.groups()
-            blocks.append((language, code.strip()))
-
-        return blocks
+        return [ExecutableBlock(language, code.strip(), fence_options(info))
+                for language, info, code
+                in _EXEC_BLOCK_RE.findall(content)]
 
     def matches_search(self, term: str) -> bool:
         """Check if the TIL entry matches a search term"""
@@ -160,6 +249,25 @@ class TILEntry:
 
         return False
 
+    def section_at(self, line_no: int) -> Optional[str]:
+        """Name of the section containing 1-based file line ``line_no``."""
+        current = None
+        for start, name in self.section_headings:
+            if start > line_no:
+                break
+            current = name
+        return current
+
+    @property
+    def requires(self) -> List[str]:
+        """Slugs of the skills this one needs (``requires:`` frontmatter)."""
+        return list(self.frontmatter.get('requires', []))
+
+    @property
+    def fence_languages(self) -> List[str]:
+        """Sorted, de-duplicated languages of the tagged code fences."""
+        return sorted({lang for _, lang, _ in self.code_blocks if lang})
+
     @property
     def slug(self) -> str:
         """Stable identifier for this entry.
@@ -172,32 +280,166 @@ class TILEntry:
             return self.path.parent.name
         return self.path.stem
 
+    def to_dict(self) -> dict:
+        """JSON-ready summary of the parsed entry (no section bodies)."""
+        return {
+            'slug': self.slug,
+            'title': self.title,
+            'path': str(self.path),
+            'frontmatter': dict(self.frontmatter),
+            'sections': list(self.sections),
+            'executable_sections': [name for name in self.sections
+                                    if name in self.executable_sections],
+            'languages': self.fence_languages,
+        }
+
     def __str__(self) -> str:
         return f"{self.title} ({self.slug})"
 
 
+def parse_load_workers(value: Optional[str]) -> Tuple[str, int]:
+    """Parse a ``TIL_LOAD_WORKERS`` value into ``(mode, workers)``.
+
+    ``N`` reads files with ``N`` threads (parsing stays in this process);
+    ``process:N`` reads *and* parses in ``N`` worker processes. Unset,
+    empty, ``0``, ``1`` or anything unparsable means serial loading.
+    """
+    value = (value or '').strip().lower()
+    mode = 'thread'
+    if ':' in value:
+        mode, _, value = value.partition(':')
+        mode = mode.strip()
+    try:
+        workers = int(value)
+    except ValueError:
+        return 'serial', 1
+    if workers <= 1 or mode not in ('thread', 'process'):
+        return 'serial', 1
+    return mode, workers
+
+
+def _read_or_none(path: Path) -> Optional[str]:
+    """Thread-pool reader. ``None`` defers the error to ``TILEntry``."""
+    try:
+        return path.read_text()
+    except Exception:
+        return None
+
+
+def _parse_in_worker(path: Path) -> Tuple[TILEntry, str]:
+    """Process-pool parser: returns the entry plus anything it printed."""
+    import contextlib
+    import io
+    err = io.StringIO()
+    with contextlib.redirect_stderr(err):
+        entry = TILEntry(path)
+    return entry, err.getvalue()
+
+
 class TILCollection:
     """Class for managing a collection of TIL entries"""
 
-    def __init__(self, root_dir: Path):
+    def __init__(self, root_dir: Path, workers: Optional[str] = None,
+                 ref: Optional[str] = None):
+        """Load ``root_dir``. ``workers`` overrides ``TIL_LOAD_WORKERS``.
+
+        With ``ref`` (or ``TIL_GIT_REF``) the skills are read from that
+        git revision of ``root_dir`` instead of the working tree; bare
+        repositories work too.
+        """
         self.root_dir = root_dir
         self.entries = []
-        self._load_entries()
+        self._index: Optional[SearchIndex] = None
+        self._backend = None
+        self._graph = None
+        if workers is None:
+            workers = os.environ.get('TIL_LOAD_WORKERS')
+        self.ref = ref or os.environ.get('TIL_GIT_REF') or None
+        if self.ref:
+            from .gitstore import load_entries
+            self.entries = load_entries(root_dir, self.ref)
+        else:
+            self._load_entries(workers)
 
-    def _load_entries(self):
+    def _load_entries(self, workers: Optional[str] = None):
         """Load TIL entries from the repository.
 
         Only ``skills/<slug>/SKILL.md`` is recognised — everything else
-        (README, LICENSE, tool docs, stray Markdown) is ignored.
+        (README, LICENSE, tool docs, stray Markdown) is ignored. Entries
+        stay in sorted path order and parse errors are reported in that
+        order whichever loader mode (see ``parse_load_workers``) is used.
         """
         pattern = 'skills/*/SKILL.md'
-        for file_path in sorted(self.root_dir.glob(pattern)):
-            entry = TILEntry(file_path)
-            self.entries.append(entry)
+        paths = sorted(self.root_dir.glob(pattern))
+        mode, count = parse_load_workers(workers)
+        if mode == 'serial' or len(paths) < 2:
+            self.entries = [TILEntry(path) for path in paths]
+        elif mode == 'thread':
+            # I/O-bound: overlap the reads, parse in order on this thread.
+            # A failed read is retried by ``TILEntry`` so it reports the
+            # error exactly as a serial load would.
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                texts = list(pool.map(_read_or_none, paths))
+            self.entries = [TILEntry(path, text)
+                            for path, text in zip(paths, texts)]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            chunksize = max(1, len(paths) // (count * 4))
+            with ProcessPoolExecutor(max_workers=count) as pool:
+                for entry, err in pool.map(_parse_in_worker, paths,
+                                           chunksize=chunksize):
+                    if err:
+                        sys.stderr.write(err)
+                    self.entries.append(entry)
 
     def search(self, term: str) -> List[TILEntry]:
         """Search for TIL entries matching the given term"""
-        return [entry for entry in self.entries if entry.matches_search(term)]
+        return [hit.entry for hit in self.search_backend.search(term)]
+
+    @property
+    def search_backend(self):
+        """Configured ``til_cli.backends`` engine, created on first use."""
+        if self._backend is None:
+            from .backends import create_backend
+            self._backend = create_backend(self)
+        return self._backend
+
+    @property
+    def index(self) -> SearchIndex:
+        """Per-field postings over ``entries``, built on first use."""
+        if self._index is None:
+            self._index = SearchIndex(self.entries)
+        return self._index
+
+    @property
+    def dependency_graph(self):
+        """``requires:`` graph over ``entries`` (``til_cli.deps``), built once."""
+        if self._graph is None:
+            from .deps import DependencyGraph
+            self._graph = DependencyGraph(self.entries)
+        return self._graph
+
+    def validate(self, entry: TILEntry) -> List[str]:
+        """``validate_entry`` errors plus ``requires:`` errors (unknown
+        skills, cycles) from ``dependency_graph``."""
+        return validate_entry(entry) + self.dependency_graph.errors_for(
+            entry.slug)
+
+    def query(self, expression: str) -> List[TILEntry]:
+        """Evaluate a field-aware query (see ``til_cli.query``).
+
+        Raises ``QuerySyntaxError`` for malformed expressions.
+        """
+        return self.index.search(expression)
+
+    def root_for(self, entry: TILEntry) -> Path:
+        """Repository root ``entry`` was loaded from."""
+        return self.root_dir
+
+    def source_label(self, entry: TILEntry) -> Optional[str]:
+        """Short name of the repository ``entry`` came from, if ambiguous."""
+        return None
 
     def get_entry(self, path_or_name: str) -> Optional[TILEntry]:
         """Get a TIL entry by slug, repository path, or title."""
@@ -226,7 +468,8 @@ class TILCollection:
                     pass
                 continue
             try:
-                rel_parts = entry.path.relative_to(self.root_dir).parts
+                rel_parts = entry.path.relative_to(
+                    self.root_for(entry)).parts
             except ValueError:
                 rel_parts = entry.path.parts
             if rel_parts == req_parts:
@@ -253,24 +496,118 @@ class TILCollection:
         return None
 
 
-def execute_code_block(language: str, code: str) -> int:
-    """Execute a code block based on its language"""
-    # Create a temporary script file with unique name
-    import tempfile
+class FederatedCollection(TILCollection):
+    """Several repositories presented as one collection.
+
+    Repositories are loaded concurrently, each into its own
+    ``TILCollection`` with its own search index, so reloading one (see
+    ``reload``) leaves the others untouched. On slug conflicts the entry
+    from the earlier repository wins; the losers are kept in
+    ``shadowed``.
+    """
+
+    def __init__(self, root_dirs: List[Path], workers: Optional[str] = None,
+                 ref: Optional[str] = None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.root_dirs = [Path(root) for root in root_dirs]
+        self.root_dir = self.root_dirs[0]
+        self.ref = ref
+        self._workers = workers
+        self._index = None
+        with ThreadPoolExecutor(max_workers=len(self.root_dirs)) as pool:
+            self.collections = list(pool.map(
+                lambda root: TILCollection(root, workers, ref),
+                self.root_dirs))
+        self._merge()
+
+    def _merge(self):
+        self._owner = {}
+        winners = {}
+        self.shadowed: List[TILEntry] = []
+        for collection in self.collections:
+            for entry in collection.entries:
+                if entry.slug in winners:
+                    self.shadowed.append(entry)
+                    continue
+                winners[entry.slug] = entry
+                self._owner[id(entry)] = collection
+        self.entries = sorted(winners.values(), key=lambda e: e.slug)
+        self._position = {id(e): i for i, e in enumerate(self.entries)}
+        self._index = None
+        self._backend = None
+        self._graph = None
+
+    def reload(self, root_dir: Path) -> None:
+        """Re-read one repository (e.g. after ``git pull``)."""
+        i = self.root_dirs.index(Path(root_dir))
+        self.collections[i] = TILCollection(
+            self.root_dirs[i], self._workers, self.ref)
+        self._merge()
+
+    def query(self, expression: str) -> List[TILEntry]:
+        """Evaluate ``expression`` on each repository's own index."""
+        hits = {}
+        for collection in self.collections:
+            for entry in collection.query(expression):
+                if self._owner.get(id(entry)) is collection:
+                    hits[id(entry)] = entry
+        return sorted(hits.values(), key=lambda e: self._position[id(e)])
+
+    def root_for(self, entry: TILEntry) -> Path:
+        owner = self._owner.get(id(entry))
+        return owner.root_dir if owner else self.root_dir
+
+    def source_label(self, entry: TILEntry) -> Optional[str]:
+        return self.root_for(entry).resolve().name
+
+
+def load_collection(root_dirs: List[Path], workers: Optional[str] = None,
+                    ref: Optional[str] = None) -> TILCollection:
+    """A ``TILCollection`` for one repository, federated for several.
+
+    Raises ``ValueError`` when ``root_dirs`` is empty.
+    """
+    if not root_dirs:
+        raise ValueError("No repository path given")
+    if len(root_dirs) == 1:
+        return TILCollection(root_dirs[0], workers, ref)
+    return FederatedCollection(root_dirs, workers, ref)
+
+
+def _script_for(language: str) -> Optional[Tuple[Path, str]]:
+    """Return ``(temp_script_path, interpreter)`` for ``language``.
+
+    ``None`` for languages that cannot be executed.
+    """
     import uuid
 
     temp_dir = Path(os.environ.get('TMPDIR', '/tmp'))
     unique_id = uuid.uuid4().hex[:8]
 
     if language == 'bash' or language == 'sh':
-        script_file = temp_dir / f'til_exec_{unique_id}.sh'
-        interpreter = '/bin/bash'
-    elif language == 'python':
-        script_file = temp_dir / f'til_exec_{unique_id}.py'
-        interpreter = sys.executable
-    else:
+        return temp_dir / f'til_exec_{unique_id}.sh', '/bin/bash'
+    if language == 'python':
+        return temp_dir / f'til_exec_{unique_id}.py', sys.executable
+    return None
+
+
+def execute_code_block(language: str, code: str, runner=None,
+                       label: str = '', timeout: Optional[float] = None,
+                       journal: Optional[dict] = None) -> int:
+    """Execute a code block based on its language
+
+    With a ``runner.BlockRunner`` the block is run through it (timeouts,
+    streamed and prefixed output); ``label`` names the block in its
+    output and ``timeout`` overrides the runner's. ``journal`` (``slug``,
+    ``section`` and 1-based ``block``) records the run in the execution
+    journal (see ``til_cli.journal``).
+    """
+    # Create a temporary script file with unique name
+    script = _script_for(language)
+    if script is None:
         print(f"Unsupported language: {language}", file=sys.stderr)
         return 1
+    script_file, interpreter = script
 
     try:
         script_file.write_text(code)
@@ -287,6 +624,15 @@ def execute_code_block(language: str, code: str) -> int:
             return 0
 
         # Execute the script
+        if runner is not None:
+            start = time.time()
+            returncode = runner.run([interpreter, str(script_file)],
+                                    label=label, timeout=timeout)
+            if journal is not None:
+                journal_append(journal_record(
+                    language=language, code=code, usage=runner.last,
+                    start=start, **journal))
+            return returncode
         return subprocess.call([interpreter, str(script_file)])
 
     except Exception as e:
@@ -298,6 +644,10 @@ def execute_code_block(language: str, code: str) -> int:
             script_file.unlink()
 
 
+# (blob_sha, path) -> validation errors, for entries loaded from git.
+_VALIDATION_CACHE: dict = {}
+
+
 def validate_entry(entry: TILEntry) -> List[str]:
     """Validate a TIL entry against the Agent Skill spec.
 
@@ -307,12 +657,21 @@ def validate_entry(entry: TILEntry) -> List[str]:
     errors: List[str] = []
     is_skill = entry.path.name == 'SKILL.md'
 
-    # Read the file once; subsequent checks reuse ``raw``/``body``.
-    try:
-        raw = entry.path.read_text()
-    except OSError as exc:
-        errors.append(f"Cannot read file: {exc}")
-        raw = ''
+    # Results only depend on the content and the path, which the blob id
+    # and path pin down exactly.
+    cache_key = (entry.blob_sha, str(entry.path)) if entry.blob_sha else None
+    if cache_key in _VALIDATION_CACHE:
+        return list(_VALIDATION_CACHE[cache_key])
+
+    # Reuse the text kept from parsing; only re-read when parsing a file
+    # failed. A git blob has no file to fall back to and may be empty.
+    raw = entry.content
+    if not raw and not entry.blob_sha:
+        try:
+            raw = entry.path.read_text()
+        except OSError as exc:
+            errors.append(f"Cannot read file: {exc}")
+            raw = ''
     _, body = TILEntry._split_frontmatter(raw)
 
     if is_skill:
@@ -365,12 +724,18 @@ def validate_entry(entry: TILEntry) -> List[str]:
     in_block = False
     open_lang: Optional[str] = None
     for line in body.splitlines():
-        m = re.match(r'^```([A-Za-z0-9_-]*)\s*$', line)
+        m = _FENCE_RE.match(line)
         if not m:
             continue
         if not in_block:
             in_block = True
             open_lang = m.group(1)
+            timeout = fence_options(m.group(2)).get('timeout')
+            if timeout is not None:
+                try:
+                    parse_timeout(timeout)
+                except ValueError:
+                    errors.append(f"Invalid code block timeout: {timeout}")
         else:
             in_block = False
             if not open_lang:
@@ -379,114 +744,46 @@ def validate_entry(entry: TILEntry) -> List[str]:
     if in_block:
         errors.append("Unclosed code block (missing closing ```)")
 
+    if cache_key:
+        _VALIDATION_CACHE[cache_key] = list(errors)
     return errors
 
 
-def get_til_repo_path():
+def split_repo_paths(value: str) -> List[Path]:
+    """Existing directories in an ``os.pathsep``-separated list."""
+    return [Path(part) for part in value.split(os.pathsep)
+            if part and Path(part).is_dir()]
+
+
+def get_til_repo_paths() -> List[Path]:
     """
-    Get the TIL repository path using the following priority order:
-    1. Command line argument
-    2. Environment variable
-    3. Config file
-    4. Current directory (fallback)
+    Get the TIL repository paths, highest precedence first, from:
+    1. Environment variable (``TIL_REPO_PATH``, colon-separated)
+    2. Config file (one path per line)
+    3. Current directory (fallback)
     """
     # Check environment variable
-    env_path = os.environ.get('TIL_REPO_PATH')
-    if env_path and Path(env_path).is_dir():
-        return Path(env_path)
+    env_paths = split_repo_paths(os.environ.get('TIL_REPO_PATH', ''))
+    if env_paths:
+        return env_paths
 
     # Check config file in user's home directory
-    config_path = Path.home() / '.tilconfig'
-    if config_path.exists():
-        try:
-            config = config_path.read_text().strip()
-            if Path(config).is_dir():
-                return Path(config)
-        except:
-            pass
+    config_paths = [Path(p) for p in read_config()[0] if Path(p).is_dir()]
+    if config_paths:
+        return config_paths
 
     # Fallback to current directory
-    return Path.cwd()
+    return [Path.cwd()]
 
 
-def check_for_repo_updates(repo_path: Path, force: bool = False) -> bool:
-    """
-    Check if the TIL repository needs updating and update if necessary.
-    Returns True if an update was performed.
+def get_til_repo_path():
     """
-    try:
-        # Skip if not a git repository
-        git_dir = repo_path / '.git'
-        if not git_dir.is_dir():
-            return False
-
-        # Get last update check timestamp
-        timestamp_file = Path.home() / '.til_last_update'
-        current_time = time.time()
-
-        # Check if we should update based on timestamp (every 12 hours)
-        if not force and timestamp_file.exists():
-            try:
-                last_update = float(timestamp_file.read_text().strip())
-                if current_time - last_update < 43200:  # 12 hours in seconds
-                    return False
-            except (ValueError, OSError):
-                # Invalid timestamp, continue with update check
-                pass
-
-        # Check if update is needed using git
-        try:
-            # Fetch the latest changes
-            subprocess.run(
-                ['git', 'fetch', '--quiet'],
-                cwd=repo_path,
-                capture_output=True,
-                check=True,
-                timeout=5  # 5 second timeout to prevent hanging
-            )
-
-            # Check if we're behind remote
-            result = subprocess.run(
-                ['git', 'rev-list', 'HEAD..@{upstream}', '--count'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=2
-            )
-
-            # If behind remote (result > 0), perform update
-            if int(result.stdout.strip()) > 0:
-                update_result = subprocess.run(
-                    ['git', 'pull', '--quiet'],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-
-                if update_result.returncode == 0:
-                    # Update timestamp
-                    timestamp_file.write_text(str(current_time))
-                    logger.info("TIL repository updated to latest version.")
-                    return True
-                else:
-                    # Update failed but not critical, continue
-                    return False
-            else:
-                # No update needed, still update timestamp
-                timestamp_file.write_text(str(current_time))
-                return False
-
-        except (subprocess.SubprocessError, subprocess.TimeoutExpired) as e:
-            # Git command failed or timed out, log but continue
-            logger.debug(f"Git update check failed: {e}")
-            return False
-
-    except Exception as e:
-        # Any other error, log but continue
-        logger.debug(f"Repository update check failed: {e}")
-        return False
+    Get the TIL repository path using the following priority order:
+    1. Command line argument
+    2. Environment variable
+    3. Config file
+    4. Current directory (fallback)
 
-    # Default: no update
-    return False
+    With several repositories configured this is the first one.
+    """
+    return get_til_repo_paths()[0]
@@ -0,0 +1,255 @@
+"""Background update check for the skills repository.
+
+A check compares the upstream branch on the remote (one ``git ls-remote``)
+with what the checkout already has. The current branch, its upstream and
+the local ref values are read straight from ``.git`` rather than through
+extra git processes, so a check that finds nothing new costs exactly one
+subprocess. Only when the remote has moved does it run ``git pull``.
+
+Each repository gets its own state file under ``<state_dir>/updates/``
+(see ``til_cli.config``) holding the last check's outcome and step
+timings; it drives the throttle that used to be one global timestamp in
+``~/.til_last_update``. The interval defaults to 12 hours and is set with
+``update_interval`` in ``~/.tilconfig`` or ``TIL_UPDATE_INTERVAL``.
+
+The fetch/pull is guarded by a per-repository ``fcntl`` lock. When many
+``til`` processes start at once, one updates and the rest skip the check
+and carry on with the current tree instead of racing on ``git pull``.
+"""
+
+from __future__ import annotations
+
+import configparser
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .config import get_int_setting, repo_key, state_dir
+
+logger = logging.getLogger("til")
+
+# Default minimum seconds between unforced checks (12 hours).
+DEFAULT_UPDATE_INTERVAL = 43200
+# Pre-state-file throttle timestamp, read as a fallback.
+LEGACY_TIMESTAMP_FILE_NAME = '.til_last_update'
+
+
+def update_interval() -> int:
+    """Configured seconds between unforced checks."""
+    return get_int_setting('update_interval', DEFAULT_UPDATE_INTERVAL)
+
+
+def state_path(repo_path: Path) -> Path:
+    directory = state_dir() / 'updates'
+    directory.mkdir(exist_ok=True)
+    return directory / f"{repo_key(repo_path)}.json"
+
+
+def load_state(repo_path: Path) -> dict:
+    """Last recorded check for ``repo_path``, or ``{}``.
+
+    Falls back to the legacy global timestamp so upgrading doesn't
+    trigger an immediate check of every repository.
+    """
+    try:
+        return json.loads(state_path(repo_path).read_text())
+    except (OSError, ValueError):
+        pass
+    try:
+        legacy = Path.home() / LEGACY_TIMESTAMP_FILE_NAME
+        return {'last_check': float(legacy.read_text().strip())}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(repo_path: Path, state: dict) -> None:
+    path = state_path(repo_path)
+    state = dict(state, repo=str(Path(repo_path).resolve()))
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+@contextlib.contextmanager
+def update_lock(repo_path: Path) -> Iterator[bool]:
+    """Non-blocking per-repository lock; yields whether it was acquired."""
+    lock_file = state_path(repo_path).with_suffix('.lock')
+    with open(lock_file, 'a') as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _read_ref(git_dir: Path, ref: str) -> Optional[str]:
+    """Resolve a full ref name from loose refs or ``packed-refs``."""
+    try:
+        return (git_dir / ref).read_text().strip() or None
+    except OSError:
+        pass
+    try:
+        for line in (git_dir / 'packed-refs').read_text().splitlines():
+            if line.endswith(' ' + ref) and not line.startswith(('#', '^')):
+                return line.split(' ', 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+def local_upstream(git_dir: Path) -> Optional[Tuple[str, str, str, Optional[str]]]:
+    """``(remote, merge_ref, head_sha, tracking_sha)`` for the current branch.
+
+    ``None`` when HEAD is detached or the branch has no upstream. Reads
+    ``HEAD``, ``config`` and refs directly; no subprocess.
+    """
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+    except OSError:
+        return None
+    if not head.startswith('ref: refs/heads/'):
+        return None
+    branch_ref = head[len('ref: '):]
+    branch = branch_ref[len('refs/heads/'):]
+
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    try:
+        config.read(git_dir / 'config')
+    except configparser.Error:
+        return None
+    section = f'branch "{branch}"'
+    if not config.has_section(section):
+        return None
+    remote = config.get(section, 'remote', fallback=None)
+    merge_ref = config.get(section, 'merge', fallback=None)
+    if not remote or not merge_ref or remote == '.':
+        return None
+
+    head_sha = _read_ref(git_dir, branch_ref)
+    if not head_sha:
+        return None
+    tracking_ref = 'refs/remotes/{}/{}'.format(
+        remote, merge_ref[len('refs/heads/'):]
+        if merge_ref.startswith('refs/heads/') else merge_ref)
+    return remote, merge_ref, head_sha, _read_ref(git_dir, tracking_ref)
+
+
+def _timed_git(repo: Path, args: list, timeout: float,
+               timings: Dict[str, float], step: str) -> subprocess.CompletedProcess:
+    start = time.monotonic()
+    try:
+        return subprocess.run(['git', *args], cwd=repo, capture_output=True,
+                              text=True, timeout=timeout)
+    finally:
+        timings[step] = round(time.monotonic() - start, 3)
+
+
+def probe_and_update(repo_path: Path) -> dict:
+    """Bring ``repo_path`` up to date if its upstream moved.
+
+    Returns a record with ``outcome`` (``up-to-date``, ``ahead``,
+    ``updated``, ``no-upstream``, ``error``), the remote sha and per-step
+    ``timings`` in seconds.
+    """
+    timings: Dict[str, float] = {}
+    record = {'timings': timings}
+    upstream = local_upstream(repo_path / '.git')
+    if upstream is None:
+        record['outcome'] = 'no-upstream'
+        return record
+    remote, merge_ref, head_sha, tracking_sha = upstream
+
+    result = _timed_git(repo_path, ['ls-remote', remote, merge_ref],
+                        5, timings, 'ls_remote')
+    fields = result.stdout.split()
+    if result.returncode != 0 or not fields:
+        record['outcome'] = 'error'
+        record['error'] = result.stderr.strip() or 'upstream branch not found'
+        return record
+    remote_sha = record['remote_sha'] = fields[0]
+
+    if remote_sha == head_sha:
+        record['outcome'] = 'up-to-date'
+        return record
+
+    if remote_sha == tracking_sha:
+        # Nothing new on the remote since the last fetch; HEAD is either
+        # ahead (local commits) or behind an already-fetched upstream.
+        behind = _timed_git(repo_path,
+                            ['rev-list', '--count', f'HEAD..{remote_sha}'],
+                            2, timings, 'rev_list')
+        if behind.returncode == 0 and behind.stdout.strip() == '0':
+            record['outcome'] = 'ahead'
+            return record
+
+    pull = _timed_git(repo_path, ['pull', '--quiet'], 10, timings, 'pull')
+    if pull.returncode == 0:
+        record['outcome'] = 'updated'
+    else:
+        record['outcome'] = 'error'
+        record['error'] = pull.stderr.strip()
+    return record
+
+
+def check_for_repo_updates(repo_path: Path, force: bool = False) -> bool:
+    """
+    Check if the TIL repository needs updating and update if necessary.
+    Returns True if an update was performed.
+    """
+    try:
+        # Skip if not a git repository
+        if not (repo_path / '.git').is_dir():
+            return False
+
+        interval = update_interval()
+        if not force and time.time() - load_state(repo_path).get(
+                'last_check', 0) < interval:
+            return False
+
+        with update_lock(repo_path) as acquired:
+            if not acquired:
+                # Another process is updating this repository right now;
+                # use the tree as it is rather than queueing behind it.
+                return False
+            # Re-read under the lock: a process that held it may have
+            # just finished the check we were about to make.
+            state = load_state(repo_path)
+            current_time = time.time()
+            if not force and current_time - state.get('last_check', 0) < interval:
+                return False
+
+            try:
+                record = probe_and_update(repo_path)
+            except (OSError, subprocess.SubprocessError) as e:
+                # Git missing or timed out: log but continue.
+                record = {'outcome': 'error', 'error': str(e)}
+
+            record['checked_at'] = current_time
+            # Failed checks are recorded but don't reset the throttle, so
+            # the next invocation retries.
+            record['last_check'] = (state.get('last_check', 0)
+                                    if record['outcome'] == 'error'
+                                    else current_time)
+            save_state(repo_path, record)
+
+        if record['outcome'] == 'updated':
+            logger.info("TIL repository updated to latest version.")
+            return True
+        if record['outcome'] == 'error':
+            logger.debug(f"Git update check failed: {record.get('error')}")
+        return False
+
+    except Exception as e:
+        # Any other error, log but continue
+        logger.debug(f"Repository update check failed: {e}")
+        return False